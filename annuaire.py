@@ -0,0 +1,179 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Annuaire des rooms ouvertes            ║
+║   Index secondaire des lobbies rejoignables, par seaux       ║
+║                                                              ║
+║  Seau = (langue, mode de jeu, mode mixte, places libres).    ║
+║  Chaque room y est rangée avec son résumé déjà encodé en     ║
+║  JSON ; elle ne change de seau que si sa clé change. Une     ║
+║  page coûte O(seaux + taille de page), jamais O(rooms).      ║
+║                                                              ║
+║  Le flux du lobby pousse les changements de l'annuaire aux   ║
+║  abonnés, coalescés par room sur un court intervalle.        ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import secrets
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Cle = Tuple[str, str, bool, int]   # (langue, mode_jeu, mixte, places libres)
+
+# ──────────────────────────────────────────────────────────────
+#  ANNUAIRE
+# ──────────────────────────────────────────────────────────────
+
+class AnnuaireRooms:
+    """`placer` à chaque transition (O(1) si la clé ne change pas),
+    `page` pour la lecture. `etiquette` change à chaque modification :
+    c'est la base de l'ETag de GET /parties."""
+
+    def __init__(self):
+        self.seaux: Dict[Cle, "OrderedDict[str, str]"] = {}
+        self.cle_de: Dict[str, Cle] = {}
+        self.generation = secrets.token_hex(4)   # distingue deux démarrages
+        self.version = 0
+
+    @property
+    def etiquette(self) -> str:
+        return f"{self.generation}-{self.version}"
+
+    def placer(self, room_id: str, cle: Optional[Cle], fragment: Optional[Callable[[], str]] = None) -> bool:
+        """Range la room sous `cle` (None : plus rejoignable). `fragment()`
+        n'est appelé que si la room change de seau. Renvoie True si
+        l'annuaire a changé."""
+        ancienne = self.cle_de.get(room_id)
+        if ancienne == cle:
+            return False
+        if ancienne is not None:
+            seau = self.seaux[ancienne]
+            del seau[room_id]
+            if not seau:
+                del self.seaux[ancienne]
+            del self.cle_de[room_id]
+        if cle is not None:
+            self.seaux.setdefault(cle, OrderedDict())[room_id] = fragment()
+            self.cle_de[room_id] = cle
+        self.version += 1
+        return True
+
+    def retirer(self, room_id: str) -> bool:
+        return self.placer(room_id, None)
+
+    def fragment(self, room_id: str) -> Optional[str]:
+        cle = self.cle_de.get(room_id)
+        return self.seaux[cle][room_id] if cle is not None else None
+
+    def seaux_filtres(self, langue: Optional[str] = None, mode: Optional[str] = None,
+                      mixte: Optional[bool] = None, places_min: int = 1) -> List[Cle]:
+        """Seaux retenus, les rooms presque pleines d'abord."""
+        return sorted(
+            (c for c in self.seaux
+             if (langue is None or c[0] == langue) and (mode is None or c[1] == mode)
+             and (mixte is None or c[2] == mixte) and c[3] >= places_min),
+            key=lambda c: (c[3], c),
+        )
+
+    def __len__(self) -> int:
+        return len(self.cle_de)
+
+
+def paginer(annuaires: Sequence[AnnuaireRooms], debut: int, limite: int,
+            **filtres) -> Tuple[List[str], int]:
+    """Fragments JSON de la page [debut, debut + limite) sur la suite des
+    annuaires (local puis distants), et nombre total de rooms retenues."""
+    fragments: List[str] = []
+    total = 0
+    for annuaire in annuaires:
+        for cle in annuaire.seaux_filtres(**filtres):
+            seau = annuaire.seaux[cle]
+            total += len(seau)
+            if len(fragments) >= limite:
+                continue
+            if debut >= len(seau):
+                debut -= len(seau)
+                continue
+            fragments.extend(itertools.islice(seau.values(), debut, debut + limite - len(fragments)))
+            debut = 0
+    return fragments, total
+
+# ──────────────────────────────────────────────────────────────
+#  CACHE DES RÉPONSES
+# ──────────────────────────────────────────────────────────────
+
+class CacheReponses:
+    """Corps déjà encodés par requête, valables tant que les étiquettes
+    des annuaires n'ont pas changé (et au plus `duree` secondes)."""
+
+    def __init__(self, duree: float = 2.0, taille: int = 128,
+                 horloge: Callable[[], float] = time.monotonic):
+        self.duree = duree
+        self.taille = taille
+        self.horloge = horloge
+        self._entrees: "OrderedDict[tuple, Tuple[str, float, str, int]]" = OrderedDict()
+
+    def lire(self, requete: tuple, etiquette: str) -> Optional[Tuple[str, int]]:
+        entree = self._entrees.get(requete)
+        if entree is None:
+            return None
+        sa_etiquette, expire, corps, total = entree
+        if sa_etiquette != etiquette or expire < self.horloge():
+            del self._entrees[requete]
+            return None
+        self._entrees.move_to_end(requete)
+        return corps, total
+
+    def ecrire(self, requete: tuple, etiquette: str, corps: str, total: int):
+        self._entrees[requete] = (etiquette, self.horloge() + self.duree, corps, total)
+        self._entrees.move_to_end(requete)
+        while len(self._entrees) > self.taille:
+            self._entrees.popitem(last=False)
+
+# ──────────────────────────────────────────────────────────────
+#  FLUX DU LOBBY
+# ──────────────────────────────────────────────────────────────
+
+CREEE, MAJ, DEMARREE, FERMEE = "creee", "maj", "demarree", "fermee"
+_RETRAITS = (DEMARREE, FERMEE)
+
+
+class FluxLobby:
+    """Événements de l'annuaire en attente, un seul par room : une rafale
+    d'arrivées dans un lobby ne produit qu'une mise à jour par intervalle.
+    `creee` / `maj` portent le résumé (upsert côté client), `demarree` /
+    `fermee` seulement l'id (la room n'est plus rejoignable)."""
+
+    def __init__(self, publier: Callable[[List[Tuple[str, str, Optional[str]]]], None],
+                 intervalle: float = 0.5):
+        self.publier = publier
+        self.intervalle = intervalle
+        self.actif = False                  # au moins un abonné
+        self.en_attente: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self.nb_lots = 0
+
+    def noter(self, room_id: str, evenement: str, fragment: Optional[str] = None):
+        if not self.actif:
+            return
+        precedent = self.en_attente.get(room_id)
+        if precedent is not None and precedent[0] == CREEE:
+            if evenement in _RETRAITS:
+                # Apparue puis disparue dans l'intervalle : rien à dire
+                del self.en_attente[room_id]
+                return
+            evenement = CREEE
+        self.en_attente[room_id] = (evenement, fragment)
+        if self._handle is None:
+            self._handle = asyncio.get_running_loop().call_later(self.intervalle, self._vider)
+
+    def _vider(self):
+        self._handle = None
+        lot, self.en_attente = self.en_attente, {}
+        if lot:
+            self.nb_lots += 1
+            self.publier([(room_id, evt, fragment) for room_id, (evt, fragment) in lot.items()])
@@ -0,0 +1,306 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Banc d'essai sans réseau               ║
+║   Des milliers de rooms simulées, horloge virtuelle          ║
+║                                                              ║
+║  Les vrais gestionnaires (traiter_lettre, langue au chat,    ║
+║  ia_jouer, perte de vie) passent par les vrais acteurs ;     ║
+║  seuls les délais sont virtuels : aucune attente réelle.     ║
+║                                                              ║
+║  Usage :                                                     ║
+║    python bench.py --rooms 2000                              ║
+║    python bench.py --sauver-reference bench_reference.json   ║
+║    python bench.py --comparer bench_reference.json           ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+import server
+from planificateur import Planificateur
+
+# Gestionnaires mesurés (attribut du module server → nom affiché)
+MESURES = {
+    "traiter_lettre":                 "lettre",
+    "traiter_langue_au_chat":         "langue_au_chat",
+    "traiter_reponse_langue_au_chat": "reponse_langue_au_chat",
+    "ia_jouer":                       "ia",
+    "demarrer_tour":                  "nouveau_tour",
+}
+
+# ──────────────────────────────────────────────────────────────
+#  INSTRUMENTATION
+# ──────────────────────────────────────────────────────────────
+
+class Chronometres:
+    """Durées (ns) de chaque appel, par gestionnaire."""
+
+    def __init__(self):
+        self.durees: Dict[str, List[int]] = {}
+
+    def envelopper(self, nom: str, fonction):
+        durees = self.durees.setdefault(nom, [])
+
+        async def mesure(*args, **kwargs):
+            debut = time.perf_counter_ns()
+            try:
+                return await fonction(*args, **kwargs)
+            finally:
+                durees.append(time.perf_counter_ns() - debut)
+        return mesure
+
+    def percentiles(self) -> Dict[str, dict]:
+        resume = {}
+        for nom, durees in self.durees.items():
+            if not durees:
+                continue
+            tri = sorted(durees)
+            resume[nom] = {
+                "appels": len(tri),
+                "p50_us": round(tri[len(tri) // 2] / 1000, 1),
+                "p99_us": round(tri[min(len(tri) - 1, len(tri) * 99 // 100)] / 1000, 1),
+            }
+        return resume
+
+
+def instrumenter(chronos: Chronometres, bots: "Bots"):
+    """Enveloppe les gestionnaires du module server (table des commandes
+    comprise) ; les appels internes (ia_jouer → traiter_lettre) sont donc
+    mesurés aussi."""
+    originaux = {attr: getattr(server, attr) for attr in MESURES}
+    for attr, nom in MESURES.items():
+        setattr(server, attr, chronos.envelopper(nom, originaux[attr]))
+    perte_vie = server.Partie.appliquer_perte_vie
+    server.Partie.appliquer_perte_vie = chronos.envelopper("perte_vie", perte_vie)
+
+    # Les bots jouent quand vient leur tour ou quand ils sont interpellés
+    demarrer_tour = server.demarrer_tour
+    langue_au_chat = server.traiter_langue_au_chat
+
+    async def demarrer_tour_avec_bots(partie, *args, **kwargs):
+        await demarrer_tour(partie, *args, **kwargs)
+        bots.jouer(partie)
+
+    async def langue_au_chat_avec_bots(partie, *args, **kwargs):
+        await langue_au_chat(partie, *args, **kwargs)
+        bots.repondre(partie)
+
+    server.demarrer_tour = demarrer_tour_avec_bots
+    server.traiter_langue_au_chat = langue_au_chat_avec_bots
+    for cle, attr in (("lettre", "traiter_lettre"),
+                      ("langue_au_chat", "traiter_langue_au_chat"),
+                      ("reponse_langue_au_chat", "traiter_reponse_langue_au_chat"),
+                      ("ia", "ia_jouer"),
+                      ("nouveau_tour", "demarrer_tour")):
+        server.COMMANDES[cle] = getattr(server, attr)
+    server.COMMANDES["perte_vie"] = server.Partie.appliquer_perte_vie
+
+# ──────────────────────────────────────────────────────────────
+#  JOUEURS SIMULÉS
+# ──────────────────────────────────────────────────────────────
+
+class Bots:
+    """Joueurs « humains » simulés : temps de réflexion, fautes de frappe,
+    langue au chat et bluff, tirés d'un générateur dédié."""
+
+    def __init__(self, rng: random.Random, reflexion=(1.0, 6.0),
+                 p_erreur=0.05, p_langue_au_chat=0.05, p_bluff=0.3):
+        self.rng = rng
+        self.reflexion = reflexion
+        self.p_erreur = p_erreur
+        self.p_langue_au_chat = p_langue_au_chat
+        self.p_bluff = p_bluff
+
+    def _envoyer(self, partie: server.Partie, commande: tuple):
+        # Comme un vrai client : la commande n'entre dans la boîte qu'à
+        # l'envoi, et peut arriver trop tard (tour passé, pause en cours).
+        partie.planificateur.programmer(partie.room_id, "bot", self.rng.uniform(*self.reflexion),
+                                        lambda: partie.poster(commande))
+
+    def jouer(self, partie: server.Partie):
+        jid = partie.joueur_actuel_id
+        if partie.etat != server.EtatPartie.EN_COURS or not jid or partie.joueurs[jid].est_ia:
+            return
+        seq = partie.sequence
+        tirage = self.rng.random()
+        if seq and tirage < self.p_langue_au_chat:
+            commande = ("langue_au_chat", jid)
+        elif tirage < self.p_langue_au_chat + self.p_erreur:
+            commande = ("lettre", jid, self.rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+        else:
+            suites = [
+                p.nom_normalise for p in
+                server.chercher_pays(seq, partie.lexique_id, partie.config.mode_mixte)
+                if not partie.deja_joue(p.nom_normalise) and len(p.nom_normalise) > len(seq)
+            ]
+            if not suites:
+                return   # le chrono tranchera
+            commande = ("lettre", jid, self.rng.choice(suites)[len(seq)])
+        self._envoyer(partie, commande)
+
+    def repondre(self, partie: server.Partie):
+        jid = partie.joueur_interpelle
+        if not partie.en_attente_langue_au_chat or not jid or partie.joueurs[jid].est_ia:
+            return
+        seq = partie.sequence
+        candidats = [
+            p.nom for p in server.chercher_pays(seq, partie.lexique_id, partie.config.mode_mixte)
+            if not partie.deja_joue(p.nom_normalise)
+        ]
+        pays = "Atlantide" if not candidats or self.rng.random() < self.p_bluff else self.rng.choice(candidats)
+        self._envoyer(partie, ("reponse_langue_au_chat", jid, pays))
+
+# ──────────────────────────────────────────────────────────────
+#  SIMULATION
+# ──────────────────────────────────────────────────────────────
+
+class Simulation:
+    def __init__(self, args):
+        self.args = args
+        self.temps = 0.0
+        self.planificateur = Planificateur(horloge=lambda: self.temps)
+        self.parties: List[server.Partie] = []
+
+    def creer_rooms(self):
+        config = server.Config(langue=self.args.langue, vies=self.args.vies,
+                               temps=self.args.temps, mode_mixte=self.args.mode_mixte)
+        for k in range(self.args.rooms):
+            partie = server.Partie(f"B{k:06d}", config, createur_id="")
+            partie.planificateur = self.planificateur
+            for b in range(self.args.bots):
+                jid = f"bot{b}"
+                partie.joueurs[jid] = server.EtatJoueur(id=jid, nom=f"Bot {b}", vies=config.vies)
+            for i in range(self.args.ia):
+                jid = f"ia_{i}"
+                partie.joueurs[jid] = server.EtatJoueur(id=jid, nom=f"IA {i}", vies=config.vies, est_ia=True)
+            self.parties.append(partie)
+
+    async def _attendre_acteurs(self):
+        # Les acteurs ne s'interrompent jamais (aucune socket) : un pas suffit
+        # en général, mais une commande peut en reposter une autre.
+        courante = asyncio.current_task()
+        while any(t is not courante for t in asyncio.all_tasks()):
+            await asyncio.sleep(0)
+
+    async def executer(self) -> dict:
+        for partie in self.parties:
+            partie.poster(("demarrer",))
+        await self._attendre_acteurs()
+
+        debut = time.perf_counter()
+        blocs_avant = sys.getallocatedblocks()
+        pic_transitoire = 0
+        while True:
+            deadline = self.planificateur.prochaine_deadline()
+            if deadline is None or deadline > self.args.duree_max:
+                break
+            self.temps = deadline
+            if self.args.allocations:
+                avant, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+            self.planificateur.declencher_echus(deadline)
+            await self._attendre_acteurs()
+            if self.args.allocations:
+                _, pic = tracemalloc.get_traced_memory()
+                pic_transitoire += max(0, pic - avant)
+        duree = time.perf_counter() - debut
+        blocs_retenus = sys.getallocatedblocks() - blocs_avant
+        return {"duree_s": duree, "blocs_retenus": blocs_retenus, "pic_transitoire": pic_transitoire}
+
+
+async def lancer(args) -> dict:
+    random.seed(args.graine)
+    chronos = Chronometres()
+    bots = Bots(random.Random(args.graine))
+    instrumenter(chronos, bots)
+
+    simulation = Simulation(args)
+    simulation.creer_rooms()
+    if args.allocations:
+        tracemalloc.start()
+    mesure = await simulation.executer()
+    if args.allocations:
+        tracemalloc.stop()
+
+    handlers = chronos.percentiles()
+    lettres = handlers.get("lettre", {}).get("appels", 0)
+    tours = max(1, handlers.get("nouveau_tour", {}).get("appels", 0))
+    terminees = sum(1 for p in simulation.parties if p.etat == server.EtatPartie.TERMINEE)
+    resultat = {
+        "machine": f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}",
+        "rooms": args.rooms,
+        "terminees": terminees,
+        "temps_virtuel_s": round(simulation.temps, 1),
+        "duree_reelle_s": round(mesure["duree_s"], 3),
+        "lettres": lettres,
+        "lettres_par_s": round(lettres / mesure["duree_s"]) if mesure["duree_s"] else None,
+        "tours": tours,
+        "blocs_retenus_par_tour": round(mesure["blocs_retenus"] / tours, 2),
+        "octets_par_room_max": max((p.octets() for p in simulation.parties), default=0),
+        "handlers": handlers,
+    }
+    if args.allocations:
+        resultat["octets_transitoires_par_tour"] = round(mesure["pic_transitoire"] / tours)
+    return resultat
+
+# ──────────────────────────────────────────────────────────────
+#  RÉGRESSIONS
+# ──────────────────────────────────────────────────────────────
+
+def comparer(resultat: dict, reference: dict, tolerance: float) -> List[str]:
+    """Liste des régressions au-delà de `tolerance` (0.15 = 15 %)."""
+    regressions = []
+    if reference.get("lettres_par_s") and resultat["lettres_par_s"] < reference["lettres_par_s"] * (1 - tolerance):
+        regressions.append(f"lettres/s : {resultat['lettres_par_s']} < {reference['lettres_par_s']}")
+    for nom, ref in reference.get("handlers", {}).items():
+        actuel = resultat["handlers"].get(nom)
+        if actuel and actuel["p99_us"] > ref["p99_us"] * (1 + tolerance):
+            regressions.append(f"{nom} p99 : {actuel['p99_us']} µs > {ref['p99_us']} µs")
+    ref_blocs = reference.get("blocs_retenus_par_tour")
+    if ref_blocs is not None and resultat["blocs_retenus_par_tour"] > max(ref_blocs, 1) * (1 + tolerance):
+        regressions.append(f"blocs retenus/tour : {resultat['blocs_retenus_par_tour']} > {ref_blocs}")
+    ref_octets = reference.get("octets_par_room_max")
+    if ref_octets and resultat["octets_par_room_max"] > ref_octets * (1 + tolerance):
+        regressions.append(f"octets/room : {resultat['octets_par_room_max']} > {ref_octets}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai Pays Game (horloge virtuelle)")
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--bots", type=int, default=1, help="joueurs humains simulés par room")
+    parser.add_argument("--ia", type=int, default=2, help="IA par room")
+    parser.add_argument("--langue", default="fr")
+    parser.add_argument("--vies", type=int, default=3)
+    parser.add_argument("--temps", type=int, default=15)
+    parser.add_argument("--mode-mixte", action="store_true")
+    parser.add_argument("--duree-max", type=float, default=3600.0, help="secondes virtuelles")
+    parser.add_argument("--graine", type=int, default=1)
+    parser.add_argument("--allocations", action="store_true", help="tracemalloc (plus lent)")
+    parser.add_argument("--sauver-reference", metavar="FICHIER")
+    parser.add_argument("--comparer", metavar="FICHIER")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    resultat = asyncio.run(lancer(args))
+    print(json.dumps(resultat, indent=2, ensure_ascii=False))
+
+    if args.sauver_reference:
+        with open(args.sauver_reference, "w", encoding="utf-8") as f:
+            json.dump(resultat, f, indent=2, ensure_ascii=False)
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            regressions = comparer(resultat, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"[bench REGRESSION] {r}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,369 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Générateur de charge WebSocket         ║
+║   De vrais clients contre un vrai serveur                    ║
+║                                                              ║
+║  Crée des rooms (POST /parties), y connecte des joueurs      ║
+║  simulés, démarre et joue : temps de réflexion, chat,        ║
+║  déconnexions/reconnexions, langue au chat.                  ║
+║                                                              ║
+║  Usage :                                                     ║
+║    python charge.py --url http://localhost:8000 \\            ║
+║        --rooms 500 --joueurs 4 --profil humain --duree 120   ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import urllib.request
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import websockets
+
+from lexique import IndexLexique
+
+# ──────────────────────────────────────────────────────────────
+#  PROFILS DE JOUEURS
+# ──────────────────────────────────────────────────────────────
+
+# Temps de réflexion avant chaque lettre, en secondes
+PROFILS = {
+    "rapide": lambda rng: rng.uniform(0.2, 0.8),
+    "humain": lambda rng: min(12.0, rng.lognormvariate(0.8, 0.5)),   # médiane ≈ 2,2 s
+    "lent":   lambda rng: min(14.0, rng.lognormvariate(1.6, 0.4)),   # médiane ≈ 5 s
+}
+
+
+def profil_reflexion(nom: str):
+    """`rapide`, `humain`, `lent` ou `fixe:1.5`."""
+    if nom.startswith("fixe:"):
+        valeur = float(nom.split(":", 1)[1])
+        return lambda rng: valeur
+    return PROFILS[nom]
+
+# ──────────────────────────────────────────────────────────────
+#  MESURES
+# ──────────────────────────────────────────────────────────────
+
+class Mesures:
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.tentatives = 0
+        self.acceptees = 0
+        self.refusees = 0
+        self.handshake: List[float] = []
+        self.lettre_tour: List[float] = []
+        self.messages = 0
+        self.erreurs: Dict[str, int] = {}
+        self.parties_finies = 0
+        self.reconnexions = 0
+
+    def erreur(self, nature: str):
+        self.erreurs[nature] = self.erreurs.get(nature, 0) + 1
+
+    @staticmethod
+    def _centiles(valeurs: List[float]) -> dict:
+        if not valeurs:
+            return {}
+        tri = sorted(valeurs)
+        rang = lambda q: tri[min(len(tri) - 1, int(len(tri) * q))]
+        return {
+            "n": len(tri),
+            "p50_ms": round(rang(0.50) * 1000, 1),
+            "p95_ms": round(rang(0.95) * 1000, 1),
+            "p99_ms": round(rang(0.99) * 1000, 1),
+            "max_ms": round(tri[-1] * 1000, 1),
+        }
+
+    def resume(self, duree_montee: float) -> dict:
+        duree = time.perf_counter() - self.debut
+        return {
+            "duree_s": round(duree, 1),
+            "connexions": {
+                "tentatives": self.tentatives,
+                "acceptees": self.acceptees,
+                "refusees": self.refusees,
+                "acceptees_par_s_montee": round(self.acceptees / duree_montee, 1) if duree_montee else None,
+                "handshake": self._centiles(self.handshake),
+                "reconnexions": self.reconnexions,
+            },
+            "lettre_vers_nouveau_tour": self._centiles(self.lettre_tour),
+            "messages_recus": self.messages,
+            "messages_par_s": round(self.messages / duree) if duree else None,
+            "parties_finies": self.parties_finies,
+            "erreurs": self.erreurs,
+        }
+
+# ──────────────────────────────────────────────────────────────
+#  JOUEUR SIMULÉ
+# ──────────────────────────────────────────────────────────────
+
+class Joueur:
+    """Un client WebSocket : reconstruit l'état (snapshot + deltas) et joue
+    quand c'est son tour, comme index.html."""
+
+    def __init__(self, charge: "Charge", room_id: str, jid: str, rng: random.Random):
+        self.charge = charge
+        self.room_id = room_id
+        self.jid = jid
+        self.rng = rng
+        self.etat: dict = {}
+        self.rev = 0
+        self.ws = None
+        self.envoi_lettre: Optional[float] = None
+        self.action: Optional[asyncio.Task] = None
+        self.fini = asyncio.Event()
+
+    @property
+    def url(self) -> str:
+        base = self.charge.args.url.replace("http", "ws", 1)
+        return f"{base}/ws/{self.room_id}/{quote(self.jid)}/{quote('Charge ' + self.jid[-4:])}"
+
+    async def connecter(self) -> bool:
+        mesures = self.charge.mesures
+        mesures.tentatives += 1
+        debut = time.perf_counter()
+        try:
+            self.ws = await websockets.connect(self.url, open_timeout=30, max_queue=None)
+        except Exception as e:
+            mesures.refusees += 1
+            mesures.erreur(type(e).__name__)
+            return False
+        mesures.handshake.append(time.perf_counter() - debut)
+        mesures.acceptees += 1
+        return True
+
+    # ── État local ────────────────────────────────────────────
+
+    def fusionner(self, msg: dict):
+        if "snapshot" in msg:
+            self.etat = dict(msg["snapshot"])
+            self.rev = msg["rev"]
+        elif "maj" in msg and msg["rev"] > self.rev:
+            maj = msg["maj"]
+            for cle, valeur in maj.items():
+                if cle not in ("pays_joues_depuis", "pays_joues_ajout"):
+                    self.etat[cle] = valeur
+            if "pays_joues_ajout" in maj:
+                self.etat["pays_joues"] = (
+                    self.etat.get("pays_joues", [])[:maj["pays_joues_depuis"]] + maj["pays_joues_ajout"]
+                )
+            self.rev = msg["rev"]
+
+    # ── Boucle ────────────────────────────────────────────────
+
+    async def jouer(self):
+        while not self.fini.is_set():
+            try:
+                async for brut in self.ws:
+                    msg = json.loads(brut)
+                    self.charge.mesures.messages += 1
+                    self.fusionner(msg)
+                    await self.reagir(msg)
+                    if msg.get("type") == "fin_partie":
+                        self.fini.set()
+                        break
+            except websockets.ConnectionClosed:
+                pass
+            if self.fini.is_set() or self.charge.arret.is_set():
+                break
+            # Déconnexion provoquée (churn) ou subie : on revient
+            await asyncio.sleep(self.rng.uniform(*self.charge.args.reconnexion))
+            self.charge.mesures.reconnexions += 1
+            if not await self.connecter():
+                break
+        self.fini.set()
+        if self.action:
+            self.action.cancel()
+        if self.ws:
+            await self.ws.close()
+
+    async def reagir(self, msg: dict):
+        type_ = msg.get("type")
+        if type_ == "nouveau_tour" and self.envoi_lettre is not None:
+            self.charge.mesures.lettre_tour.append(time.perf_counter() - self.envoi_lettre)
+            self.envoi_lettre = None
+        if type_ == "erreur":
+            self.charge.mesures.erreur("refus_serveur")
+
+        if type_ == "langue_au_chat" and msg.get("interpelle") == self.jid:
+            self._planifier(self.repondre_langue_au_chat())
+        elif type_ in ("nouveau_tour", "partie_demarree", "etat") \
+                and self.etat.get("etat") == "en_cours" \
+                and self.etat.get("joueur_actuel") == self.jid \
+                and not self.etat.get("en_attente_langue_au_chat"):
+            self._planifier(self.jouer_tour())
+
+    def _planifier(self, coro):
+        if self.action and not self.action.done():
+            self.action.cancel()
+        self.action = asyncio.ensure_future(coro)
+
+    async def _envoyer(self, data: dict):
+        try:
+            await self.ws.send(json.dumps(data))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def jouer_tour(self):
+        args = self.charge.args
+        await asyncio.sleep(self.charge.reflexion(self.rng))
+        seq = self.etat.get("sequence", "")
+        if seq and self.rng.random() < args.langue_au_chat:
+            await self._envoyer({"action": "langue_au_chat"})
+            return
+        lettre = self.charge.lettre_suivante(seq, self.etat, self.rng)
+        if lettre is None:
+            return   # piégé : on laisse filer le chrono
+        self.envoi_lettre = time.perf_counter()
+        await self._envoyer({"action": "lettre", "lettre": lettre})
+        if self.rng.random() < args.churn:
+            await self.ws.close()
+
+    async def repondre_langue_au_chat(self):
+        await asyncio.sleep(self.charge.reflexion(self.rng))
+        pays = self.charge.pays_commencant(self.etat.get("sequence", ""), self.etat, self.rng)
+        await self._envoyer({"action": "reponse_langue_au_chat", "pays": pays or "Atlantide"})
+
+    async def bavarder(self):
+        """Messages de chat, processus de Poisson de débit `--chat` par minute."""
+        taux = self.charge.args.chat / 60.0
+        if taux <= 0:
+            return
+        while not self.fini.is_set():
+            await asyncio.sleep(self.rng.expovariate(taux))
+            if self.ws is not None and not self.fini.is_set():
+                await self._envoyer({"action": "chat", "texte": "gg"})
+
+# ──────────────────────────────────────────────────────────────
+#  ORCHESTRATION
+# ──────────────────────────────────────────────────────────────
+
+class Charge:
+    def __init__(self, args):
+        self.args = args
+        self.mesures = Mesures()
+        self.reflexion = profil_reflexion(args.profil)
+        self.arret = asyncio.Event()
+        dossier = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(dossier, f"pays_{args.langue}.json"), encoding="utf-8") as f:
+            self.index = IndexLexique(json.load(f))
+
+    # ── Choix des coups (même lexique que le serveur) ─────────
+
+    def _suites(self, seq: str, etat: dict) -> List[dict]:
+        joues = {p["nom_normalise"] for p in etat.get("pays_joues", [])}
+        return [p for p in self.index.chercher(seq, self.args.mode_mixte)
+                if p["nom_normalise"] not in joues]
+
+    def lettre_suivante(self, seq: str, etat: dict, rng: random.Random) -> Optional[str]:
+        cles = [
+            p["nom_normalise"] if p["type"] == "pays" else p["capitale_normalisee"]
+            for p in self._suites(seq, etat)
+        ]
+        cles = [c for c in cles if len(c) > len(seq)]
+        return rng.choice(cles)[len(seq)] if cles else None
+
+    def pays_commencant(self, seq: str, etat: dict, rng: random.Random) -> Optional[str]:
+        suites = self._suites(seq, etat)
+        return rng.choice(suites)["nom"] if suites else None
+
+    # ── HTTP ──────────────────────────────────────────────────
+
+    async def _http(self, methode: str, chemin: str, corps: Optional[dict] = None) -> dict:
+        def envoyer():
+            requete = urllib.request.Request(
+                self.args.url + chemin, method=methode,
+                data=json.dumps(corps).encode() if corps is not None else None,
+                headers={"Content-Type": "application/json"},
+            )
+            with urllib.request.urlopen(requete, timeout=30) as r:
+                return json.loads(r.read())
+        return await asyncio.to_thread(envoyer)
+
+    # ── Une room, partie après partie ─────────────────────────
+
+    async def animer_room(self, numero: int, depart: float):
+        rng = random.Random(self.args.graine * 100003 + numero)
+        await asyncio.sleep(depart)
+        while not self.arret.is_set():
+            try:
+                room_id = (await self._http("POST", "/parties", {
+                    "langue": self.args.langue, "vies": self.args.vies,
+                    "temps": self.args.temps, "mode_mixte": self.args.mode_mixte,
+                }))["room_id"]
+            except Exception as e:
+                self.mesures.erreur(f"creation:{type(e).__name__}")
+                await asyncio.sleep(1.0)
+                continue
+
+            joueurs = [Joueur(self, room_id, f"c{numero}_{k}_{rng.randrange(10**6)}", rng)
+                       for k in range(self.args.joueurs)]
+            connectes = [j for j in joueurs if await j.connecter()]
+            if not connectes:
+                await asyncio.sleep(1.0)
+                continue
+            taches = [asyncio.ensure_future(j.jouer()) for j in connectes]
+            taches += [asyncio.ensure_future(j.bavarder()) for j in connectes]
+            try:
+                for _ in range(self.args.ia):
+                    await self._http("POST", f"/parties/{room_id}/ia")
+                await self._http("POST", f"/parties/{room_id}/demarrer?joueur_id={quote(connectes[0].jid)}")
+            except Exception as e:
+                self.mesures.erreur(f"demarrage:{type(e).__name__}")
+
+            attente = asyncio.gather(*(j.fini.wait() for j in connectes))
+            arret = asyncio.ensure_future(self.arret.wait())
+            await asyncio.wait([attente, arret], return_when=asyncio.FIRST_COMPLETED)
+            if not arret.done():
+                arret.cancel()
+                self.mesures.parties_finies += 1
+            for j in connectes:
+                j.fini.set()
+                if j.ws:
+                    await j.ws.close()
+            for tache in taches:
+                tache.cancel()
+
+    async def lancer(self) -> dict:
+        montee = self.args.montee
+        rooms = [
+            asyncio.ensure_future(self.animer_room(k, montee * k / max(1, self.args.rooms)))
+            for k in range(self.args.rooms)
+        ]
+        await asyncio.sleep(self.args.duree)
+        self.arret.set()
+        await asyncio.wait(rooms, timeout=10)
+        for tache in rooms:
+            tache.cancel()
+        return self.mesures.resume(montee)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Générateur de charge WebSocket Pays Game")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--joueurs", type=int, default=3, help="clients WebSocket par room")
+    parser.add_argument("--ia", type=int, default=0, help="IA ajoutées par room")
+    parser.add_argument("--profil", default="humain", help="rapide | humain | lent | fixe:SECONDES")
+    parser.add_argument("--chat", type=float, default=1.0, help="messages de chat par joueur et par minute")
+    parser.add_argument("--churn", type=float, default=0.02, help="probabilité de déconnexion après une lettre")
+    parser.add_argument("--reconnexion", type=float, nargs=2, default=(0.5, 3.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--langue-au-chat", type=float, default=0.05, help="probabilité par tour")
+    parser.add_argument("--langue", default="fr")
+    parser.add_argument("--vies", type=int, default=3)
+    parser.add_argument("--temps", type=int, default=15)
+    parser.add_argument("--mode-mixte", action="store_true")
+    parser.add_argument("--montee", type=float, default=10.0, help="étalement des connexions (s)")
+    parser.add_argument("--duree", type=float, default=60.0)
+    parser.add_argument("--graine", type=int, default=1)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(Charge(args).lancer()), indent=2, ensure_ascii=False))
@@ -0,0 +1,93 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Cycle de vie des rooms                 ║
+║   Dernière activité par room, expiration par état            ║
+║                                                              ║
+║  Une OrderedDict par état (attente, en_cours, terminee) :    ║
+║  toute activité replace la room en fin de file, les plus     ║
+║  anciennes sont en tête. Un balayage ne lit donc que les     ║
+║  rooms réellement expirées, jamais toute la liste.           ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Durées d'inactivité par défaut (secondes) avant expiration
+TTL_DEFAUT = {
+    "attente":  1800.0,   # lobby que personne ne rejoint ni ne lance
+    "en_cours": 900.0,    # partie dont plus personne ne joue
+    "terminee": 300.0,    # tableau final encore consultable
+}
+
+# ──────────────────────────────────────────────────────────────
+#  CYCLE DE VIE
+# ──────────────────────────────────────────────────────────────
+
+class CycleVie:
+    """`toucher` à chaque activité (O(1)), `expirees` au balayage
+    (O(rooms expirées)). Une room change de file quand son état change."""
+
+    def __init__(self, ttl: Optional[Dict[str, float]] = None,
+                 horloge: Callable[[], float] = time.monotonic):
+        self.ttl = dict(TTL_DEFAUT if ttl is None else ttl)
+        self.horloge = horloge
+        self.files: Dict[str, "OrderedDict[str, float]"] = {etat: OrderedDict() for etat in self.ttl}
+        self.etat_de: Dict[str, str] = {}
+
+    def toucher(self, room_id: str, etat: str):
+        """Activité de la room maintenant, dans l'état `etat`."""
+        ancien = self.etat_de.get(room_id)
+        if ancien is not None and ancien != etat:
+            del self.files[ancien][room_id]
+        file = self.files.get(etat)
+        if file is None:
+            file = self.files[etat] = OrderedDict()
+        file[room_id] = self.horloge()
+        file.move_to_end(room_id)
+        self.etat_de[room_id] = etat
+
+    def a_change(self, room_id: str, etat: str) -> bool:
+        return self.etat_de.get(room_id) != etat
+
+    def retirer(self, room_id: str):
+        etat = self.etat_de.pop(room_id, None)
+        if etat is not None:
+            self.files[etat].pop(room_id, None)
+
+    def expirees(self, maintenant: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Retire et renvoie (room_id, état) des rooms inactives depuis
+        plus que le TTL de leur état (états sans TTL : jamais)."""
+        maintenant = self.horloge() if maintenant is None else maintenant
+        sorties = []
+        for etat, file in self.files.items():
+            ttl = self.ttl.get(etat)
+            if ttl is None:
+                continue
+            while file:
+                room_id, derniere = next(iter(file.items()))
+                if derniere + ttl > maintenant:
+                    break
+                del file[room_id]
+                del self.etat_de[room_id]
+                sorties.append((room_id, etat))
+        return sorties
+
+    def taille(self) -> Dict[str, int]:
+        return {etat: len(file) for etat, file in self.files.items()}
+
+    def __len__(self) -> int:
+        return len(self.etat_de)
+
+
+def cycle_depuis_env() -> CycleVie:
+    """PAYS_TTL_ATTENTE / PAYS_TTL_EN_COURS / PAYS_TTL_TERMINEE (secondes)."""
+    ttl = {
+        etat: float(os.environ.get(f"PAYS_TTL_{etat.upper()}", defaut))
+        for etat, defaut in TTL_DEFAUT.items()
+    }
+    return CycleVie(ttl)
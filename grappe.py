@@ -0,0 +1,371 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Grappe de workers                      ║
+║   Affinité room → worker par hachage cohérent                ║
+║                                                              ║
+║  Chaque room vit dans un seul worker. Les autres relaient    ║
+║  HTTP et WebSocket vers lui.                                 ║
+║                                                              ║
+║  Registre local (un par grappe) :                            ║
+║    python grappe.py --hote 127.0.0.1 --port 8500             ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+# ──────────────────────────────────────────────────────────────
+#  ANNEAU DE HACHAGE COHÉRENT
+# ──────────────────────────────────────────────────────────────
+
+def _hacher(cle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(cle.encode(), digest_size=8).digest(), "big")
+
+
+class AnneauCoherent:
+    """Anneau de hachage avec `repliques` points virtuels par nœud.
+
+    Ajouter ou retirer un worker ne déplace qu'environ 1/N des rooms.
+    """
+
+    def __init__(self, noeuds=(), repliques: int = 64):
+        self.repliques = repliques
+        self._points: List[int] = []
+        self._noeuds_points: List[str] = []
+        self._noeuds: set = set()
+        for noeud in noeuds:
+            self.ajouter(noeud)
+
+    @property
+    def noeuds(self) -> List[str]:
+        return sorted(self._noeuds)
+
+    def ajouter(self, noeud: str):
+        if noeud in self._noeuds:
+            return
+        self._noeuds.add(noeud)
+        for r in range(self.repliques):
+            point = _hacher(f"{noeud}#{r}")
+            k = bisect.bisect(self._points, point)
+            self._points.insert(k, point)
+            self._noeuds_points.insert(k, noeud)
+
+    def retirer(self, noeud: str):
+        if noeud not in self._noeuds:
+            return
+        self._noeuds.discard(noeud)
+        garder = [k for k, n in enumerate(self._noeuds_points) if n != noeud]
+        self._points = [self._points[k] for k in garder]
+        self._noeuds_points = [self._noeuds_points[k] for k in garder]
+
+    def proprietaire(self, cle: str) -> Optional[str]:
+        if not self._points:
+            return None
+        k = bisect.bisect(self._points, _hacher(cle)) % len(self._points)
+        return self._noeuds_points[k]
+
+    def __len__(self) -> int:
+        return len(self._noeuds)
+
+# ──────────────────────────────────────────────────────────────
+#  REGISTRE DES WORKERS
+# ──────────────────────────────────────────────────────────────
+
+class RegistreMemoire:
+    """Registre en mémoire : sert de doublure dans les tests et de cœur au
+    processus registre. Un worker absent plus de `ttl` secondes est oublié.
+
+    Vue renvoyée : {worker_id: {"url": ..., "rooms": [...], "ouvertes": [...]}}
+    """
+
+    def __init__(self, ttl: float = 10.0):
+        self.ttl = ttl
+        self._workers: Dict[str, dict] = {}
+
+    async def inscrire(self, worker_id: str, url: str,
+                       rooms: List[str], ouvertes: List[dict]) -> Dict[str, dict]:
+        """Inscription et battement de cœur : publie les rooms du worker et
+        renvoie la vue de toute la grappe."""
+        maintenant = time.monotonic()
+        self._workers[worker_id] = {
+            "url": url, "rooms": rooms, "ouvertes": ouvertes, "vu": maintenant,
+        }
+        for wid in [w for w, info in self._workers.items() if maintenant - info["vu"] > self.ttl]:
+            del self._workers[wid]
+        return {
+            wid: {k: v for k, v in info.items() if k != "vu"}
+            for wid, info in self._workers.items()
+        }
+
+    async def retirer(self, worker_id: str):
+        self._workers.pop(worker_id, None)
+
+
+class ServeurRegistre:
+    """Expose un `RegistreMemoire` en TCP, une requête JSON par ligne."""
+
+    def __init__(self, registre: Optional[RegistreMemoire] = None):
+        self.registre = registre or RegistreMemoire()
+
+    async def _servir(self, lecteur: asyncio.StreamReader, ecrivain: asyncio.StreamWriter):
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                try:
+                    requete = json.loads(ligne)
+                    op = requete.pop("op")
+                    if op == "inscrire":
+                        reponse = {"ok": True, "vue": await self.registre.inscrire(**requete)}
+                    elif op == "retirer":
+                        await self.registre.retirer(**requete)
+                        reponse = {"ok": True}
+                    else:
+                        reponse = {"ok": False, "erreur": f"op inconnue : {op}"}
+                except Exception as e:
+                    reponse = {"ok": False, "erreur": str(e)}
+                ecrivain.write(json.dumps(reponse).encode() + b"\n")
+                await ecrivain.drain()
+        finally:
+            ecrivain.close()
+
+    async def lancer(self, hote: str = "127.0.0.1", port: int = 8500):
+        serveur = await asyncio.start_server(self._servir, hote, port)
+        print(f"[registre] à l'écoute sur {hote}:{port}")
+        async with serveur:
+            await serveur.serve_forever()
+
+
+class ClientRegistre:
+    """Même interface que `RegistreMemoire`, via le processus registre."""
+
+    def __init__(self, hote: str, port: int, delai: float = 2.0):
+        self.hote = hote
+        self.port = port
+        self.delai = delai
+
+    async def _requete(self, **requete) -> dict:
+        lecteur, ecrivain = await asyncio.wait_for(
+            asyncio.open_connection(self.hote, self.port), self.delai)
+        try:
+            ecrivain.write(json.dumps(requete).encode() + b"\n")
+            await ecrivain.drain()
+            reponse = json.loads(await asyncio.wait_for(lecteur.readline(), self.delai))
+        finally:
+            ecrivain.close()
+        if not reponse.get("ok"):
+            raise RuntimeError(reponse.get("erreur", "réponse invalide"))
+        return reponse
+
+    async def inscrire(self, worker_id: str, url: str,
+                       rooms: List[str], ouvertes: List[dict]) -> Dict[str, dict]:
+        reponse = await self._requete(op="inscrire", worker_id=worker_id, url=url,
+                                      rooms=rooms, ouvertes=ouvertes)
+        return reponse["vue"]
+
+    async def retirer(self, worker_id: str):
+        await self._requete(op="retirer", worker_id=worker_id)
+
+# ──────────────────────────────────────────────────────────────
+#  GRAPPE (VUE D'UN WORKER)
+# ──────────────────────────────────────────────────────────────
+
+class Grappe:
+    """Vue locale de la grappe, rafraîchie à chaque battement.
+
+    Une room déjà publiée par un worker reste chez lui même si l'anneau
+    change ; sinon l'anneau désigne le propriétaire. Si le registre est
+    injoignable, la dernière vue connue est conservée.
+    """
+
+    def __init__(self, worker_id: str, url: str, registre,
+                 intervalle: float = 2.0, repliques: int = 64):
+        self.worker_id = worker_id
+        self.url = url.rstrip("/")
+        self.registre = registre
+        self.intervalle = intervalle
+        self.anneau = AnneauCoherent([worker_id], repliques)
+        self.vue: Dict[str, dict] = {worker_id: {"url": self.url, "rooms": [], "ouvertes": []}}
+        self._emplacements: Dict[str, str] = {}
+
+    # ── Routage ───────────────────────────────────────────────
+
+    def proprietaire(self, room_id: str) -> str:
+        return self._emplacements.get(room_id) or self.anneau.proprietaire(room_id) or self.worker_id
+
+    def est_local(self, room_id: str) -> bool:
+        return self.proprietaire(room_id) == self.worker_id
+
+    def url_distante(self, room_id: str) -> Optional[str]:
+        """URL du worker propriétaire, None si c'est ce worker."""
+        wid = self.proprietaire(room_id)
+        if wid == self.worker_id or wid not in self.vue:
+            return None
+        return self.vue[wid]["url"]
+
+    def rooms_ouvertes_distantes(self) -> List[dict]:
+        return [
+            room
+            for wid, info in self.vue.items() if wid != self.worker_id
+            for room in info["ouvertes"]
+        ]
+
+    # ── Battement ─────────────────────────────────────────────
+
+    async def battement(self, rooms: List[str], ouvertes: List[dict]):
+        try:
+            vue = await self.registre.inscrire(self.worker_id, self.url, rooms, ouvertes)
+        except Exception as e:
+            print(f"[grappe ERROR] registre injoignable : {e!r}")
+            return
+        for wid in set(self.anneau.noeuds) - set(vue):
+            self.anneau.retirer(wid)
+        for wid in vue:
+            self.anneau.ajouter(wid)
+        self.vue = vue
+        self._emplacements = {
+            room_id: wid for wid, info in vue.items() for room_id in info["rooms"]
+        }
+
+    async def boucle(self, publier: Callable[[], Tuple[List[str], List[dict]]]):
+        """`publier()` renvoie (ids des rooms locales, résumés des rooms ouvertes)."""
+        while True:
+            await self.battement(*publier())
+            await asyncio.sleep(self.intervalle)
+
+    async def quitter(self):
+        try:
+            await self.registre.retirer(self.worker_id)
+        except Exception as e:
+            print(f"[grappe ERROR] retrait impossible : {e!r}")
+
+
+def grappe_depuis_env() -> Optional[Grappe]:
+    """Mode grappe si PAYS_REGISTRE (hote:port) est défini, sinon None.
+
+    PAYS_WORKER_URL : adresse interne de ce worker (ex. http://10.0.0.2:8001)
+    PAYS_WORKER_ID  : identifiant stable (par défaut l'URL)
+    """
+    adresse = os.environ.get("PAYS_REGISTRE")
+    if not adresse:
+        return None
+    hote, _, port = adresse.rpartition(":")
+    url = os.environ.get("PAYS_WORKER_URL", "http://127.0.0.1:8000")
+    return Grappe(os.environ.get("PAYS_WORKER_ID", url), url, ClientRegistre(hote, int(port)))
+
+# ──────────────────────────────────────────────────────────────
+#  RELAIS VERS LE WORKER PROPRIÉTAIRE
+# ──────────────────────────────────────────────────────────────
+
+def _marquer_relaye(query: str) -> str:
+    # Empêche un second relais si les vues des deux workers divergent
+    return f"{query}&relaye=1" if query else "relaye=1"
+
+
+async def relayer_http(methode: str, url: str, query: str, corps: bytes,
+                       type_contenu: Optional[str]) -> Tuple[int, bytes, str]:
+    """Rejoue la requête chez le propriétaire (urllib dans un thread)."""
+    requete = urllib.request.Request(
+        f"{url}?{_marquer_relaye(query)}", data=corps or None, method=methode,
+        headers={"Content-Type": type_contenu} if type_contenu else {},
+    )
+
+    def envoyer():
+        try:
+            with urllib.request.urlopen(requete, timeout=10) as r:
+                return r.status, r.read(), r.headers.get("Content-Type", "application/json")
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers.get("Content-Type", "application/json")
+
+    return await asyncio.to_thread(envoyer)
+
+
+async def relayer_websocket(client, url: str, query: str, delai: float = 10.0):
+    """Relie un WebSocket Starlette (pas encore accepté) au WebSocket du
+    propriétaire. Pour une connexion relayée, le propriétaire accepte avant
+    de refuser (un refus de poignée de main n'arriverait ici qu'en HTTP
+    403) : le client n'est accepté qu'au premier message, et un refus lui
+    est répercuté avec le code du propriétaire (4001, 4003, 4009…). Ensuite
+    le code de fermeture (4008…) est transmis."""
+    if websockets is None:
+        await client.close(code=1011, reason="Relais indisponible")
+        return
+    url_ws = "ws" + url[len("http"):] if url.startswith("http") else url
+    try:
+        amont = await websockets.connect(f"{url_ws}?{_marquer_relaye(query)}")
+    except websockets.InvalidHandshake:
+        # Refus HTTP (403…) : le code d'origine n'a pas traversé
+        await client.close(code=1008, reason="Refusé par le worker propriétaire")
+        return
+    except Exception as e:
+        print(f"[grappe ERROR] relais WS vers {url} : {e!r}")
+        await client.close(code=1011, reason="Worker injoignable")
+        return
+    try:
+        premier = await asyncio.wait_for(amont.recv(), delai)
+    except websockets.ConnectionClosed:
+        await client.close(code=amont.close_code or 1011, reason=amont.close_reason or "")
+        return
+    except asyncio.TimeoutError:
+        await amont.close()
+        await client.close(code=1011, reason="Worker muet")
+        return
+    await client.accept()
+    if isinstance(premier, bytes):
+        await client.send_bytes(premier)
+    else:
+        await client.send_text(premier)
+
+    async def montant():
+        while True:
+            message = await client.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            await amont.send(message.get("text") or message.get("bytes"))
+
+    async def descendant():
+        async for message in amont:
+            if isinstance(message, bytes):
+                await client.send_bytes(message)
+            else:
+                await client.send_text(message)
+
+    taches = [asyncio.ensure_future(montant()), asyncio.ensure_future(descendant())]
+    try:
+        await asyncio.wait(taches, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for tache in taches:
+            tache.cancel()
+        await amont.close()
+        code = getattr(amont, "close_code", None) or 1000
+        raison = getattr(amont, "close_reason", None) or ""
+        try:
+            await client.close(code=code, reason=raison)
+        except Exception:
+            pass  # client déjà parti
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Registre de la grappe Pays Game")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--ttl", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(ServeurRegistre(RegistreMemoire(args.ttl)).lancer(args.hote, args.port))
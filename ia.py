@@ -0,0 +1,209 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Service IA                             ║
+║   Décisions des IA de toutes les rooms, évaluées par lots    ║
+║                                                              ║
+║  Chaque room dépose sa demande et attend ; les demandes d'un ║
+║  même tour de boucle sont traitées ensemble, groupées par    ║
+║  lexique et mode. Avec NumPy : masques booléens sur tout le  ║
+║  lexique (préfixe, déjà joué, longueur), par paquets de 64.  ║
+║  Sans : parcours du trie, demande par demande.               ║
+║                                                              ║
+║  Le service ne tire aucun hasard : chaque room garde son     ║
+║  `rng`, le rejeu reste déterministe.                         ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lexique import TYPE_CAPITALE, IndexLexique
+from solveur import Solveur
+
+try:
+    import numpy as np  # évaluation vectorisée, optionnelle
+except ImportError:
+    np = None
+
+# Demandes évaluées ensemble au plus : la mémoire d'un passage NumPy est
+# en TAILLE_PAQUET × taille du lexique, quelle que soit la charge.
+TAILLE_PAQUET = 64
+
+# ──────────────────────────────────────────────────────────────
+#  DEMANDES & DÉCISIONS
+# ──────────────────────────────────────────────────────────────
+
+class Decision:
+    """`nb_possibles` : pays non joués sous la séquence (0 : IA piégée).
+    `gagnantes` : lettres gagnantes du solveur (si le coup optimal a été
+    demandé). `lettres` : lettre suivante de chaque pays visé par
+    l'heuristique, dans l'ordre du lexique — l'appelant en tire une."""
+
+    __slots__ = ("nb_possibles", "gagnantes", "lettres")
+
+    def __init__(self, nb_possibles: int, gagnantes: List[str], lettres: List[str]):
+        self.nb_possibles = nb_possibles
+        self.gagnantes = gagnantes
+        self.lettres = lettres
+
+
+class _Demande:
+    __slots__ = ("index", "solveur", "seq", "joues", "nb_joueurs", "optimal", "futur")
+
+    def __init__(self, index, solveur, seq, joues, nb_joueurs, optimal, futur):
+        self.index = index
+        self.solveur = solveur
+        self.seq = seq
+        self.joues = joues
+        self.nb_joueurs = nb_joueurs
+        self.optimal = optimal
+        self.futur = futur
+
+# ──────────────────────────────────────────────────────────────
+#  ÉVALUATION
+# ──────────────────────────────────────────────────────────────
+
+def _lettres_trie(index: IndexLexique, mode_mixte: bool, seq: str,
+                  joues: Sequence[int]) -> Tuple[int, List[str]]:
+    """Repli sans NumPy : postings du nœud de `seq`."""
+    n = index.noeud(seq)
+    if n < 0:
+        return 0, []
+    d = len(seq)
+    joues = set(joues)
+    if mode_mixte:
+        codes = index.postings_mixtes[index.mixtes_debut[n]:index.mixtes_fin[n]]
+        cles = [index.capitales[c >> 1] if c & 1 == TYPE_CAPITALE else index.noms[c >> 1]
+                for c in codes if c >> 1 not in joues]
+    else:
+        cles = [index.noms[i] for i in index.postings_noms[index.noms_debut[n]:index.noms_fin[n]]
+                if i not in joues]
+    return len(cles), _viser(cles, d)
+
+
+def _viser(cles: List[str], d: int) -> List[str]:
+    """Heuristique : viser un pays qui ne se termine pas à la lettre suivante."""
+    longues = [c[d] for c in cles if len(c) > d + 1]
+    return longues or [c[d] for c in cles if len(c) > d]
+
+
+class _Matrices:
+    """Clés d'un lexique en matrice d'octets (une ligne par pays)."""
+
+    def __init__(self, index: IndexLexique):
+        noms, caps = list(index.noms), list(index.capitales)
+        largeur = max(len(c) for c in noms + caps) + 1
+        self.largeur = largeur
+        self.noms, self.long_noms = self._matrice(noms, largeur)
+        self.caps, self.long_caps = self._matrice(caps, largeur)
+
+    @staticmethod
+    def _matrice(cles: List[str], largeur: int):
+        m = np.zeros((len(cles), largeur), dtype=np.uint8)
+        for i, c in enumerate(cles):
+            m[i, :len(c)] = np.frombuffer(c.encode("ascii"), dtype=np.uint8)
+        return m, np.array([len(c) for c in cles], dtype=np.int32)
+
+    def prefixes(self, cles, longueurs, seqs, d):
+        """(B × n) : la clé de chaque pays commence par la séquence b.
+        Comparaison colonne par colonne, jusqu'à la plus longue séquence :
+        aucun tableau B × n × largeur n'est construit."""
+        egal = longueurs[None, :] >= d[:, None]
+        for j in range(int(d.max())):
+            egal &= (cles[None, :, j] == seqs[:, j, None]) | (d <= j)[:, None]
+        return egal
+
+
+def _lettres_numpy(matrices: _Matrices, mode_mixte: bool,
+                   demandes: List[_Demande]) -> List[Tuple[int, List[str]]]:
+    """Toutes les demandes d'un lexique et d'un mode en un passage."""
+    b, largeur = len(demandes), matrices.largeur
+    seqs = np.zeros((b, largeur), dtype=np.uint8)
+    d = np.zeros(b, dtype=np.int32)
+    joues = np.zeros((b, len(matrices.long_noms)), dtype=bool)
+    for k, dem in enumerate(demandes):
+        s = dem.seq[:largeur - 1]
+        seqs[k, :len(s)] = np.frombuffer(s.encode("ascii"), dtype=np.uint8)
+        d[k] = len(dem.seq) if len(dem.seq) < largeur else largeur   # trop long : aucun pays
+        if dem.joues:
+            joues[k, list(dem.joues)] = True
+
+    par_nom = matrices.prefixes(matrices.noms, matrices.long_noms, seqs, d)
+    par_cap = matrices.prefixes(matrices.caps, matrices.long_caps, seqs, d) & ~par_nom \
+        if mode_mixte else np.zeros_like(par_nom)
+    possibles = (par_nom | par_cap) & ~joues
+    # Longueur de la clé qui correspond (nom, sinon capitale)
+    longueurs = np.where(par_nom, matrices.long_noms[None, :], matrices.long_caps[None, :])
+    longues = possibles & (longueurs > (d[:, None] + 1))
+    suivantes = possibles & (longueurs > d[:, None])
+
+    resultats = []
+    for k in range(b):
+        vises = np.flatnonzero(longues[k]) if longues[k].any() else np.flatnonzero(suivantes[k])
+        col = min(int(d[k]), largeur - 1)
+        octets = np.where(par_nom[k, vises], matrices.noms[vises, col], matrices.caps[vises, col])
+        resultats.append((int(possibles[k].sum()), [chr(o) for o in octets.tolist()]))
+    return resultats
+
+# ──────────────────────────────────────────────────────────────
+#  SERVICE
+# ──────────────────────────────────────────────────────────────
+
+class ServiceIA:
+    """File des demandes, vidée une fois par tour de boucle."""
+
+    def __init__(self, vectoriser: Optional[bool] = None):
+        self.vectoriser = np is not None if vectoriser is None else (vectoriser and np is not None)
+        self.en_attente: List[_Demande] = []
+        self._matrices: Dict[int, _Matrices] = {}
+        self.nb_lots = 0
+        self.nb_demandes = 0
+
+    def oublier(self, index: IndexLexique):
+        """Lexique déchargé du registre : ses matrices avec lui."""
+        self._matrices.pop(id(index), None)
+
+    def decider(self, solveur: Solveur, seq: str, joues: Sequence[int],
+                nb_joueurs: int, optimal: bool) -> "asyncio.Future[Decision]":
+        boucle = asyncio.get_running_loop()
+        futur = boucle.create_future()
+        if not self.en_attente:
+            boucle.call_soon(self._traiter)
+        self.en_attente.append(_Demande(solveur.index, solveur, seq, tuple(joues),
+                                        nb_joueurs, optimal, futur))
+        return futur
+
+    def _traiter(self):
+        lot, self.en_attente = self.en_attente, []
+        self.nb_lots += 1
+        self.nb_demandes += len(lot)
+        groupes: Dict[Tuple[int, bool], List[_Demande]] = {}
+        for dem in lot:
+            groupes.setdefault((id(dem.index), dem.solveur.mode_mixte), []).append(dem)
+
+        for (_, mode_mixte), demandes in groupes.items():
+            try:
+                if self.vectoriser:
+                    index = demandes[0].index
+                    matrices = self._matrices.get(id(index))
+                    if matrices is None:
+                        matrices = self._matrices[id(index)] = _Matrices(index)
+                    heuristiques = []
+                    for k in range(0, len(demandes), TAILLE_PAQUET):
+                        heuristiques.extend(_lettres_numpy(matrices, mode_mixte,
+                                                           demandes[k:k + TAILLE_PAQUET]))
+                else:
+                    heuristiques = [_lettres_trie(dem.index, mode_mixte, dem.seq, dem.joues)
+                                    for dem in demandes]
+                for dem, (nb_possibles, lettres) in zip(demandes, heuristiques):
+                    gagnantes = dem.solveur.coups_gagnants(dem.seq, dem.joues, dem.nb_joueurs) \
+                        if dem.optimal and nb_possibles else []
+                    if not dem.futur.done():
+                        dem.futur.set_result(Decision(nb_possibles, gagnantes, lettres))
+            except Exception as e:
+                print(f"[ia ERROR] lot de {len(demandes)} demande(s) : {e!r}")
+                for dem in demandes:
+                    if not dem.futur.done():
+                        dem.futur.set_exception(e)
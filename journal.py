@@ -0,0 +1,91 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Journal des événements                 ║
+║   Toutes les commandes appliquées aux rooms, dans l'ordre    ║
+║                                                              ║
+║  Un enregistrement `marshal` par commande :                  ║
+║    (room_id, horodatage, révision, graine, commande)         ║
+║  La graine est celle du `random.Random` de la room pour      ║
+║  cette commande : le rejeu (rejouer.py) est déterministe.    ║
+║                                                              ║
+║  PAYS_JOURNAL = chemin du fichier (désactivé si absent)      ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import marshal
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+# Commande fictive ouvrant l'histoire d'une room : ("creation", config, createur_id)
+CREATION = "creation"
+
+# ──────────────────────────────────────────────────────────────
+#  ÉCRITURE
+# ──────────────────────────────────────────────────────────────
+
+class Journal:
+    """Écriture en ajout seul, mise en tampon et vidée par lot."""
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self.fichier = open(chemin, "ab")
+        self._tampon: List[bytes] = []
+
+    def ajouter(self, room_id: str, revision: int, graine: int, commande: tuple):
+        self._tampon.append(marshal.dumps((room_id, time.time(), revision, graine, commande)))
+
+    def vider(self) -> int:
+        if not self._tampon:
+            return 0
+        lot, self._tampon = self._tampon, []
+        self.fichier.write(b"".join(lot))
+        self.fichier.flush()
+        return len(lot)
+
+    def fermer(self):
+        self.vider()
+        self.fichier.close()
+
+
+class JournalInactif:
+    """Même interface, ne garde rien (comportement par défaut)."""
+
+    def ajouter(self, room_id: str, revision: int, graine: int, commande: tuple):
+        pass
+
+    def vider(self) -> int:
+        return 0
+
+    def fermer(self):
+        pass
+
+
+def journal_depuis_env():
+    chemin = os.environ.get("PAYS_JOURNAL")
+    return Journal(chemin) if chemin else JournalInactif()
+
+# ──────────────────────────────────────────────────────────────
+#  LECTURE
+# ──────────────────────────────────────────────────────────────
+
+def lire_journal(chemin: str, room_id: Optional[str] = None) -> Iterator[tuple]:
+    """Enregistrements du fichier dans l'ordre, filtrés par room si demandé.
+    Un dernier enregistrement tronqué (arrêt brutal) est ignoré."""
+    with open(chemin, "rb") as f:
+        while True:
+            try:
+                evenement = marshal.load(f)
+            except (EOFError, ValueError, TypeError):
+                return
+            if room_id is None or evenement[0] == room_id:
+                yield evenement
+
+
+def grouper_par_room(evenements) -> Dict[str, List[tuple]]:
+    rooms: Dict[str, List[tuple]] = {}
+    for evenement in evenements:
+        rooms.setdefault(evenement[0], []).append(evenement)
+    return rooms
@@ -0,0 +1,892 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Index lexical                          ║
+║   Trie compilé en tableaux plats — Python 3.10+              ║
+║                                                              ║
+║  Construit une seule fois par langue au chargement des pays. ║
+║  Toutes les recherches coûtent O(len(préfixe)).              ║
+║                                                              ║
+║  Plusieurs lexiques (langues, capitales, listes importées)   ║
+║  cohabitent dans un registre et partagent un pool de chaînes.║
+║                                                              ║
+║  Compilation (étape de build, fichiers pays_*.lex) :         ║
+║    python lexique.py pays_fr.json pays_en.json               ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+# Codes des entrées mixtes : 2 * index + TYPE_*
+TYPE_PAYS     = 0
+TYPE_CAPITALE = 1
+
+# ──────────────────────────────────────────────────────────────
+#  NORMALISATION
+# ──────────────────────────────────────────────────────────────
+
+#  Règle unique, identique au `normaliser` JS d'index.html :
+#  majuscules → NFD → on ne garde que l'ASCII, moins les espaces,
+#  tirets et apostrophes (les accents disparaissent ; chiffres et
+#  ponctuation restent). Majuscules et NFD agissant caractère par
+#  caractère, la règle se réduit à une table par code point, appliquée
+#  d'un seul `str.translate`.
+#  Corpus de conformité partagé : normalisation.json
+#  (python lexique.py --conformite).
+
+def _normaliser_caractere(c: str) -> Optional[str]:
+    d = unicodedata.normalize("NFD", c.upper())
+    garde = "".join(x for x in d if x < "\x80" and x not in " -'")
+    return garde or None   # None : supprimé par translate
+
+
+class _TableNormalisation(dict):
+    """Code point → forme normalisée ; les code points rares sont
+    calculés (et gardés) au premier passage."""
+
+    def __missing__(self, code: int) -> Optional[str]:
+        v = self[code] = _normaliser_caractere(chr(code))
+        return v
+
+
+# Latin de base, Latin-1 et Latin étendu A/B : précalculés
+_TABLE = _TableNormalisation({code: _normaliser_caractere(chr(code)) for code in range(0x250)})
+
+
+_LETTRES: Dict[str, str] = {chr(code): v or "" for code, v in _TABLE.items()}
+
+
+def normaliser_lettre(c: str) -> str:
+    """Une saisie d'un caractère : une lecture de table."""
+    v = _LETTRES.get(c)
+    return v if v is not None else normaliser(c)
+
+
+@functools.lru_cache(maxsize=4096)
+def normaliser(s: str) -> str:
+    """Supprime accents, espaces, tirets, apostrophes — aligné avec le JS client."""
+    return s.translate(_TABLE)
+
+
+def charger_pays_json(fichier: str) -> List[dict]:
+    try:
+        with open(fichier, "r", encoding="utf-8") as f:
+            pays = json.load(f)
+    except FileNotFoundError:
+        pays = [{"nom": "FRANCE", "capitale": "PARIS", "code": "fr"}]
+    for p in pays:
+        p["nom_normalise"]       = normaliser(p.get("nom_normalise") or p.get("nom", ""))
+        p["capitale_normalisee"] = normaliser(p.get("capitale_normalisee") or p.get("capitale", ""))
+    return pays
+
+# ──────────────────────────────────────────────────────────────
+#  CHAÎNES PARTAGÉES & ENTRÉES
+# ──────────────────────────────────────────────────────────────
+
+class PoolChaines:
+    """Une seule copie de chaque chaîne, pour tous les lexiques du
+    registre (« PARIS », codes pays, noms communs à plusieurs listes…)."""
+
+    __slots__ = ("chaines",)
+
+    def __init__(self):
+        self.chaines: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.chaines)
+
+    def interner(self, s: str) -> str:
+        return self.chaines.setdefault(s, s)
+
+
+_CHAMPS = ("nom", "capitale", "code", "nom_normalise", "capitale_normalisee")
+
+
+class Entree:
+    """Une entrée du lexique, vue comme pays (`type` = "pays") ou comme
+    capitale. Lecture seule et partagée : les chaînes viennent du pool.
+    Se lit aussi comme un dict (`e["nom"]`, `e.get(...)`, `{**e}`) ;
+    `en_dict()` pour la sérialisation."""
+
+    __slots__ = ("type",) + _CHAMPS
+    _CLES = ("type",) + _CHAMPS
+
+    def __init__(self, type_: str, nom: str, capitale: str, code: str,
+                 nom_normalise: str, capitale_normalisee: str):
+        self.type = type_
+        self.nom = nom
+        self.capitale = capitale
+        self.code = code
+        self.nom_normalise = nom_normalise
+        self.capitale_normalisee = capitale_normalisee
+
+    def __getitem__(self, cle: str):
+        if cle not in self._CLES:
+            raise KeyError(cle)
+        return getattr(self, cle)
+
+    def get(self, cle: str, defaut=None):
+        return getattr(self, cle) if cle in self._CLES else defaut
+
+    def keys(self):
+        return self._CLES
+
+    def en_dict(self) -> dict:
+        return {cle: getattr(self, cle) for cle in self._CLES}
+
+    def __repr__(self) -> str:
+        return f"Entree({self.type}, {self.nom!r})"
+
+
+def _entrees(valeurs: Sequence[str], pool: PoolChaines) -> tuple:
+    """(pays, capitale) pour une ligne de valeurs dans l'ordre de `_CHAMPS`."""
+    nom, capitale, code, nom_normalise, capitale_normalisee = (pool.interner(v) for v in valeurs)
+    return (Entree("pays", nom, capitale, code, nom_normalise, capitale_normalisee),
+            Entree("capitale", nom, capitale, code, nom_normalise, capitale_normalisee))
+
+# ──────────────────────────────────────────────────────────────
+#  INDEX LEXICAL
+# ──────────────────────────────────────────────────────────────
+
+class IndexLexique:
+    """Trie des noms (et capitales) normalisés d'une liste de pays.
+
+    Chaque nœud connaît les pays qui passent par lui, dans l'ordre de la
+    liste d'origine, ce qui permet de répondre sans parcourir le lexique :
+    « une suite existe ? », « correspondance exacte ? » et
+    « suite plus longue encore jouable ? ».
+
+    Les entrées renvoyées sont partagées entre tous les appels : lecture seule.
+    """
+
+    def __init__(self, pays: Iterable, pool: Optional[PoolChaines] = None):
+        pool = pool if pool is not None else PoolChaines()
+        lignes = [_entrees([str(p.get(champ) or "") for champ in _CHAMPS], pool) for p in pays]
+        self.resultats_pays      = [pays_ for pays_, _ in lignes]
+        self.resultats_capitales = [cap for _, cap in lignes]
+        self.noms      = [e.nom_normalise for e in self.resultats_pays]
+        self.capitales = [e.capitale_normalisee for e in self.resultats_pays]
+        self.source: Optional[dict] = None
+        self.infos: dict = {}
+        self._fragments: Dict[int, str] = {}
+        self._compiler()
+
+    # ── Compilation ───────────────────────────────────────────
+
+    def _compiler(self):
+        # 1. Trie temporaire à base de dicts
+        enfants: List[Dict[str, int]] = [{}]
+        noms:    List[List[int]] = [[]]
+        caps:    List[List[int]] = [[]]
+        exact_nom: List[int] = [-1]
+        exact_cap: List[int] = [-1]
+        # Nombre de clés strictement plus longues que le nœud qui y passent
+        longs_noms: List[int] = [0]
+        longs_caps: List[int] = [0]
+
+        def inserer(cle: str, i: int, postings: List[List[int]],
+                    exacts: List[int], longs: List[int]):
+            n = 0
+            postings[n].append(i)
+            for c in cle:
+                longs[n] += 1
+                suivant = enfants[n].get(c)
+                if suivant is None:
+                    suivant = len(enfants)
+                    enfants[n][c] = suivant
+                    enfants.append({})
+                    noms.append([])
+                    caps.append([])
+                    exact_nom.append(-1)
+                    exact_cap.append(-1)
+                    longs_noms.append(0)
+                    longs_caps.append(0)
+                n = suivant
+                postings[n].append(i)
+            if exacts[n] == -1:
+                exacts[n] = i
+
+        for i, nom in enumerate(self.noms):
+            inserer(nom, i, noms, exact_nom, longs_noms)
+        for i, cap in enumerate(self.capitales):
+            if cap:
+                inserer(cap, i, caps, exact_cap, longs_caps)
+
+        # 2. Renumérotation en largeur : les enfants d'un nœud sont contigus
+        #    et triés par lettre.
+        ordre: List[int] = [0]
+        premier_enfant: List[int] = []
+        for n in ordre:
+            premier_enfant.append(len(ordre))
+            ordre.extend(enfants[n][c] for c in sorted(enfants[n]))
+        nouveau = {ancien: k for k, ancien in enumerate(ordre)}
+
+        self.lettre          = array("i", [0] * len(ordre))
+        self.premier_enfant  = array("i", premier_enfant)
+        self.nb_enfants      = array("i", (len(enfants[n]) for n in ordre))
+        self.exact_nom       = array("i", (exact_nom[n] for n in ordre))
+        self.exact_cap       = array("i", (exact_cap[n] for n in ordre))
+        self.longs_noms      = array("i", (longs_noms[n] for n in ordre))
+        self.longs_caps      = array("i", (longs_caps[n] for n in ordre))
+        for n in ordre:
+            for c, e in enfants[n].items():
+                self.lettre[nouveau[e]] = ord(c)
+
+        self.postings_noms   = array("i")
+        self.postings_caps   = array("i")
+        self.postings_mixtes = array("i")
+        self.noms_debut,   self.noms_fin   = array("i"), array("i")
+        self.caps_debut,   self.caps_fin   = array("i"), array("i")
+        self.mixtes_debut, self.mixtes_fin = array("i"), array("i")
+        for n in ordre:
+            self.noms_debut.append(len(self.postings_noms))
+            self.postings_noms.extend(noms[n])
+            self.noms_fin.append(len(self.postings_noms))
+
+            self.caps_debut.append(len(self.postings_caps))
+            self.postings_caps.extend(caps[n])
+            self.caps_fin.append(len(self.postings_caps))
+
+            # Un pays n'apparaît qu'une fois : le nom l'emporte sur la capitale
+            par_nom = set(noms[n])
+            self.mixtes_debut.append(len(self.postings_mixtes))
+            self.postings_mixtes.extend(
+                2 * i + (TYPE_PAYS if i in par_nom else TYPE_CAPITALE)
+                for i in sorted(par_nom.union(caps[n]))
+            )
+            self.mixtes_fin.append(len(self.postings_mixtes))
+
+    # ── Fichier compilé ───────────────────────────────────────
+
+    @classmethod
+    def depuis_binaire(cls, chemin: str, pool: Optional[PoolChaines] = None) -> "IndexLexique":
+        """Projette un fichier `.lex` en mémoire (mmap) : les tableaux du
+        trie sont des vues sur le fichier, rien n'est recopié ni parsé.
+        Lève ValueError si le fichier n'est pas au format attendu."""
+        with open(chemin, "rb") as f:
+            carte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        sections = _lire_sections(carte)
+        meta = json.loads(bytes(sections["meta"]))
+        if meta.get("ordre_octets") != sys.byteorder:
+            raise ValueError(f"{chemin} : ordre des octets {meta.get('ordre_octets')} ≠ {sys.byteorder}")
+
+        index = cls.__new__(cls)
+        index._carte = carte
+        index.source = meta.get("source")
+        index.infos  = meta.get("infos", {})
+        index._fragments = {}
+        for nom in _TABLEAUX:
+            setattr(index, nom, sections[nom].cast("i"))
+        tables = {
+            champ: TableChaines(sections[f"off:{k}"].cast("i"), sections[f"txt:{k}"])
+            for k, champ in enumerate(meta["champs"])
+        }
+        index.noms      = tables["nom_normalise"]
+        index.capitales = tables["capitale_normalisee"]
+        lignes = LignesParesseuses([tables[champ] for champ in _CHAMPS],
+                                   pool if pool is not None else PoolChaines())
+        index.resultats_pays      = lignes.vue(0)
+        index.resultats_capitales = lignes.vue(1)
+        return index
+
+    def source_a_jour(self, fichier: str) -> bool:
+        """Le JSON d'origine n'a pas changé depuis la compilation. Taille et
+        date identiques suffisent ; sinon (copie, checkout, image…) seule
+        l'empreinte du contenu tranche."""
+        if not self.source:
+            return True
+        st = os.stat(fichier)
+        if st.st_size != self.source["taille"]:
+            return False
+        if st.st_mtime_ns == self.source["mtime_ns"]:
+            return True
+        return "empreinte" in self.source and empreinte_fichier(fichier) == self.source["empreinte"]
+
+    # ── Parcours ──────────────────────────────────────────────
+
+    def enfant(self, n: int, c: str) -> int:
+        """Nœud atteint depuis `n` par la lettre `c`, -1 si aucun."""
+        code = ord(c)
+        debut = self.premier_enfant[n]
+        lettre = self.lettre
+        for e in range(debut, debut + self.nb_enfants[n]):
+            if lettre[e] == code:
+                return e
+        return -1
+
+    def noeud(self, seq: str) -> int:
+        """Nœud atteint par `seq` (déjà normalisée), -1 si aucun."""
+        n = 0
+        for c in seq:
+            n = self.enfant(n, c)
+            if n < 0:
+                return -1
+        return n
+
+    def chemin(self, cle: str) -> List[int]:
+        """Nœuds des préfixes stricts d'une clé du lexique (racine comprise)."""
+        if not cle:
+            return []
+        noeuds = [0]
+        for c in cle[:-1]:
+            noeuds.append(self.enfant(noeuds[-1], c))
+        return noeuds
+
+    # ── Requêtes ──────────────────────────────────────────────
+
+    def indices_nom(self, nom: str) -> List[int]:
+        """Indices des pays dont le nom normalisé vaut exactement `nom`."""
+        n = self.noeud(nom)
+        if n < 0 or self.exact_nom[n] < 0:
+            return []
+        noms = self.noms
+        return [i for i in self.postings_noms[self.noms_debut[n]:self.noms_fin[n]] if noms[i] == nom]
+
+    def a_suite(self, seq: str, mode_mixte: bool) -> bool:
+        """Au moins un pays (ou une capitale) commence par `seq`."""
+        n = self.noeud(seq)
+        if n < 0:
+            return False
+        if mode_mixte:
+            return self.mixtes_fin[n] > self.mixtes_debut[n]
+        return self.noms_fin[n] > self.noms_debut[n]
+
+    def chercher(self, seq: str, mode_mixte: bool) -> List[dict]:
+        """Tous les pays dont le nom (ou la capitale) commence par `seq`."""
+        n = self.noeud(seq)
+        if n < 0:
+            return []
+        if mode_mixte:
+            resultats = (self.resultats_pays, self.resultats_capitales)
+            return [
+                resultats[code & 1][code >> 1]
+                for code in self.postings_mixtes[self.mixtes_debut[n]:self.mixtes_fin[n]]
+            ]
+        return [
+            self.resultats_pays[i]
+            for i in self.postings_noms[self.noms_debut[n]:self.noms_fin[n]]
+        ]
+
+    def exact(self, seq: str, mode_mixte: bool) -> Optional[dict]:
+        """Pays dont le nom (ou à défaut la capitale) vaut exactement `seq`."""
+        return self.exact_noeud(self.noeud(seq), mode_mixte)
+
+    def exact_noeud(self, n: int, mode_mixte: bool) -> Optional[dict]:
+        if n < 0:
+            return None
+        if self.exact_nom[n] >= 0:
+            return self.resultats_pays[self.exact_nom[n]]
+        if mode_mixte and self.exact_cap[n] >= 0:
+            return self.resultats_capitales[self.exact_cap[n]]
+        return None
+
+    @property
+    def type_codes(self) -> str:
+        """Typecode `array` des codes d'entrée et des compteurs par nœud :
+        `H` (2 octets) tant que 2 × entrées + 1 tient sur 16 bits, `I` au-delà."""
+        return "H" if 2 * len(self.noms) + 1 <= 0xFFFF else "I"
+
+    def code(self, entree: Entree) -> int:
+        """Code compact d'une entrée : 2 × indice + type (voir `entree`)."""
+        type_ = TYPE_CAPITALE if entree.type == "capitale" else TYPE_PAYS
+        return 2 * self.indices_nom(entree.nom_normalise)[0] + type_
+
+    def entree(self, code: int) -> Entree:
+        return (self.resultats_pays, self.resultats_capitales)[code & 1][code >> 1]
+
+    # ── Fragments JSON ────────────────────────────────────────
+
+    def fragment(self, code: int) -> str:
+        """`entree(code).en_dict()` en JSON compact, encodé une seule fois."""
+        texte = self._fragments.get(code)
+        if texte is None:
+            texte = self._fragments[code] = json.dumps(
+                self.entree(code).en_dict(), ensure_ascii=False, separators=(",", ":"))
+        return texte
+
+    def liste_json(self, codes: Iterable[int]) -> str:
+        """Tableau JSON des entrées `codes` : concaténation de fragments."""
+        return "[" + ",".join(map(self.fragment, codes)) + "]"
+
+    def a_suite_non_jouee(self, seq: str, mode_mixte: bool, joues: Set[str]) -> bool:
+        """Un nom (ou une capitale) strictement plus long que `seq` et dont
+        le pays n'a pas encore été joué commence par `seq`."""
+        n = self.noeud(seq)
+        if n < 0:
+            return False
+        d = len(seq)
+        noms = self.noms
+        for i in self.postings_noms[self.noms_debut[n]:self.noms_fin[n]]:
+            if len(noms[i]) > d and noms[i] not in joues:
+                return True
+        if mode_mixte:
+            caps = self.capitales
+            for i in self.postings_caps[self.caps_debut[n]:self.caps_fin[n]]:
+                if len(caps[i]) > d and noms[i] not in joues:
+                    return True
+        return False
+
+
+# ──────────────────────────────────────────────────────────────
+#  FICHIER COMPILÉ (.lex)
+# ──────────────────────────────────────────────────────────────
+#
+#  En-tête : MAGIC, version, nombre de sections, puis une entrée
+#  (nom sur 16 octets, décalage, longueur) par section. Chaque section
+#  commence sur 8 octets. Tableaux int32 dans l'ordre natif (vérifié au
+#  chargement) ; chaînes UTF-8 concaténées + table de décalages n+1.
+
+MAGIC          = b"PAYSLEX\0"
+VERSION_BINAIRE = 1
+_ENTETE  = struct.Struct("<8sII")
+_SECTION = struct.Struct("<16sQQ")
+
+_TABLEAUX = (
+    "lettre", "premier_enfant", "nb_enfants",
+    "exact_nom", "exact_cap", "longs_noms", "longs_caps",
+    "postings_noms", "postings_caps", "postings_mixtes",
+    "noms_debut", "noms_fin", "caps_debut", "caps_fin", "mixtes_debut", "mixtes_fin",
+)
+class TableChaines:
+    """Chaînes d'une colonne, décodées à la demande depuis le fichier."""
+
+    __slots__ = ("debuts", "octets")
+
+    def __init__(self, debuts: Sequence[int], octets: memoryview):
+        self.debuts = debuts
+        self.octets = octets
+
+    def __len__(self) -> int:
+        return len(self.debuts) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.octets[self.debuts[i]:self.debuts[i + 1]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class LignesParesseuses:
+    """Entrées d'un lexique projeté : chaque ligne n'est décodée (et ses
+    chaînes internées) qu'au premier accès, puis gardée."""
+
+    __slots__ = ("tables", "pool", "_cache")
+
+    def __init__(self, tables: List[TableChaines], pool: PoolChaines):
+        self.tables = tables
+        self.pool = pool
+        self._cache: List[Optional[tuple]] = [None] * len(tables[0])
+
+    def ligne(self, i: int) -> tuple:
+        r = self._cache[i]
+        if r is None:
+            r = self._cache[i] = _entrees([table[i] for table in self.tables], self.pool)
+        return r
+
+    def vue(self, type_: int) -> "VueEntrees":
+        return VueEntrees(self, type_)
+
+
+class VueEntrees:
+    """`resultats_pays` (0) ou `resultats_capitales` (1) d'un lexique projeté."""
+
+    __slots__ = ("lignes", "type_")
+
+    def __init__(self, lignes: LignesParesseuses, type_: int):
+        self.lignes = lignes
+        self.type_ = type_
+
+    def __len__(self) -> int:
+        return len(self.lignes._cache)
+
+    def __getitem__(self, i: int) -> Entree:
+        return self.lignes.ligne(i)[self.type_]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def _lire_sections(carte) -> Dict[str, memoryview]:
+    magic, version, nb = _ENTETE.unpack_from(carte, 0)
+    if magic != MAGIC:
+        raise ValueError("pas un lexique compilé")
+    if version != VERSION_BINAIRE:
+        raise ValueError(f"version {version} ≠ {VERSION_BINAIRE}")
+    vue = memoryview(carte)
+    sections = {}
+    for k in range(nb):
+        nom, debut, longueur = _SECTION.unpack_from(carte, _ENTETE.size + k * _SECTION.size)
+        sections[nom.rstrip(b"\0").decode("ascii")] = vue[debut:debut + longueur]
+    return sections
+
+
+def empreinte_fichier(chemin: str) -> str:
+    """blake2b du contenu, pour reconnaître une source recopiée à l'identique."""
+    with open(chemin, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def ecrire_binaire(pays: List, chemin: str, source: Optional[str] = None,
+                   infos: Optional[dict] = None) -> IndexLexique:
+    """Compile `pays` (déjà normalisés) et écrit le fichier `.lex`.
+    Écriture dans un fichier temporaire puis renommage atomique."""
+    index = IndexLexique(pays)
+    meta = {"champs": list(_CHAMPS), "ordre_octets": sys.byteorder, "nb": len(pays),
+            "infos": infos or {}}
+    if source:
+        st = os.stat(source)
+        meta["source"] = {"fichier": os.path.basename(source), "taille": st.st_size,
+                          "mtime_ns": st.st_mtime_ns, "empreinte": empreinte_fichier(source)}
+    pays = index.resultats_pays
+
+    blocs = [("meta", json.dumps(meta).encode("utf-8"))]
+    blocs.extend((nom, getattr(index, nom).tobytes()) for nom in _TABLEAUX)
+    for k, champ in enumerate(_CHAMPS):
+        debuts, octets = array("i", [0]), bytearray()
+        for p in pays:
+            octets += getattr(p, champ).encode("utf-8")
+            debuts.append(len(octets))
+        blocs.append((f"off:{k}", debuts.tobytes()))
+        blocs.append((f"txt:{k}", bytes(octets)))
+
+    position = _ENTETE.size + len(blocs) * _SECTION.size
+    entete, corps = [_ENTETE.pack(MAGIC, VERSION_BINAIRE, len(blocs))], []
+    for nom, donnees in blocs:
+        position += -position % 8
+        corps.append(position)
+        entete.append(_SECTION.pack(nom.encode("ascii"), position, len(donnees)))
+        position += len(donnees)
+
+    temporaire = chemin + ".tmp"
+    with open(temporaire, "wb") as f:
+        f.write(b"".join(entete))
+        for debut, (_, donnees) in zip(corps, blocs):
+            f.write(b"\0" * (debut - f.tell()))
+            f.write(donnees)
+    os.replace(temporaire, chemin)
+    return index
+
+
+def charger_fichiers(source: str, binaire: str, pool: Optional[PoolChaines] = None) -> IndexLexique:
+    """`binaire` (.lex) s'il existe et n'est pas périmé par rapport à
+    `source` (.json), sinon compilation en mémoire depuis `source`."""
+    if os.path.exists(binaire):
+        try:
+            index = IndexLexique.depuis_binaire(binaire, pool)
+            if not os.path.exists(source) or index.source_a_jour(source):
+                return index
+            print(f"[lexique] {binaire} ne correspond plus à {source} : relancer `python lexique.py {source}`")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[lexique ERROR] {binaire} illisible ({e}) : repli sur {source}")
+    return IndexLexique(charger_pays_json(source), pool)
+
+
+def charger_lexique(langue: str, dossier: str = ".", pool: Optional[PoolChaines] = None) -> IndexLexique:
+    """Lexique des pays d'une langue : pays_{langue}.lex ou .json."""
+    base = os.path.join(dossier, f"pays_{langue}")
+    return charger_fichiers(base + ".json", base + ".lex", pool)
+
+# ──────────────────────────────────────────────────────────────
+#  REGISTRE DES LEXIQUES
+# ──────────────────────────────────────────────────────────────
+
+MAX_ENTREES_LEXIQUE   = 5000
+MAX_LONGUEUR_NOM      = 64
+MAX_LEXIQUES_IMPORTES = 64   # listes importées connues à la fois
+MAX_LEXIQUES_CHARGES  = 16   # index en mémoire au-delà des lexiques intégrés
+
+
+class LimiteLexiques(ValueError):
+    """Plus de place pour un import : tous les lexiques importés servent."""
+
+
+class RegistreLexiques:
+    """Tous les lexiques connus, par id ; une room ne garde que l'id.
+
+    Un lexique n'est chargé qu'à sa première utilisation (`obtenir`), et
+    tous partagent le même `PoolChaines`. Les fichiers `<id>.json` /
+    `<id>.lex` du dossier (`PAYS_LEXIQUES`) sont découverts à la demande :
+    c'est aussi là qu'atterrissent les listes importées, ce qui les rend
+    visibles des autres workers qui partagent le dossier.
+
+    La mémoire est bornée : au plus `capacite` index chargés (LRU) et
+    `max_importes` listes importées. Ni un lexique intégré ni un lexique
+    utilisé par une room (`utilises()`) n'est retiré ; `sur_eviction`
+    prévient les caches dérivés (solveurs, livres, matrices de l'IA).
+    """
+
+    def __init__(self, dossier: Optional[str] = None, capacite: int = MAX_LEXIQUES_CHARGES,
+                 max_importes: int = MAX_LEXIQUES_IMPORTES):
+        self.dossier = dossier
+        self.pool = PoolChaines()
+        self.lexiques: "OrderedDict[str, IndexLexique]" = OrderedDict()
+        self.infos: Dict[str, dict] = {}
+        self._fabriques: Dict[str, Callable[[], IndexLexique]] = {}
+        self.capacite = capacite
+        self.max_importes = max_importes
+        self.importes: "OrderedDict[str, None]" = OrderedDict()   # ordre d'import
+        self.utilises: Callable[[], Set[str]] = set
+        self.sur_eviction: List[Callable[[str, IndexLexique], None]] = []
+
+    def declarer(self, lexique_id: str, fabrique: Callable[[], IndexLexique], **infos):
+        self._fabriques[lexique_id] = fabrique
+        self.infos[lexique_id] = {"id": lexique_id, **infos}
+
+    def existe(self, lexique_id: str) -> bool:
+        return (lexique_id in self.infos or lexique_id in self.lexiques
+                or self._fichier(lexique_id) is not None)
+
+    def obtenir(self, lexique_id: str) -> IndexLexique:
+        """Index du lexique, chargé au besoin. KeyError s'il est inconnu."""
+        index = self.lexiques.get(lexique_id)
+        if index is not None:
+            self.lexiques.move_to_end(lexique_id)
+            return index
+        fabrique = self._fabriques.get(lexique_id)
+        if fabrique is None:
+            fichier = self._fichier(lexique_id)
+            if fichier is None:
+                raise KeyError(lexique_id)
+            base = os.path.splitext(fichier)[0]
+            fabrique = lambda: charger_fichiers(base + ".json", base + ".lex", self.pool)
+        index = self.lexiques[lexique_id] = fabrique()
+        infos = self.infos.setdefault(lexique_id, {"id": lexique_id, **index.infos})
+        infos["entrees"] = len(index.resultats_pays)
+        self._reduire(garder=lexique_id)
+        return index
+
+    def _reduire(self, garder: str):
+        """Décharge les index les moins récemment utilisés au-delà de `capacite`."""
+        if len(self.lexiques) <= self.capacite:
+            return
+        utilises = self.utilises()
+        for lexique_id in list(self.lexiques):
+            if len(self.lexiques) <= self.capacite:
+                break
+            if (lexique_id != garder and lexique_id not in utilises
+                    and self.infos.get(lexique_id, {}).get("origine") != "integre"):
+                self._decharger(lexique_id)
+
+    def _decharger(self, lexique_id: str):
+        index = self.lexiques.pop(lexique_id)
+        if lexique_id not in self._fabriques:
+            self.infos.pop(lexique_id, None)   # redécouvert depuis le dossier au besoin
+        for rappel in self.sur_eviction:
+            try:
+                rappel(lexique_id, index)
+            except Exception as e:
+                print(f"[lexique ERROR] éviction de {lexique_id} : {e!r}")
+
+    def oublier(self, lexique_id: str):
+        """Retire une liste importée (ses fichiers éventuels restent)."""
+        self.importes.pop(lexique_id, None)
+        self._fabriques.pop(lexique_id, None)
+        if lexique_id in self.lexiques:
+            self._decharger(lexique_id)
+        self.infos.pop(lexique_id, None)
+
+    def _faire_place(self):
+        """Oublie les imports les plus anciens qu'aucune room n'utilise."""
+        if len(self.importes) < self.max_importes:
+            return
+        utilises = self.utilises()
+        for lexique_id in list(self.importes):
+            if len(self.importes) < self.max_importes:
+                return
+            if lexique_id not in utilises:
+                self.oublier(lexique_id)
+        if len(self.importes) >= self.max_importes:
+            raise LimiteLexiques(f"trop de lexiques importés en cours d'utilisation (max {self.max_importes})")
+
+    def _fichier(self, lexique_id: str) -> Optional[str]:
+        if not self.dossier or not lexique_id.replace("_", "").isalnum():
+            return None
+        for extension in (".lex", ".json"):
+            chemin = os.path.join(self.dossier, lexique_id + extension)
+            if os.path.exists(chemin):
+                return chemin
+        return None
+
+    def lister(self) -> List[dict]:
+        ids = set(self.infos)
+        if self.dossier and os.path.isdir(self.dossier):
+            ids.update(os.path.splitext(f)[0] for f in os.listdir(self.dossier)
+                       if f.endswith((".lex", ".json")))
+        return [self.infos.get(i, {"id": i}) for i in sorted(ids)]
+
+    def importer(self, titre: str, langue: str, entrees: List[dict]) -> str:
+        """Ajoute une liste fournie par un joueur ; renvoie son id.
+        L'id dérive du contenu : deux imports identiques n'en font qu'un.
+        ValueError si la liste est vide, trop longue ou mal formée ;
+        LimiteLexiques si tous les imports conservés servent encore."""
+        if not entrees or len(entrees) > MAX_ENTREES_LEXIQUE:
+            raise ValueError(f"entre 1 et {MAX_ENTREES_LEXIQUE} entrées")
+        propres = []
+        for e in entrees:
+            nom = str(e.get("nom") or "").strip()
+            capitale = str(e.get("capitale") or "").strip()
+            if not normaliser(nom) or len(nom) > MAX_LONGUEUR_NOM or len(capitale) > MAX_LONGUEUR_NOM:
+                raise ValueError(f"entrée invalide : {e!r}")
+            propres.append({"nom": nom, "capitale": capitale, "code": str(e.get("code") or "")[:8],
+                            "nom_normalise": normaliser(nom), "capitale_normalisee": normaliser(capitale)})
+
+        empreinte = hashlib.blake2b(json.dumps(propres, sort_keys=True).encode("utf-8"), digest_size=6)
+        lexique_id = f"perso_{empreinte.hexdigest()}"
+        if self.existe(lexique_id):
+            return lexique_id
+        self._faire_place()
+        infos = {"titre": titre[:MAX_LONGUEUR_NOM], "langue": langue, "origine": "import"}
+        if self.dossier:
+            os.makedirs(self.dossier, exist_ok=True)
+            chemin = os.path.join(self.dossier, lexique_id + ".lex")
+            ecrire_binaire(propres, chemin, infos=infos)
+            self.declarer(lexique_id, lambda: IndexLexique.depuis_binaire(chemin, self.pool), **infos)
+        else:
+            self.declarer(lexique_id, lambda: IndexLexique(propres, self.pool), **infos)
+        self.importes[lexique_id] = None
+        return lexique_id
+
+
+def capitales_seules(index: IndexLexique) -> List[dict]:
+    """Lexique dérivé : les capitales deviennent les entrées à compléter."""
+    return [
+        {"nom": e.capitale, "capitale": "", "code": e.code,
+         "nom_normalise": e.capitale_normalisee, "capitale_normalisee": ""}
+        for e in index.resultats_pays if e.capitale_normalisee
+    ]
+
+
+def registre_depuis_env(dossier: str = ".") -> RegistreLexiques:
+    """Lexiques intégrés (pays et capitales, fr/en) + dossier PAYS_LEXIQUES."""
+    registre = RegistreLexiques(os.environ.get("PAYS_LEXIQUES") or None)
+    titres = {"fr": ("Pays", "Capitales"), "en": ("Countries", "Capitals")}
+    for langue, (pays, capitales) in titres.items():
+        registre.declarer(f"pays_{langue}", lambda l=langue: charger_lexique(l, dossier, registre.pool),
+                          titre=pays, langue=langue, origine="integre")
+        registre.declarer(f"capitales_{langue}",
+                          lambda l=langue: IndexLexique(capitales_seules(registre.obtenir(f"pays_{l}")),
+                                                        registre.pool),
+                          titre=capitales, langue=langue, origine="integre")
+    return registre
+
+# ──────────────────────────────────────────────────────────────
+#  SURCOUCHE PAR PARTIE
+# ──────────────────────────────────────────────────────────────
+
+class CompteursJoues:
+    """Pays déjà joués sous chaque nœud de l'index partagé.
+
+    L'index porte le nombre total de clés plus longues par nœud ; la
+    surcouche compte les pays joués par nœud (tableaux `index.type_codes`
+    alloués au premier pays joué, celui des capitales seulement en mode
+    mixte). La
+    question « reste-t-il une suite plus longue jouable ? » devient une
+    simple soustraction ; « déjà joué ? » un test de bit.
+    """
+
+    __slots__ = ("index", "mixte", "noms", "capitales", "joues", "bits")
+
+    def __init__(self, index: IndexLexique, mixte: bool = True):
+        self.index = index
+        self.mixte = mixte
+        self.noms:      Optional[array] = None
+        self.capitales: Optional[array] = None
+        self.joues = array(index.type_codes)   # indices des entrées jouées, dans l'ordre
+        self.bits = 0                          # bit i : entrée i jouée
+
+    def marquer(self, nom_normalise: str):
+        """À appeler une seule fois par pays ajouté à `pays_joues`."""
+        index = self.index
+        if self.noms is None:
+            self.noms = array(index.type_codes, [0]) * len(index.longs_noms)
+            if self.mixte:
+                self.capitales = array(index.type_codes, self.noms)
+        for i in index.indices_nom(nom_normalise):
+            self.joues.append(i)
+            self.bits |= 1 << i
+            for n in index.chemin(index.noms[i]):
+                self.noms[n] += 1
+            if self.capitales is not None and index.capitales[i]:
+                for n in index.chemin(index.capitales[i]):
+                    self.capitales[n] += 1
+
+    def contient(self, nom_normalise: str) -> bool:
+        """Le pays `nom_normalise` a déjà été joué."""
+        return any(self.bits >> i & 1 for i in self.index.indices_nom(nom_normalise))
+
+    def a_suite_non_jouee(self, n: int, mode_mixte: bool) -> bool:
+        """Équivalent O(1) de `IndexLexique.a_suite_non_jouee` pour le nœud `n`
+        (mode mixte : surcouche créée avec `mixte=True`)."""
+        if n < 0:
+            return False
+        index = self.index
+        if index.longs_noms[n] > (self.noms[n] if self.noms is not None else 0):
+            return True
+        return mode_mixte and index.longs_caps[n] > (self.capitales[n] if self.capitales is not None else 0)
+
+    def octets(self) -> int:
+        taille = sys.getsizeof(self) + sys.getsizeof(self.joues) + sys.getsizeof(self.bits)
+        if self.noms is not None:
+            taille += sys.getsizeof(self.noms)
+        if self.capitales is not None:
+            taille += sys.getsizeof(self.capitales)
+        return taille
+
+
+def verifier_conformite(corpus: str = "normalisation.json", page: Optional[str] = "index.html") -> int:
+    """Rejoue le corpus sur `normaliser` et, si node est installé, sur la
+    fonction JS d'index.html. Renvoie le nombre d'écarts."""
+    with open(corpus, encoding="utf-8") as f:
+        cas = json.load(f)
+    ecarts = [(e, attendu, normaliser(e)) for e, attendu in cas if normaliser(e) != attendu]
+    for e, attendu, obtenu in ecarts:
+        print(f"[python] {e!r} → {obtenu!r}, attendu {attendu!r}")
+
+    node = shutil.which("node")
+    if page and node:
+        with open(page, encoding="utf-8") as f:
+            fonction = re.search(r"function normaliser\(s\) \{.*?\n\}", f.read(), re.S)
+        script = (fonction.group(0) + ";const c = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+                  "console.log(JSON.stringify(c.map(([e]) => normaliser(e))));")
+        sortie = subprocess.run([node, "-e", script], input=json.dumps(cas),
+                                capture_output=True, text=True, check=True).stdout
+        for (e, attendu), obtenu in zip(cas, json.loads(sortie)):
+            if obtenu != attendu:
+                ecarts.append((e, attendu, obtenu))
+                print(f"[js] {e!r} → {obtenu!r}, attendu {attendu!r}")
+    elif page:
+        print("[conformité] node absent : seule la version Python est vérifiée")
+    print(f"[conformité] {len(cas)} cas, {len(ecarts)} écart(s)")
+    return len(ecarts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile les lexiques JSON en fichiers .lex")
+    parser.add_argument("sources", nargs="*", help="pays_fr.json pays_en.json …")
+    parser.add_argument("--conformite", action="store_true",
+                        help="vérifier normaliser (Python et JS) sur normalisation.json")
+    args = parser.parse_args()
+
+    if args.conformite and verifier_conformite():
+        raise SystemExit(1)
+
+    for source in args.sources:
+        cible = os.path.splitext(source)[0] + ".lex"
+        index = ecrire_binaire(charger_pays_json(source), cible, source)
+        print(f"{source} → {cible} : {len(index.noms)} pays, {len(index.lettre)} nœuds, "
+              f"{os.path.getsize(cible)} octets")
@@ -14,10 +14,10 @@
 """
 
 import json
+import os
 import random
 import asyncio
 import threading
-import unicodedata
 import uuid
 from typing import Optional
 
@@ -44,6 +44,9 @@ from kivy.animation import Animation
 from kivy.metrics import dp
 from kivy.utils import get_color_from_hex
 
+from lexique import IndexLexique, charger_lexique, normaliser
+from solveur import LivreOuvertures, Solveur, choisir_lettre
+
 # Taille simulateur mobile
 Window.size = (390, 844)
 
@@ -65,17 +68,6 @@ COULEUR_GOLD     = get_color_from_hex("#d4a853")
 COULEUR_PAPIER   = get_color_from_hex("#f5f0e8")
 COULEUR_MUTED    = get_color_from_hex("#4a5568")
 
-# ──────────────────────────────────────────────────────────────
-#  UTILITAIRES
-# ──────────────────────────────────────────────────────────────
-
-def normaliser(s: str) -> str:
-    """Supprime accents, espaces et tirets pour la comparaison clavier."""
-    s = unicodedata.normalize("NFD", s.upper()).encode("ascii", "ignore").decode("ascii")
-    # On ignore espaces et tirets : le joueur ne peut pas les saisir
-    return s.replace(" ", "").replace("-", "").replace("'", "")
-
-
 # ──────────────────────────────────────────────────────────────
 #  DÉCLARATION DES ÉCRANS
 # ──────────────────────────────────────────────────────────────
@@ -761,8 +753,13 @@ class PaysGameApp(App):
         self.ws            = None          # WebSocket actif
         self.ws_loop       = None          # event loop asyncio dédié
         self.ws_thread     = None
+        self.snap_serveur  = None          # état serveur reconstruit (protocole delta)
+        self.rev           = 0
+        self.resync_demande = False
 
-        self.pays_local       = []
+        self.lexique_local: Optional[IndexLexique] = None
+        self.solveur: Optional[Solveur] = None
+        self.difficulte_ia = "moyen"
         self.pays_joues       = set()   # set de nom_normalise
         self.pays_joues_liste = []      # liste enrichie {pays, cible, valeur_jouee}
         self.en_pause         = False   # état pause
@@ -811,11 +808,11 @@ class PaysGameApp(App):
     # ──────────────────────────────────────────────────────────
 
     def _charger_pays_local(self, langue: str):
-        try:
-            with open(f"pays_{langue}.json", "r", encoding="utf-8") as f:
-                self.pays_local = json.load(f)
-        except FileNotFoundError:
-            self.pays_local = [
+        """Lexique compilé pays_{langue}.lex (mmap) ou, à défaut, le JSON."""
+        if os.path.exists(f"pays_{langue}.lex") or os.path.exists(f"pays_{langue}.json"):
+            self.lexique_local = charger_lexique(langue)
+        else:
+            self.lexique_local = IndexLexique([
                 {"nom": "FRANCE", "capitale": "PARIS", "code": "fr",
                  "nom_normalise": "FRANCE", "capitale_normalisee": "PARIS"},
                 {"nom": "ALLEMAGNE", "capitale": "BERLIN", "code": "de",
@@ -832,7 +829,7 @@ class PaysGameApp(App):
                  "nom_normalise": "JAPON", "capitale_normalisee": "TOKYO"},
                 {"nom": "BELGIQUE", "capitale": "BRUXELLES", "code": "be",
                  "nom_normalise": "BELGIQUE", "capitale_normalisee": "BRUXELLES"},
-            ]
+            ])
             self._toast("⚠️ Fichier pays non trouvé — mode démo")
 
     def _chercher_possibilites(self, seq: str):
@@ -842,24 +839,14 @@ class PaysGameApp(App):
         """
         if not seq:
             # Retourner tous les pays avec _cible par défaut
-            return [{**p, "_cible": "nom_normalise"} for p in self.pays_local]
-        s = normaliser(seq)
-        resultats = []
-        for p in self.pays_local:
-            if p["nom_normalise"].startswith(s):
-                resultats.append({**p, "_cible": "nom_normalise"})
-            elif self.mode_mixte and p.get("capitale_normalisee", "").startswith(s):
-                resultats.append({**p, "_cible": "capitale_normalisee"})
-        return resultats
+            return [{**p, "_cible": "nom_normalise"} for p in self.lexique_local.resultats_pays]
+        return [
+            {**p, "_cible": "nom_normalise" if p["type"] == "pays" else "capitale_normalisee"}
+            for p in self.lexique_local.chercher(normaliser(seq), self.mode_mixte)
+        ]
 
     def _est_complet(self, seq: str):
-        s = normaliser(seq)
-        for p in self.pays_local:
-            if p["nom_normalise"] == s:
-                return p
-            if self.mode_mixte and p.get("capitale_normalisee") == s:
-                return p
-        return None
+        return self.lexique_local.exact(normaliser(seq), self.mode_mixte)
 
     # ──────────────────────────────────────────────────────────
     #  ACCUEIL
@@ -930,11 +917,40 @@ class PaysGameApp(App):
     async def _recevoir_messages(self, ws):
         try:
             async for raw in ws:
-                msg = json.loads(raw)
+                msg = await self._fusionner_etat(ws, json.loads(raw))
                 Clock.schedule_once(lambda dt, m=msg: self._traiter_message(m), 0)
         except websockets.ConnectionClosed:
             Clock.schedule_once(lambda dt: self._toast("🔌 Déconnecté", "error"), 0)
 
+    async def _fusionner_etat(self, ws, msg: dict) -> dict:
+        """Reconstruit un message « à plat » depuis le protocole delta :
+        état complet (`snapshot`) à l'arrivée, puis champs modifiés (`maj`)."""
+        if "snapshot" in msg:
+            self.snap_serveur = dict(msg["snapshot"])
+            self.rev = msg.get("rev", 0)
+            self.resync_demande = False
+        elif "maj" in msg:
+            if self.snap_serveur is None or msg.get("rev", 0) > self.rev + 1:
+                # Trou dans les révisions → demander l'état complet
+                if not self.resync_demande:
+                    self.resync_demande = True
+                    await ws.send(json.dumps({"action": "resync"}))
+                self.snap_serveur = self.snap_serveur or {}
+            # Révision déjà couverte par l'état complet reçu → ne pas régresser
+            if msg.get("rev", 0) > self.rev:
+                maj = msg["maj"]
+                for cle, valeur in maj.items():
+                    if cle not in ("pays_joues_ajout", "pays_joues_depuis"):
+                        self.snap_serveur[cle] = valeur
+                if "pays_joues_ajout" in maj:
+                    deja = self.snap_serveur.get("pays_joues", [])[:maj["pays_joues_depuis"]]
+                    self.snap_serveur["pays_joues"] = deja + maj["pays_joues_ajout"]
+                self.rev = msg["rev"]
+        else:
+            return msg
+        reste = {k: v for k, v in msg.items() if k not in ("snapshot", "maj")}
+        return {**self.snap_serveur, **reste}
+
     def _envoyer_ws(self, data: dict):
         if self.ws and self.mode_connecte:
             self._run_async(self.ws.send(json.dumps(data)))
@@ -1592,13 +1608,23 @@ class PaysGameApp(App):
             self._perdre_vie_solo("ia", "Tous pays joués")
             return
 
-        # Stratégie : éviter de compléter si possible, parmi les pays non joués
-        cibles_longues = [p for p in possibilites_nonjoues if len(p[p["_cible"]]) > len(seq_norm) + 1]
-        cibles = cibles_longues if cibles_longues else possibilites_nonjoues
-
-        cible = random.choice(cibles)
-        champ_cible = cible["_cible"]
-        lettre_suivante = cible[champ_cible][len(seq_norm)]
+        # Jeu parfait selon la difficulté (solveur partagé par lexique et mode)
+        if self.solveur is None or self.solveur.index is not self.lexique_local \
+                or self.solveur.mode_mixte != self.mode_mixte:
+            livre = LivreOuvertures.charger(f"pays_{self.langue}.livre", self.lexique_local)
+            self.solveur = Solveur(self.lexique_local, self.mode_mixte, livre=livre)
+        joues = [i for nom in self.pays_joues for i in self.lexique_local.indices_nom(nom)]
+        vivants = sum(1 for j in self.joueurs_solo if j["en_vie"])
+        lettre_suivante = choisir_lettre(self.solveur, joues, seq_norm, vivants,
+                                         self.difficulte_ia, random)
+        if not lettre_suivante:
+            # Stratégie : éviter de compléter si possible, parmi les pays non joués
+            cibles_longues = [p for p in possibilites_nonjoues if len(p[p["_cible"]]) > len(seq_norm) + 1]
+            cibles = cibles_longues if cibles_longues else possibilites_nonjoues
+
+            cible = random.choice(cibles)
+            champ_cible = cible["_cible"]
+            lettre_suivante = cible[champ_cible][len(seq_norm)]
         nouvelle_seq = seq_norm + lettre_suivante
         self.sequence = nouvelle_seq
         self.joueur_fautif = "ia"
@@ -1679,16 +1705,13 @@ class PaysGameApp(App):
         seq_norm = normaliser(self.sequence)
 
         # Chercher dans les noms ET capitales (mode mixte)
-        match = next((p for p in self.pays_local if p["nom_normalise"] == norm), None)
+        match = self.lexique_local.exact(norm, self.mode_mixte)
         champ_match = "nom_normalise"
         valeur_affichee = pays_propose
 
-        if not match and self.mode_mixte:
-            # Essayer les capitales
-            match = next((p for p in self.pays_local if p.get("capitale_normalisee") == norm), None)
-            if match:
-                champ_match = "capitale_normalisee"
-                valeur_affichee = match.get("capitale", pays_propose)
+        if match and match["type"] == "capitale":
+            champ_match = "capitale_normalisee"
+            valeur_affichee = match.get("capitale", pays_propose)
 
         if not match:
             self._afficher_verdict({"valide": False,
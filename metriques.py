@@ -0,0 +1,190 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Métriques (format Prometheus)          ║
+║   Compteurs, jauges et histogrammes pré-agrégés              ║
+║                                                              ║
+║  Chaque observation ne fait qu'incrémenter des cases déjà    ║
+║  allouées : l'instrumentation reste active en production.    ║
+║  Le texte n'est produit qu'au moment de la collecte.         ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import inspect
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Bornes en secondes, du µs au seuil de ce qui se voit à l'écran
+BORNES_DUREE = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BORNES_OCTETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+# ──────────────────────────────────────────────────────────────
+#  TYPES DE MÉTRIQUES
+# ──────────────────────────────────────────────────────────────
+
+class _Famille:
+    """Métrique avec étiquettes optionnelles : `labels(...)` renvoie (et
+    garde) l'enfant correspondant, à appeler de préférence une seule fois."""
+
+    genre = ""
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = ()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._enfants: Dict[Tuple[str, ...], "_Famille"] = {}
+
+    def labels(self, *valeurs: str):
+        enfant = self._enfants.get(valeurs)
+        if enfant is None:
+            enfant = self._enfants[valeurs] = self._nouvel_enfant()
+        return enfant
+
+    def _nouvel_enfant(self):
+        return type(self)(self.nom, self.aide)
+
+    def _series(self):
+        """(suffixe d'étiquettes, enfant) pour chaque série."""
+        if not self.etiquettes:
+            yield "", self
+            return
+        for valeurs, enfant in self._enfants.items():
+            yield ",".join(f'{e}="{v}"' for e, v in zip(self.etiquettes, valeurs)), enfant
+
+    def exposer(self) -> List[str]:
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.genre}"]
+        for etiquettes, enfant in self._series():
+            lignes.extend(enfant._lignes(etiquettes))
+        return lignes
+
+
+class Compteur(_Famille):
+    genre = "counter"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = ()):
+        super().__init__(nom, aide, etiquettes)
+        self.valeur = 0
+
+    def inc(self, n: int = 1):
+        self.valeur += n
+
+    def _lignes(self, etiquettes: str) -> List[str]:
+        return [f"{self.nom}{{{etiquettes}}} {self.valeur}" if etiquettes else f"{self.nom} {self.valeur}"]
+
+
+class Jauge(_Famille):
+    """Valeur lue au moment de la collecte : `fonction()` renvoie un nombre,
+    ou un dict {valeurs d'étiquettes: nombre} si la jauge a des étiquettes."""
+
+    genre = "gauge"
+
+    def __init__(self, nom: str, aide: str, fonction: Callable, etiquettes: Sequence[str] = ()):
+        super().__init__(nom, aide, etiquettes)
+        self.fonction = fonction
+
+    def exposer(self) -> List[str]:
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.genre}"]
+        valeur = self.fonction()
+        if not self.etiquettes:
+            lignes.append(f"{self.nom} {valeur}")
+            return lignes
+        for valeurs, v in valeur.items():
+            valeurs = valeurs if isinstance(valeurs, tuple) else (valeurs,)
+            etiquettes = ",".join(f'{e}="{x}"' for e, x in zip(self.etiquettes, valeurs))
+            lignes.append(f"{self.nom}{{{etiquettes}}} {v}")
+        return lignes
+
+
+class Histogramme(_Famille):
+    genre = "histogram"
+
+    def __init__(self, nom: str, aide: str, bornes: Sequence[float] = BORNES_DUREE,
+                 etiquettes: Sequence[str] = ()):
+        super().__init__(nom, aide, etiquettes)
+        self.bornes = tuple(bornes)
+        self.cases = [0] * (len(self.bornes) + 1)   # dernière case : +Inf
+        self.somme = 0.0
+        self.total = 0
+
+    def _nouvel_enfant(self):
+        return Histogramme(self.nom, self.aide, self.bornes)
+
+    def observer(self, valeur: float):
+        self.cases[bisect.bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.total += 1
+
+    def _lignes(self, etiquettes: str) -> List[str]:
+        prefixe = f"{etiquettes}," if etiquettes else ""
+        lignes, cumul = [], 0
+        for borne, n in zip(self.bornes, self.cases):
+            cumul += n
+            lignes.append(f'{self.nom}_bucket{{{prefixe}le="{borne}"}} {cumul}')
+        lignes.append(f'{self.nom}_bucket{{{prefixe}le="+Inf"}} {self.total}')
+        suffixe = f"{{{etiquettes}}}" if etiquettes else ""
+        lignes.append(f"{self.nom}_sum{suffixe} {self.somme}")
+        lignes.append(f"{self.nom}_count{suffixe} {self.total}")
+        return lignes
+
+# ──────────────────────────────────────────────────────────────
+#  REGISTRE & CHRONOMÉTRAGE
+# ──────────────────────────────────────────────────────────────
+
+class Registre:
+    def __init__(self):
+        self.metriques: List[_Famille] = []
+
+    def ajouter(self, metrique):
+        self.metriques.append(metrique)
+        return metrique
+
+    def exposer(self) -> str:
+        lignes: List[str] = []
+        for metrique in self.metriques:
+            lignes.extend(metrique.exposer())
+        return "\n".join(lignes) + "\n"
+
+
+registre = Registre()
+
+
+def compteur(nom: str, aide: str, etiquettes: Sequence[str] = ()) -> Compteur:
+    return registre.ajouter(Compteur(nom, aide, etiquettes))
+
+
+def jauge(nom: str, aide: str, fonction: Callable, etiquettes: Sequence[str] = ()) -> Jauge:
+    return registre.ajouter(Jauge(nom, aide, fonction, etiquettes))
+
+
+def histogramme(nom: str, aide: str, bornes: Sequence[float] = BORNES_DUREE,
+                etiquettes: Sequence[str] = ()) -> Histogramme:
+    return registre.ajouter(Histogramme(nom, aide, bornes, etiquettes))
+
+
+def chronometrer(histo: Histogramme):
+    """Décorateur : durée de chaque appel (fonction ou coroutine)."""
+    def decorer(fonction):
+        horloge = time.perf_counter
+        if inspect.iscoroutinefunction(fonction):
+            @functools.wraps(fonction)
+            async def mesure_async(*args, **kwargs):
+                debut = horloge()
+                try:
+                    return await fonction(*args, **kwargs)
+                finally:
+                    histo.observer(horloge() - debut)
+            return mesure_async
+
+        @functools.wraps(fonction)
+        def mesure(*args, **kwargs):
+            debut = horloge()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                histo.observer(horloge() - debut)
+        return mesure
+    return decorer
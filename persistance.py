@@ -0,0 +1,232 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Persistance des rooms                  ║
+║   Points de reprise compacts + redémarrage à chaud           ║
+║                                                              ║
+║  Chaque room est sauvée après chaque commande de son acteur  ║
+║  sous forme d'un tuple `marshal` (quelques centaines         ║
+║  d'octets). Les écritures sont regroupées : une seule par    ║
+║  room et par vidage, quel que soit le nombre de lettres.     ║
+║                                                              ║
+║  PAYS_STOCKAGE = memoire | sqlite:parties.db                 ║
+║                | journal:parties.log                         ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import marshal
+import os
+import re
+import sqlite3
+import struct
+from typing import Dict, Optional
+
+# Version du format des tuples produits par `Partie.etat_compact`
+# (2 : jetons des délais ; 3 : échéances murales des délais)
+VERSION_FORMAT = 3
+
+# ──────────────────────────────────────────────────────────────
+#  STOCKAGE DE BASE
+# ──────────────────────────────────────────────────────────────
+
+class Stockage:
+    """Interface commune : `sauver` / `supprimer` ne font que noter la
+    dernière valeur de chaque room ; `vider` écrit le lot en une fois."""
+
+    def __init__(self):
+        self._en_attente: Dict[str, Optional[bytes]] = {}   # None = suppression
+
+    def sauver(self, room_id: str, etat: tuple):
+        self._en_attente[room_id] = marshal.dumps((VERSION_FORMAT, etat))
+
+    def supprimer(self, room_id: str):
+        self._en_attente[room_id] = None
+
+    def vider(self) -> int:
+        """Écrit les modifications en attente ; renvoie le nombre de rooms."""
+        if not self._en_attente:
+            return 0
+        lot, self._en_attente = self._en_attente, {}
+        self._ecrire(lot)
+        return len(lot)
+
+    def charger_tout(self) -> Dict[str, tuple]:
+        etats = {}
+        for room_id, donnees in self._lire().items():
+            try:
+                version, etat = marshal.loads(donnees)
+            except Exception as e:
+                print(f"[persistance ERROR] room={room_id} illisible : {e!r}")
+                continue
+            if version == VERSION_FORMAT:
+                etats[room_id] = etat
+        return etats
+
+    def fermer(self):
+        self.vider()
+
+    # ── À fournir par les implémentations ─────────────────────
+
+    def _ecrire(self, lot: Dict[str, Optional[bytes]]):
+        raise NotImplementedError
+
+    def _lire(self) -> Dict[str, bytes]:
+        raise NotImplementedError
+
+# ──────────────────────────────────────────────────────────────
+#  IMPLÉMENTATIONS
+# ──────────────────────────────────────────────────────────────
+
+class StockageMemoire(Stockage):
+    """Aucune persistance réelle : comportement historique, et doublure de test."""
+
+    def __init__(self):
+        super().__init__()
+        self.rooms: Dict[str, bytes] = {}
+
+    def _ecrire(self, lot):
+        for room_id, donnees in lot.items():
+            if donnees is None:
+                self.rooms.pop(room_id, None)
+            else:
+                self.rooms[room_id] = donnees
+
+    def _lire(self):
+        return dict(self.rooms)
+
+
+class StockageSQLite(Stockage):
+    """Une ligne par room, remplacée à chaque vidage (une transaction par lot)."""
+
+    def __init__(self, chemin: str):
+        super().__init__()
+        self.db = sqlite3.connect(chemin, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS rooms (room_id TEXT PRIMARY KEY, etat BLOB NOT NULL)"
+        )
+
+    def _ecrire(self, lot):
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO rooms (room_id, etat) VALUES (?, ?)",
+                [(rid, d) for rid, d in lot.items() if d is not None],
+            )
+            self.db.executemany(
+                "DELETE FROM rooms WHERE room_id = ?",
+                [(rid,) for rid, d in lot.items() if d is None],
+            )
+
+    def _lire(self):
+        return dict(self.db.execute("SELECT room_id, etat FROM rooms"))
+
+    def fermer(self):
+        super().fermer()
+        self.db.close()
+
+
+class StockageJournal(Stockage):
+    """Fichier en ajout seul : [taille u32][room_id u8-len][données].
+    Un room_id de plus de 255 octets n'est pas sauvé. Une taille de données nulle marque une suppression. Le journal est
+    réécrit quand il dépasse `facteur_compaction` fois sa taille utile."""
+
+    _ENTETE = struct.Struct("<IB")
+
+    def __init__(self, chemin: str, facteur_compaction: float = 4.0):
+        super().__init__()
+        self.chemin = chemin
+        self.facteur_compaction = facteur_compaction
+        self._vivantes: Dict[str, bytes] = self._relire()
+        self._taille_utile = sum(self._taille(r, d) for r, d in self._vivantes.items())
+        self.fichier = open(chemin, "ab")
+
+    def _taille(self, room_id: str, donnees: bytes) -> int:
+        return self._ENTETE.size + len(room_id.encode()) + len(donnees)
+
+    def _encoder(self, room_id: str, donnees: bytes) -> bytes:
+        cle = room_id.encode()
+        return self._ENTETE.pack(len(donnees), len(cle)) + cle + donnees
+
+    def _relire(self) -> Dict[str, bytes]:
+        vivantes: Dict[str, bytes] = {}
+        if not os.path.exists(self.chemin):
+            return vivantes
+        with open(self.chemin, "rb") as f:
+            contenu = f.read()
+        pos, taille_entete = 0, self._ENTETE.size
+        while pos + taille_entete <= len(contenu):
+            n, k = self._ENTETE.unpack_from(contenu, pos)
+            fin = pos + taille_entete + k + n
+            if fin > len(contenu):
+                break   # dernier enregistrement tronqué (arrêt brutal)
+            room_id = contenu[pos + taille_entete:pos + taille_entete + k].decode()
+            if n:
+                vivantes[room_id] = contenu[pos + taille_entete + k:fin]
+            else:
+                vivantes.pop(room_id, None)
+            pos = fin
+        return vivantes
+
+    def _ecrire(self, lot):
+        morceaux = []
+        for room_id, donnees in lot.items():
+            # Encoder d'abord : une clé trop longue ne fait perdre qu'elle
+            try:
+                morceaux.append(self._encoder(room_id, donnees or b""))
+            except struct.error:
+                print(f"[persistance ERROR] room={room_id[:32]!r}… : identifiant trop long, ignorée")
+                continue
+            ancien = self._vivantes.pop(room_id, None)
+            if ancien is not None:
+                self._taille_utile -= self._taille(room_id, ancien)
+            if donnees is not None:
+                self._vivantes[room_id] = donnees
+                self._taille_utile += self._taille(room_id, donnees)
+        self.fichier.write(b"".join(morceaux))
+        self.fichier.flush()
+        if self.fichier.tell() > max(1 << 16, self.facteur_compaction * self._taille_utile):
+            self._compacter()
+
+    def _compacter(self):
+        temporaire = self.chemin + ".tmp"
+        with open(temporaire, "wb") as f:
+            f.write(b"".join(self._encoder(r, d) for r, d in self._vivantes.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        self.fichier.close()
+        os.replace(temporaire, self.chemin)
+        self.fichier = open(self.chemin, "ab")
+
+    def _lire(self):
+        return dict(self._vivantes)
+
+    def fermer(self):
+        super().fermer()
+        self.fichier.close()
+
+
+def chemin_par_worker(chemin: str, worker_id: str) -> str:
+    """parties.db → parties.<worker>.db : un fichier par worker de grappe."""
+    racine, extension = os.path.splitext(chemin)
+    return f"{racine}.{re.sub(r'[^A-Za-z0-9.-]+', '_', worker_id).strip('_')}{extension}"
+
+
+def stockage_depuis_env(worker_id: Optional[str] = None) -> Stockage:
+    """Choisit le backend d'après PAYS_STOCKAGE (mémoire par défaut).
+
+    En grappe (`worker_id` fourni), chaque worker a son propre fichier et
+    ne restaure que les rooms qu'il a lui-même sauvées : avec un fichier
+    partagé, tous reprendraient toutes les rooms."""
+    spec = os.environ.get("PAYS_STOCKAGE", "memoire")
+    genre, _, chemin = spec.partition(":")
+    if genre not in ("sqlite", "journal"):
+        return StockageMemoire()
+    chemin = chemin or ("parties.db" if genre == "sqlite" else "parties.log")
+    if worker_id is not None:
+        chemin = chemin_par_worker(chemin, worker_id)
+    if genre == "sqlite":
+        return StockageSQLite(chemin)
+    return StockageJournal(chemin)
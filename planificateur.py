@@ -0,0 +1,161 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Planificateur de délais                ║
+║   Un seul tas de deadlines pour tout le processus            ║
+║                                                              ║
+║  Remplace les tâches asyncio « sleep puis agir » créées à    ║
+║  chaque tour (chrono, langue au chat, IA).                   ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from typing import Callable, Dict, List, Optional
+
+# Entrée du tas : [deadline, numéro, room_id, type, callback, active]
+_DEADLINE, _NUMERO, _ROOM, _TYPE, _CALLBACK, _ACTIVE = range(6)
+
+# ──────────────────────────────────────────────────────────────
+#  PLANIFICATEUR
+# ──────────────────────────────────────────────────────────────
+
+class Planificateur:
+    """Délais indexés par (room, type) : au plus un délai actif par couple.
+
+    - `programmer` remplace le délai existant du même type (O(log n)) ;
+    - `annuler` est O(1) : l'entrée est désactivée et ignorée au réveil ;
+    - un seul `loop.call_at` est armé, sur la deadline la plus proche ;
+    - au réveil, toutes les deadlines échues sont déclenchées d'un coup.
+
+    Un callback peut renvoyer une coroutine : elle n'est lancée (dans une
+    tâche) qu'au déclenchement, jamais pendant l'attente.
+
+    Avec une `horloge` fournie (rejeu, banc d'essai), rien n'est armé sur
+    la boucle : c'est l'appelant qui avance le temps via `declencher_echus`.
+    """
+
+    def __init__(self, horloge: Optional[Callable[[], float]] = None):
+        self.horloge = horloge
+        self._tas: List[list] = []
+        self._par_room: Dict[str, Dict[str, list]] = {}
+        self._compteur = itertools.count()
+        self._nb_inactives = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._handle_deadline: Optional[float] = None
+
+    # ── Horloge ───────────────────────────────────────────────
+
+    def maintenant(self) -> float:
+        if self.horloge is not None:
+            return self.horloge()
+        return asyncio.get_running_loop().time()
+
+    def prochaine_deadline(self) -> Optional[float]:
+        while self._tas and not self._tas[0][_ACTIVE]:
+            heapq.heappop(self._tas)
+            self._nb_inactives -= 1
+        return self._tas[0][_DEADLINE] if self._tas else None
+
+    def _armer(self):
+        """(Ré)arme l'unique réveil sur la deadline la plus proche."""
+        if self.horloge is not None:
+            return
+        while self._tas and not self._tas[0][_ACTIVE]:
+            heapq.heappop(self._tas)
+            self._nb_inactives -= 1
+        if not self._tas:
+            if self._handle:
+                self._handle.cancel()
+            self._handle = self._handle_deadline = None
+            return
+        deadline = self._tas[0][_DEADLINE]
+        if self._handle is not None and self._handle_deadline <= deadline:
+            return
+        if self._handle:
+            self._handle.cancel()
+        self._handle = asyncio.get_running_loop().call_at(deadline, self._reveil)
+        self._handle_deadline = deadline
+
+    def _reveil(self):
+        self._handle = self._handle_deadline = None
+        self.declencher_echus(self.maintenant())
+        self._armer()
+
+    # ── API ───────────────────────────────────────────────────
+
+    def programmer(self, room_id: str, type_: str, delai: float, callback: Callable):
+        """Déclenche `callback()` dans `delai` secondes, en remplaçant le
+        délai (room_id, type_) éventuellement en attente."""
+        self.annuler(room_id, type_)
+        entree = [self.maintenant() + delai, next(self._compteur), room_id, type_, callback, True]
+        heapq.heappush(self._tas, entree)
+        self._par_room.setdefault(room_id, {})[type_] = entree
+        self._armer()
+
+    def annuler(self, room_id: str, type_: str) -> bool:
+        types = self._par_room.get(room_id)
+        entree = types.pop(type_, None) if types else None
+        if types is not None and not types:
+            del self._par_room[room_id]
+        if entree is None:
+            return False
+        self._desactiver(entree)
+        return True
+
+    def annuler_room(self, room_id: str):
+        """Annule tous les délais d'une room (fin de partie, éviction)."""
+        for entree in self._par_room.pop(room_id, {}).values():
+            self._desactiver(entree)
+
+    def restant(self, room_id: str, type_: str) -> Optional[float]:
+        """Secondes avant le déclenchement, None si rien n'est programmé."""
+        entree = self._par_room.get(room_id, {}).get(type_)
+        if entree is None:
+            return None
+        return max(0.0, entree[_DEADLINE] - self.maintenant())
+
+    def programme(self, room_id: str, type_: str) -> bool:
+        return type_ in self._par_room.get(room_id, {})
+
+    def __len__(self) -> int:
+        return len(self._tas) - self._nb_inactives
+
+    # ── Interne ───────────────────────────────────────────────
+
+    def _desactiver(self, entree: list):
+        entree[_ACTIVE] = False
+        entree[_CALLBACK] = None
+        self._nb_inactives += 1
+        # Compacter quand les entrées mortes dominent le tas
+        if self._nb_inactives > 64 and self._nb_inactives * 2 > len(self._tas):
+            self._tas = [e for e in self._tas if e[_ACTIVE]]
+            heapq.heapify(self._tas)
+            self._nb_inactives = 0
+
+    def declencher_echus(self, maintenant: float) -> int:
+        """Déclenche d'un bloc toutes les deadlines <= `maintenant`."""
+        lot = []
+        while self._tas and self._tas[0][_DEADLINE] <= maintenant:
+            entree = heapq.heappop(self._tas)
+            if not entree[_ACTIVE]:
+                self._nb_inactives -= 1
+                continue
+            types = self._par_room.get(entree[_ROOM])
+            if types is not None and types.get(entree[_TYPE]) is entree:
+                del types[entree[_TYPE]]
+                if not types:
+                    del self._par_room[entree[_ROOM]]
+            entree[_ACTIVE] = False
+            lot.append(entree)
+
+        for entree in lot:
+            try:
+                resultat = entree[_CALLBACK]()
+                if asyncio.iscoroutine(resultat):
+                    asyncio.ensure_future(resultat)
+            except Exception as e:
+                print(f"[planificateur ERROR] room={entree[_ROOM]} type={entree[_TYPE]} err={e}")
+        return len(lot)
@@ -0,0 +1,156 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Profilage en production                ║
+║   Échantillonnage de pile + détection des blocages           ║
+║                                                              ║
+║  Un thread à part lit la pile du thread de la boucle         ║
+║  (sys._current_frames) : rien n'est ajouté au code mesuré.   ║
+║  Sortie « collapsed stacks » : flamegraph.pl, speedscope…    ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# ──────────────────────────────────────────────────────────────
+#  PILES
+# ──────────────────────────────────────────────────────────────
+
+def _etiquette(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def pile_repliee(thread_id: int, cache: Dict[object, str]) -> Optional[str]:
+    """Pile du thread, racine d'abord, cadres séparés par « ; »."""
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return None
+    noms = []
+    while frame is not None:
+        code = frame.f_code
+        nom = cache.get(code)
+        if nom is None:
+            nom = cache[code] = _etiquette(code)
+        noms.append(nom)
+        frame = frame.f_back
+    noms.reverse()
+    return ";".join(noms)
+
+# ──────────────────────────────────────────────────────────────
+#  ÉCHANTILLONNEUR
+# ──────────────────────────────────────────────────────────────
+
+class Echantillonneur:
+    """Relève la pile du thread de la boucle toutes les `intervalle`
+    secondes pendant `duree` secondes, dans un thread dédié."""
+
+    def __init__(self, thread_id: int, intervalle: float = 0.005):
+        self.thread_id = thread_id
+        self.intervalle = intervalle
+        self.piles: Dict[str, int] = {}
+        self.nb = 0
+
+    def _boucle(self, fin: float):
+        cache: Dict[object, str] = {}
+        while time.monotonic() < fin:
+            pile = pile_repliee(self.thread_id, cache)
+            if pile:
+                self.piles[pile] = self.piles.get(pile, 0) + 1
+                self.nb += 1
+            time.sleep(self.intervalle)
+
+    async def mesurer(self, duree: float) -> str:
+        """Échantillonne sans bloquer la boucle ; renvoie le texte replié."""
+        await asyncio.to_thread(self._boucle, time.monotonic() + duree)
+        return self.texte()
+
+    def texte(self) -> str:
+        return "".join(f"{pile} {n}\n" for pile, n in sorted(self.piles.items(), key=lambda e: -e[1]))
+
+# ──────────────────────────────────────────────────────────────
+#  SURVEILLANCE DES BLOCAGES DE LA BOUCLE
+# ──────────────────────────────────────────────────────────────
+
+class SurveillantBoucle:
+    """Un battement est programmé sur la boucle toutes les `periode`
+    secondes ; un thread vérifie qu'il arrive. S'il manque plus de `seuil`
+    secondes, la boucle est bloquée : on relève la room et le gestionnaire
+    de la tâche qui s'exécute (voir `marquer`) et la pile, puis on
+    journalise la durée totale quand le battement reprend.
+    """
+
+    def __init__(self, seuil: float = 0.1, periode: float = 0.02,
+                 sur_retard: Optional[Callable[[float], None]] = None,
+                 sur_blocage: Optional[Callable[[float, Optional[str], Optional[str]], None]] = None):
+        self.seuil = seuil
+        self.periode = periode
+        self.sur_retard = sur_retard
+        self.sur_blocage = sur_blocage
+        # Par tâche : un gestionnaire qui attend (IA groupée…) garde sa marque
+        # sans l'imposer aux tâches qui s'exécutent entre-temps
+        self._marques: Dict[asyncio.Task, Tuple[str, str]] = {}
+        self._dernier = time.monotonic()
+        self._thread_boucle: Optional[int] = None
+        self._boucle: Optional[asyncio.AbstractEventLoop] = None
+        self._actif = False
+
+    def marquer(self, room_id: Optional[str], gestionnaire: Optional[str]):
+        """Contexte de la tâche courante ; (None, None) en sortie."""
+        tache = asyncio.current_task()
+        if tache is None:
+            return
+        if room_id is None:
+            self._marques.pop(tache, None)
+        else:
+            self._marques[tache] = (room_id, gestionnaire)
+
+    def contexte(self) -> Tuple[Optional[str], Optional[str]]:
+        """(room, gestionnaire) de la tâche en cours sur la boucle, lu
+        depuis le thread de surveillance pendant que la boucle est bloquée."""
+        tache = asyncio.current_task(self._boucle) if self._boucle is not None else None
+        return self._marques.get(tache, (None, None)) if tache is not None else (None, None)
+
+    def demarrer(self):
+        self._boucle = asyncio.get_running_loop()
+        self._thread_boucle = threading.get_ident()
+        self._actif = True
+        self._dernier = time.monotonic()
+        self._boucle.call_later(self.periode, self._battre, self._dernier + self.periode)
+        threading.Thread(target=self._surveiller, name="surveillant-boucle", daemon=True).start()
+
+    def arreter(self):
+        self._actif = False
+
+    def _battre(self, attendu: float):
+        maintenant = time.monotonic()
+        self._dernier = maintenant
+        if self.sur_retard:
+            self.sur_retard(max(0.0, maintenant - attendu))
+        if self._actif:
+            self._boucle.call_later(self.periode, self._battre, maintenant + self.periode)
+
+    def _surveiller(self):
+        cache: Dict[object, str] = {}
+        bloque_depuis = None
+        contexte = None
+        while self._actif:
+            time.sleep(self.periode)
+            dernier = self._dernier
+            if time.monotonic() - dernier > self.seuil:
+                if bloque_depuis is None:
+                    bloque_depuis = dernier
+                    contexte = (*self.contexte(), pile_repliee(self._thread_boucle, cache))
+            elif bloque_depuis is not None:
+                duree = dernier - bloque_depuis
+                room_id, gestionnaire, pile = contexte
+                print(f"[boucle BLOQUÉE] {duree * 1000:.0f} ms room={room_id or '-'} "
+                      f"gestionnaire={gestionnaire or '-'} pile={pile}")
+                if self.sur_blocage:
+                    self.sur_blocage(duree, room_id, gestionnaire)
+                bloque_depuis = None
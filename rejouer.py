@@ -0,0 +1,111 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Rejeu déterministe                     ║
+║   Reconstruit une room depuis le journal, hors ligne         ║
+║                                                              ║
+║  Pas de socket, pas d'attente : les délais sont rejoués      ║
+║  comme les autres commandes, au rythme du journal.           ║
+║                                                              ║
+║  Usage :                                                     ║
+║    python rejouer.py parties.journal ROOMID [--rev N]        ║
+║    python rejouer.py parties.journal --stats                 ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+import server
+from journal import CREATION, grouper_par_room, lire_journal
+from planificateur import Planificateur
+
+# ──────────────────────────────────────────────────────────────
+#  MOTEUR DE REJEU
+# ──────────────────────────────────────────────────────────────
+
+class Rejeu:
+    """Applique les commandes journalisées d'une room à une `Partie` neuve.
+
+    Les gestionnaires `traiter_*` sont exactement ceux du serveur ; seule
+    l'horloge du planificateur est virtuelle (temps du journal) et aucune
+    socket n'est enregistrée, donc les diffusions ne partent nulle part.
+    """
+
+    def __init__(self, evenements: List[tuple]):
+        room_id, t, _, _, (nom, config, createur_id) = evenements[0]
+        if nom != CREATION:
+            raise ValueError(f"room {room_id} : le journal ne commence pas par sa création")
+        self.evenements = evenements
+        self.position = 1
+        self.temps = t
+        self.partie = server.Partie(room_id, server.config_depuis_tuple(config), createur_id)
+        self.partie.planificateur = Planificateur(horloge=lambda: self.temps)
+
+    async def avancer(self, jusqu_a_rev: Optional[int] = None) -> server.Partie:
+        """Rejoue jusqu'à la révision demandée (ou jusqu'au bout)."""
+        while self.position < len(self.evenements):
+            _, t, rev, graine, commande = self.evenements[self.position]
+            if jusqu_a_rev is not None and rev >= jusqu_a_rev:
+                break
+            self.temps = t
+            self.position += 1
+            if self.partie.revision != rev:
+                print(f"[rejeu ERROR] room={self.partie.room_id} révision {self.partie.revision} ≠ {rev} "
+                      f"avant {commande[0]} : le rejeu diverge")
+            try:
+                await server.executer_commande(self.partie, commande, graine)
+            except Exception as e:
+                print(f"[rejeu ERROR] room={self.partie.room_id} commande={commande} err={e!r}")
+        return self.partie
+
+
+async def rejouer_room(evenements: List[tuple], jusqu_a_rev: Optional[int] = None) -> server.Partie:
+    return await Rejeu(evenements).avancer(jusqu_a_rev)
+
+
+async def statistiques(chemin: str) -> dict:
+    """Rejoue toutes les rooms d'un journal et résume le résultat."""
+    debut = time.perf_counter()
+    rooms = grouper_par_room(lire_journal(chemin))
+    nb_commandes, par_etat, lettres = 0, {}, 0
+    for evenements in rooms.values():
+        try:
+            partie = await rejouer_room(evenements)
+        except ValueError as e:
+            print(f"[rejeu ERROR] {e}")
+            continue
+        nb_commandes += len(evenements) - 1
+        par_etat[partie.etat.value] = par_etat.get(partie.etat.value, 0) + 1
+        lettres += sum(1 for e in evenements if e[4][0] == "lettre")
+    duree = time.perf_counter() - debut
+    return {
+        "rooms": len(rooms),
+        "commandes": nb_commandes,
+        "lettres": lettres,
+        "par_etat": par_etat,
+        "duree_s": round(duree, 3),
+        "commandes_par_s": round(nb_commandes / duree) if duree else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rejeu du journal Pays Game")
+    parser.add_argument("journal")
+    parser.add_argument("room_id", nargs="?")
+    parser.add_argument("--rev", type=int, default=None, help="s'arrêter à cette révision")
+    parser.add_argument("--stats", action="store_true", help="rejouer toutes les rooms")
+    args = parser.parse_args()
+
+    if args.stats or not args.room_id:
+        print(json.dumps(asyncio.run(statistiques(args.journal)), indent=2, ensure_ascii=False))
+    else:
+        evenements = list(lire_journal(args.journal, args.room_id))
+        if not evenements:
+            raise SystemExit(f"Room {args.room_id} absente du journal")
+        partie = asyncio.run(rejouer_room(evenements, args.rev))
+        print(json.dumps(json.loads(server.encoder_json(partie.snapshot())), indent=2, ensure_ascii=False))
@@ -14,23 +14,58 @@
 from __future__ import annotations
 
 import asyncio
+import hmac
 import json
+import os
 import random
+import secrets
 import string
-import unicodedata
+import sys
+import threading
+import time
+from array import array
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional, Set
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
 from enum import Enum
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
+from annuaire import CREEE, DEMARREE, FERMEE, MAJ, AnnuaireRooms, CacheReponses, FluxLobby, paginer
+from cycle_vie import cycle_depuis_env
+from grappe import grappe_depuis_env, relayer_http, relayer_websocket
+from ia import ServiceIA
+from journal import CREATION, journal_depuis_env
+from lexique import (CompteursJoues, Entree, IndexLexique, LimiteLexiques, normaliser, normaliser_lettre,
+                     registre_depuis_env)
+import metriques
+from persistance import stockage_depuis_env
+from profilage import Echantillonneur, SurveillantBoucle
+from solveur import NIVEAUX_IA, LivreOuvertures, Solveur
+from planificateur import Planificateur
+
+try:
+    import orjson  # encodeur JSON rapide, optionnel
+except ImportError:
+    orjson = None
+
 # ──────────────────────────────────────────────────────────────
 #  APP & CORS
 # ──────────────────────────────────────────────────────────────
 
 app = FastAPI(title="Pays Game API", version="2.0.0")
+grappe = grappe_depuis_env()   # None sans PAYS_REGISTRE (voir GRAPPE)
+
+# Relais vers le worker propriétaire : seulement en grappe, sinon aucune
+# requête ne traverse ce middleware. Déclaré avant CORS pour que les
+# réponses relayées reçoivent ses en-têtes.
+if grappe is not None:
+    @app.middleware("http")
+    async def _routage_grappe(request: Request, call_next):
+        return await router_vers_proprietaire(request, call_next)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,102 +73,175 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count"],
 )
 
+# ──────────────────────────────────────────────────────────────
+#  MÉTRIQUES (exposées sur /metrics)
+# ──────────────────────────────────────────────────────────────
+
+DUREE_EXISTE_SUITE = metriques.histogramme(
+    "pays_existe_suite_secondes", "Durée de existe_suite (descente dans le trie à chaque lettre)")
+DUREE_EST_COMPLET = metriques.histogramme(
+    "pays_est_complet_secondes", "Durée de est_complet")
+DUREE_SNAPSHOT = metriques.histogramme(
+    "pays_snapshot_secondes", "Durée de construction de Partie.snapshot()")
+TAILLE_SNAPSHOT = metriques.histogramme(
+    "pays_snapshot_caracteres", "Taille encodée des états complets envoyés",
+    metriques.BORNES_OCTETS)
+DUREE_DIFFUSION = metriques.histogramme(
+    "pays_diffusion_secondes", "Encodage + dépôt d'une diffusion dans toutes les files")
+DUREE_IA = metriques.histogramme(
+    "pays_ia_coup_secondes", "Durée d'un coup de l'IA (lettre ou réponse langue au chat)")
+MINUTERIES = metriques.compteur(
+    "pays_minuteries_total", "Délais déclenchés, par type et issue", ("type", "issue"))
+ECHECS_ENVOI = metriques.compteur(
+    "pays_echecs_envoi_total", "Envois WebSocket perdus, par cause", ("cause",))
+EVICTIONS = metriques.compteur(
+    "pays_evictions_total", "Sockets fermées côté serveur (client trop lent ou mort)")
+RETARD_BOUCLE = metriques.histogramme(
+    "pays_retard_boucle_secondes", "Retard du battement de la boucle asyncio")
+EXPIRATIONS = metriques.compteur(
+    "pays_rooms_expirees_total", "Rooms fermées après inactivité, par état", ("etat",))
+BLOCAGES = metriques.compteur(
+    "pays_blocages_boucle_total", "Blocages de la boucle au-delà du seuil, par gestionnaire",
+    ("gestionnaire",))
+
+# Enfants résolus une fois : aucun tuple créé par événement
+_ECHEC_ENVOI = {c: ECHECS_ENVOI.labels(c) for c in ("delai", "envoi", "fermeture", "debordement")}
+_MINUTERIES: Dict[Tuple[str, bool], metriques.Compteur] = {}
+
+def compter_minuterie(type_: str, valide: bool):
+    enfant = _MINUTERIES.get((type_, valide))
+    if enfant is None:
+        enfant = _MINUTERIES[(type_, valide)] = MINUTERIES.labels(type_, "executee" if valide else "perimee")
+    enfant.inc()
+
 # ──────────────────────────────────────────────────────────────
 #  NORMALISATION & DONNÉES PAYS
 # ──────────────────────────────────────────────────────────────
 
-def normaliser(s: str) -> str:
-    """Supprime accents, espaces, tirets, apostrophes — aligné avec le JS client."""
-    s = unicodedata.normalize("NFD", s.upper()).encode("ascii", "ignore").decode("ascii")
-    return s.replace(" ", "").replace("-", "").replace("'", "")
+# Registre des lexiques : pays_fr/en, capitales_fr/en et ceux du dossier
+# PAYS_LEXIQUES (listes importées). Chargés à la première utilisation
+# (pays_*.lex projetés en mémoire, à défaut le JSON).
+lexiques = registre_depuis_env()
 
+def get_pays(lexique_id: str) -> Sequence[Entree]:
+    return get_index(lexique_id).resultats_pays
 
-def charger_pays(langue: str) -> List[dict]:
-    fichier = f"pays_{langue}.json"
-    try:
-        with open(fichier, "r", encoding="utf-8") as f:
-            pays = json.load(f)
-    except FileNotFoundError:
-        pays = [{"nom": "FRANCE", "capitale": "PARIS", "code": "fr"}]
-    for p in pays:
-        p["nom_normalise"]       = normaliser(p.get("nom_normalise") or p.get("nom", ""))
-        p["capitale_normalisee"] = normaliser(p.get("capitale_normalisee") or p.get("capitale", ""))
-    return pays
-
-PAYS_FR = charger_pays("fr")
-PAYS_EN = charger_pays("en")
-
-def get_pays(langue: str) -> List[dict]:
-    return PAYS_FR if langue == "fr" else PAYS_EN
-
-
-def chercher_pays(sequence: str, langue: str, mode_mixte: bool) -> List[dict]:
-    """Retourne tous les pays dont le nom commence par `sequence`."""
-    seq = normaliser(sequence)
-    pays = get_pays(langue)
-    resultats = []
-    for p in pays:
-        if p["nom_normalise"].startswith(seq):
-            resultats.append({"type": "pays", **p})
-        elif mode_mixte and p["capitale_normalisee"].startswith(seq):
-            resultats.append({"type": "capitale", **p})
-    return resultats
-
-
-def est_complet(sequence: str, langue: str, mode_mixte: bool,
-                pays_joues_noms: set = None) -> Optional[dict]:
+def get_index(lexique_id: str) -> IndexLexique:
+    return lexiques.obtenir(lexique_id)
+
+_solveurs: Dict[Tuple[str, bool], Solveur] = {}
+service_ia = ServiceIA()
+
+_livres: Dict[str, Optional[LivreOuvertures]] = {}
+
+def get_livre(lexique_id: str) -> Optional[LivreOuvertures]:
+    """<id>.livre (python solveur.py <id>) à côté des pays, sinon dans PAYS_LEXIQUES."""
+    if lexique_id not in _livres:
+        dossiers = ["."] + ([lexiques.dossier] if lexiques.dossier else [])
+        index, livre = get_index(lexique_id), None
+        for dossier in dossiers:
+            livre = LivreOuvertures.charger(os.path.join(dossier, f"{lexique_id}.livre"), index)
+            if livre is not None:
+                break
+        _livres[lexique_id] = livre
+    return _livres[lexique_id]
+
+def get_solveur(lexique_id: str, mode_mixte: bool) -> Solveur:
+    """Un solveur (et son mémo) par lexique et mode, partagé par les rooms."""
+    solveur = _solveurs.get((lexique_id, mode_mixte))
+    if solveur is None:
+        solveur = _solveurs[(lexique_id, mode_mixte)] = Solveur(
+            get_index(lexique_id), mode_mixte, livre=get_livre(lexique_id))
+    return solveur
+
+def oublier_derives(lexique_id: str, index: IndexLexique):
+    """Lexique déchargé du registre : solveurs, livre et matrices IA aussi."""
+    _livres.pop(lexique_id, None)
+    for mode_mixte in (False, True):
+        _solveurs.pop((lexique_id, mode_mixte), None)
+    service_ia.oublier(index)
+
+lexiques.sur_eviction.append(oublier_derives)
+lexiques.utilises = lambda: {p.lexique_id for p in parties.values()}
+
+
+def chercher_pays(seq: str, lexique_id: str, mode_mixte: bool) -> List[Entree]:
+    """Retourne tous les pays dont le nom commence par `seq` (déjà normalisée).
+    Les entrées renvoyées sont partagées avec l'index : lecture seule.
+    """
+    return get_index(lexique_id).chercher(seq, mode_mixte)
+
+
+@metriques.chronometrer(DUREE_EXISTE_SUITE)
+def existe_suite(seq: str, lexique_id: str, mode_mixte: bool) -> bool:
+    """Au moins un pays commence par `seq` (sans construire la liste)."""
+    return get_index(lexique_id).a_suite(seq, mode_mixte)
+
+
+@metriques.chronometrer(DUREE_EST_COMPLET)
+def est_complet(seq: str, lexique_id: str, mode_mixte: bool,
+                pays_joues_noms: set = None,
+                compteurs: Optional[CompteursJoues] = None) -> Optional[Entree]:
     """Niger ne se complète pas si Nigeria est encore jouable.
+    Avec `compteurs` (surcouche de la partie), le test « plus long jouable »
+    est en O(1) ; sinon il parcourt les pays sous le préfixe.
     try/except pour éviter tout plantage asynchrone.
     """
     try:
-        seq = normaliser(sequence)
         if not seq:
             return None
-        pays = get_pays(langue)
-        joues = pays_joues_noms if pays_joues_noms is not None else set()
-        match = None
-
-        for p in pays:
-            if p["nom_normalise"] == seq:
-                match = {**p, "type": "pays"}
-                break
-        if match is None and mode_mixte:
-            for p in pays:
-                if p.get("capitale_normalisee", "") == seq:
-                    match = {**p, "type": "capitale"}
-                    break
+        index = get_index(lexique_id)
+        n = index.noeud(seq)
 
+        match = index.exact_noeud(n, mode_mixte)
         if match is None:
             return None
 
         # Pays plus long encore jouable → pas complet
-        for p in pays:
-            nom = p["nom_normalise"]
-            if nom != seq and nom.startswith(seq) and nom not in joues:
-                return None
-        if mode_mixte:
-            for p in pays:
-                cap = p.get("capitale_normalisee", "")
-                if cap and cap != seq and cap.startswith(seq) and p["nom_normalise"] not in joues:
-                    return None
+        if compteurs is not None:
+            plus_long = compteurs.a_suite_non_jouee(n, mode_mixte)
+        else:
+            joues = pays_joues_noms if pays_joues_noms is not None else set()
+            plus_long = index.a_suite_non_jouee(seq, mode_mixte, joues)
+        if plus_long:
+            return None
 
         return match
     except Exception as e:
-        print(f"[est_complet ERROR] seq={sequence!r} err={e}")
+        print(f"[est_complet ERROR] seq={seq!r} err={e}")
         return None
 
 # ──────────────────────────────────────────────────────────────
 #  MODÈLES
 # ──────────────────────────────────────────────────────────────
 
-class EtatJoueur(BaseModel):
-    id: str
-    nom: str
-    vies: int
-    en_vie: bool = True
-    est_ia: bool = False
+# Bornes de la mémoire d'une room (voir Partie.octets)
+MAX_JOUEURS         = 16
+MAX_LONGUEUR_PSEUDO = 24
+MAX_LONGUEUR_ID     = 64
+_OCTETS_RNG         = 2_600   # état du Mersenne Twister, invisible à getsizeof
+
+class EtatJoueur:
+    """Joueur d'une room ; `en_dict()` seulement pour la sérialisation."""
+
+    __slots__ = ("id", "nom", "vies", "en_vie", "est_ia")
+
+    def __init__(self, id: str, nom: str, vies: int, en_vie: bool = True, est_ia: bool = False):
+        self.id = id
+        self.nom = nom
+        self.vies = vies
+        self.en_vie = en_vie
+        self.est_ia = est_ia
+
+    def en_tuple(self) -> tuple:
+        return (self.id, self.nom, self.vies, self.en_vie, self.est_ia)
+
+    def en_dict(self) -> dict:
+        return {"id": self.id, "nom": self.nom, "vies": self.vies,
+                "en_vie": self.en_vie, "est_ia": self.est_ia}
 
 
 class EtatPartie(str, Enum):
@@ -149,44 +257,279 @@ class Config(BaseModel):
     max_joueurs: int  = 8
     mode_mixte:  bool = False
     mode_jeu:    str  = "classique"
+    lexique:     Optional[str] = None   # id du registre ; défaut : pays de la langue
+    difficulte_ia: str = "moyen"        # facile | moyen | difficile | parfait
+
+
+_CHAMPS_CONFIG = ("langue", "vies", "temps", "max_joueurs", "mode_mixte", "mode_jeu",
+                  "lexique", "difficulte_ia")
+
+def config_en_tuple(c: Config) -> tuple:
+    return tuple(getattr(c, champ) for champ in _CHAMPS_CONFIG)
+
+def config_depuis_tuple(t: tuple) -> Config:
+    # Les points de reprise plus anciens ont moins de champs : défauts
+    return Config(**dict(zip(_CHAMPS_CONFIG, t)))
+
+def lexique_de(config: Config) -> str:
+    if config.lexique:
+        return config.lexique
+    return "pays_fr" if config.langue == "fr" else "pays_en"
 
 # ──────────────────────────────────────────────────────────────
 #  CONNEXION WEBSOCKET
 # ──────────────────────────────────────────────────────────────
 
+class JsonBrut:
+    """Valeur déjà encodée (fragments du lexique), recopiée telle quelle
+    par `encoder_json` au lieu d'être reconstruite puis ré-encodée."""
+
+    __slots__ = ("texte",)
+
+    def __init__(self, texte: str):
+        self.texte = texte
+
+    def __eq__(self, autre) -> bool:
+        return isinstance(autre, JsonBrut) and autre.texte == self.texte
+
+    def __repr__(self) -> str:
+        return f"JsonBrut({self.texte!r})"
+
+
+# Marque d'emplacement d'un JsonBrut : imprévisible, donc impossible à
+# reproduire depuis un pseudo ou une saisie.
+_MARQUE_BRUT = secrets.token_hex(8)
+
+
+def encoder_json(data: dict) -> str:
+    """Encode un message une seule fois, quel que soit le nombre de destinataires.
+    Même sortie compacte que `send_json` ; orjson est utilisé s'il est installé.
+    Les `JsonBrut` sont encodés comme une marque, remplacée ensuite par leur texte.
+    """
+    bruts: List[str] = []
+
+    def brut(valeur):
+        if isinstance(valeur, JsonBrut):
+            bruts.append(valeur.texte)
+            return f"\0{_MARQUE_BRUT}{len(bruts) - 1}"
+        raise TypeError(f"{type(valeur).__name__} non sérialisable")
+
+    if orjson is not None:
+        texte = orjson.dumps(data, default=brut).decode("utf-8")
+    else:
+        texte = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=brut)
+    for k, fragment in enumerate(bruts):
+        texte = texte.replace(f'"\\u0000{_MARQUE_BRUT}{k}"', fragment, 1)
+    return texte
+
+
+class Connexion:
+    """Une socket, sa file sortante bornée et sa tâche d'écriture dédiée.
+
+    La logique de jeu ne fait que déposer des messages déjà encodés ; seule
+    la tâche d'écriture attend le réseau.
+    """
+
+    RESYNC = None   # marqueur : envoyer un état complet frais à la place
+
+    def __init__(self, manager: "ConnectionManager", room_id: str, joueur_id: str, ws: WebSocket):
+        self.manager   = manager
+        self.room_id   = room_id
+        self.joueur_id = joueur_id
+        self.ws        = ws
+        # Éléments : [texte, est_etat, cle_coalescence]
+        self.file: Deque[list] = deque()
+        self.signal    = asyncio.Event()
+        self.au_dessus_depuis: Optional[float] = None
+        self.fermee    = False
+        self.tache     = asyncio.create_task(self._ecrire())
+
+    def deposer(self, texte: Optional[str], est_etat: bool = False, cle: Optional[str] = None):
+        if self.fermee:
+            return
+        m = self.manager
+        if cle is not None:
+            # Un message plus récent remplace celui qui attend encore
+            for element in self.file:
+                if element[2] == cle:
+                    self.file.remove(element)
+                    break
+
+        if len(self.file) >= m.taille_file:
+            if m.politique == "coalescer":
+                # Les états en attente sont périmés : un seul état complet
+                # frais, construit au moment de l'écriture, les remplace.
+                self.file = deque(e for e in self.file if not e[1])
+                self.file.append([Connexion.RESYNC, True, "resync"])
+            if len(self.file) >= m.taille_file:
+                self.file.popleft()
+                _ECHEC_ENVOI["debordement"].inc()
+
+        self.file.append([texte, est_etat, cle])
+        self.signal.set()
+
+        if len(self.file) > m.seuil_haut:
+            maintenant = time.monotonic()
+            if self.au_dessus_depuis is None:
+                self.au_dessus_depuis = maintenant
+            elif maintenant - self.au_dessus_depuis > m.delai_eviction:
+                m.evincer(self, "Client trop lent")
+        else:
+            self.au_dessus_depuis = None
+
+    async def _ecrire(self):
+        try:
+            while True:
+                while not self.file:
+                    self.signal.clear()
+                    await self.signal.wait()
+                texte = self.file.popleft()[0]
+                if texte is Connexion.RESYNC:
+                    etat = self.manager.etat_complet(self.room_id)
+                    if etat is None:
+                        continue
+                    texte = encoder_json(etat)
+                    TAILLE_SNAPSHOT.observer(len(texte))
+                await asyncio.wait_for(self.ws.send_text(texte), self.manager.delai_envoi)
+                if len(self.file) <= self.manager.seuil_haut:
+                    self.au_dessus_depuis = None
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Envoi en échec ou trop lent : la connexion est considérée morte
+            _ECHEC_ENVOI["delai" if isinstance(e, asyncio.TimeoutError) else "envoi"].inc()
+            self.manager.evincer(self, "Envoi impossible")
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.connexions: Dict[str, Dict[str, WebSocket]] = {}
+    """Connexions par room. `envoyer` et `diffuser` ne bloquent jamais :
+    chaque socket a sa propre file d'attente (voir `Connexion`).
+
+    Politiques de débordement :
+      - "coalescer"  : les états en attente sont remplacés par un état complet
+      - "abandonner" : le plus ancien message est jeté (le client resynchronise)
+    """
+
+    def __init__(self, delai_envoi: float = 5.0, taille_file: int = 256,
+                 seuil_haut: int = 192, delai_eviction: float = 10.0,
+                 politique: str = "coalescer",
+                 etat_complet: Optional[Callable[[str], Optional[dict]]] = None):
+        self.connexions: Dict[str, Dict[str, Connexion]] = {}
+        self.delai_envoi    = delai_envoi      # timeout par socket (secondes)
+        self.taille_file    = taille_file
+        self.seuil_haut     = seuil_haut
+        self.delai_eviction = delai_eviction   # temps toléré au-dessus du seuil
+        self.politique      = politique
+        self.etat_complet   = etat_complet or (lambda room_id: None)
 
     async def connecter(self, room_id: str, joueur_id: str, ws: WebSocket):
         await ws.accept()
-        self.connexions.setdefault(room_id, {})[joueur_id] = ws
-
-    def deconnecter(self, room_id: str, joueur_id: str):
-        self.connexions.get(room_id, {}).pop(joueur_id, None)
+        ancienne = self.connexions.get(room_id, {}).get(joueur_id)
+        if ancienne:
+            ancienne.fermee = True
+            ancienne.tache.cancel()
+        self.connexions.setdefault(room_id, {})[joueur_id] = Connexion(self, room_id, joueur_id, ws)
+
+    def deconnecter(self, room_id: str, joueur_id: str, ws: Optional[WebSocket] = None):
+        """Avec `ws`, ne retire la connexion que si c'est bien celle-là
+        (une reconnexion a pu la remplacer entre-temps)."""
+        connexion = self.connexions.get(room_id, {}).get(joueur_id)
+        if connexion and (ws is None or connexion.ws is ws):
+            del self.connexions[room_id][joueur_id]
+            connexion.fermee = True
+            connexion.tache.cancel()
+
+    def evincer(self, connexion: Connexion, raison: str):
+        """Retire un consommateur lent ; la boucle de réception du endpoint
+        verra la déconnexion et appliquera le traitement habituel."""
+        if connexion.fermee:
+            return
+        EVICTIONS.inc()
+        if self.connexions.get(connexion.room_id, {}).get(connexion.joueur_id) is connexion:
+            del self.connexions[connexion.room_id][connexion.joueur_id]
+        connexion.fermee = True
+        connexion.file.clear()
+        if connexion.tache is not asyncio.current_task():
+            connexion.tache.cancel()
+        asyncio.create_task(self._fermer(connexion.ws, raison))
+
+    async def _fermer(self, ws: WebSocket, raison: str, code: int = 4008):
+        try:
+            await asyncio.wait_for(ws.close(code=code, reason=raison), self.delai_envoi)
+        except Exception:
+            _ECHEC_ENVOI["fermeture"].inc()
+
+    def fermer_room(self, room_id: str, raison: str, code: int = 4009):
+        """Ferme toutes les sockets d'une room retirée du serveur."""
+        for connexion in self.connexions.pop(room_id, {}).values():
+            connexion.fermee = True
+            connexion.file.clear()
+            connexion.tache.cancel()
+            asyncio.create_task(self._fermer(connexion.ws, raison, code))
 
     async def envoyer(self, room_id: str, joueur_id: str, data: dict):
-        ws = self.connexions.get(room_id, {}).get(joueur_id)
-        if ws:
-            try:
-                await ws.send_json(data)
-            except Exception:
-                pass
-
+        connexion = self.connexions.get(room_id, {}).get(joueur_id)
+        if connexion:
+            texte = encoder_json(data)
+            if "snapshot" in data:
+                TAILLE_SNAPSHOT.observer(len(texte))
+            connexion.deposer(texte, *self._nature(data))
+
+    @metriques.chronometrer(DUREE_DIFFUSION)
     async def diffuser(self, room_id: str, data: dict):
-        for ws in list(self.connexions.get(room_id, {}).values()):
-            try:
-                await ws.send_json(data)
-            except Exception:
-                pass
+        """Encode une fois, puis dépose le même texte dans la file de chaque
+        socket : un client lent ne retarde ni les autres ni la partie."""
+        connexions = list(self.connexions.get(room_id, {}).values())
+        if not connexions:
+            return
+        texte = encoder_json(data)
+        nature = self._nature(data)
+        for connexion in connexions:
+            connexion.deposer(texte, *nature)
+
+    @staticmethod
+    def _nature(data: dict) -> Tuple[bool, Optional[str]]:
+        """(porte un état, clé de coalescence) d'un message."""
+        if "snapshot" in data:
+            return True, "etat"
+        if data.get("type") == "pong":
+            return False, "pong"
+        return "maj" in data, None
+
+planificateur = Planificateur()
+stockage = stockage_depuis_env(grappe.worker_id if grappe is not None else None)
+journal = journal_depuis_env()
+cycle = cycle_depuis_env()
+surveillant = SurveillantBoucle(
+    seuil=float(os.environ.get("PAYS_SEUIL_BLOCAGE_MS", "100")) / 1000,
+    sur_retard=RETARD_BOUCLE.observer,
+    sur_blocage=lambda duree, room_id, gestionnaire: BLOCAGES.labels(gestionnaire or "-").inc(),
+)
 
-manager = ConnectionManager()
+manager = ConnectionManager(
+    etat_complet=lambda room_id: parties[room_id].message_complet("etat") if room_id in parties else None,
+)
 
 # ──────────────────────────────────────────────────────────────
 #  CLASSE PARTIE
 # ──────────────────────────────────────────────────────────────
 
+class PartieFermee(Exception):
+    """La room a été retirée avant d'avoir exécuté la commande demandée."""
+
+
 class Partie:
+    """État d'une room. Représentation compacte (slots, pays joués en codes
+    d'index sur 2 octets) : les dicts d'affichage ne sont construits qu'à la
+    sérialisation. Le générateur aléatoire et la boîte n'existent que
+    pendant l'exécution des commandes — un lobby inactif n'en porte aucun."""
+
+    __slots__ = ("room_id", "config", "createur_id", "etat", "joueurs", "ordre", "index_tour",
+                 "sequence", "pays_joues", "lexique_id", "compteurs", "en_attente_langue_au_chat",
+                 "joueur_interpelle", "joueur_fautif", "tours_sans_jouer", "revision", "_diffuse",
+                 "_nb_pays_diffuses", "boite", "_acteur", "jetons", "minuteries", "en_transition",
+                 "planificateur", "rng", "fermee")
+
     def __init__(self, room_id: str, config: Config, createur_id: str):
         self.room_id       = room_id
         self.config        = config
@@ -195,15 +538,27 @@ class Partie:
         self.joueurs: Dict[str, EtatJoueur] = {}
         self.ordre: List[str] = []
         self.index_tour    = 0
-        self.sequence      = ""
-        self.pays_joues: List[dict] = []
-        self.pays_joues_noms: Set[str] = set()
+        self.sequence      = ""          # normalisée à la saisie, jamais re-normalisée
+        self.lexique_id    = lexique_de(config)   # l'index est partagé, jamais copié
+        self.compteurs     = CompteursJoues(get_index(self.lexique_id), config.mode_mixte)
+        self.pays_joues    = array(self.compteurs.index.type_codes)  # codes (voir IndexLexique.code)
         self.en_attente_langue_au_chat = False
         self.joueur_interpelle: Optional[str] = None
         self.joueur_fautif: Optional[str] = None
-        self.chrono_task: Optional[asyncio.Task] = None
-        self.lac_timeout_task: Optional[asyncio.Task] = None
         self.tours_sans_jouer: Dict[str, int] = {}
+        # Protocole delta : révision + dernières valeurs diffusées
+        self.revision      = 0
+        self._diffuse: Dict[str, object] = {}
+        self._nb_pays_diffuses = 0
+        # Acteur : toutes les mutations passent par cette boîte, une à la fois
+        self.boite: Optional[Deque[Tuple[tuple, Optional[asyncio.Future]]]] = None
+        self._acteur: Optional[asyncio.Task] = None
+        self.jetons: Dict[str, int] = {}     # version de chaque délai programmé
+        self.minuteries: Dict[str, tuple] = {}   # commande de chaque délai en cours
+        self.en_transition = False           # pause d'affichage entre deux étapes
+        self.planificateur = planificateur   # remplacé par une horloge virtuelle au rejeu
+        self.rng: Optional[random.Random] = None   # créé à chaque commande (graine du journal)
+        self.fermee        = False           # retirée du serveur : plus aucune commande
 
     # ── Propriétés ────────────────────────────────────────────
 
@@ -230,76 +585,299 @@ class Partie:
                 return jid
         return self.joueur_actuel_id
 
+    def ajouter_pays_joue(self, match: Entree):
+        """Seul point d'entrée pour `pays_joues` : tient la surcouche à jour."""
+        cle = match.nom_normalise
+        if self.compteurs.contient(cle):
+            return
+        self.pays_joues.append(self.compteurs.index.code(match))
+        self.compteurs.marquer(cle)
+
+    def deja_joue(self, nom_normalise: str) -> bool:
+        return self.compteurs.contient(nom_normalise)
+
+    def pays_joues_json(self, depuis: int = 0) -> JsonBrut:
+        """Pays joués à partir de `depuis`, assemblés depuis les fragments
+        pré-encodés du lexique (aucun dict construit)."""
+        return JsonBrut(self.compteurs.index.liste_json(self.pays_joues[depuis:]))
+
+    def dernier_pays_json(self) -> JsonBrut:
+        return JsonBrut(self.compteurs.index.fragment(self.pays_joues[-1]))
+
+    def octets(self) -> int:
+        """Mémoire propre à la room (index, config par défaut et planificateur
+        partagés non comptés) : ce qui borne le nombre de lobbies par worker."""
+        taille = sys.getsizeof(self) + self.compteurs.octets() + sys.getsizeof(self.pays_joues)
+        for conteneur in (self.joueurs, self.ordre, self.tours_sans_jouer, self._diffuse,
+                          self.jetons, self.minuteries):
+            taille += sys.getsizeof(conteneur)
+        for j in self.joueurs.values():
+            taille += sys.getsizeof(j) + sys.getsizeof(j.id) + sys.getsizeof(j.nom)
+        taille += sum(sys.getsizeof(v) for v in self._diffuse.values())
+        if self.boite is not None:
+            taille += sys.getsizeof(self.boite)
+        if self.rng is not None:
+            taille += _OCTETS_RNG
+        return taille
+
     # ── Snapshot ──────────────────────────────────────────────
 
+    @metriques.chronometrer(DUREE_SNAPSHOT)
     def snapshot(self) -> dict:
         return {
             "type": "etat",
+            "rev": self.revision,
             "room_id": self.room_id,
             "etat": self.etat.value,
             "config": self.config.dict(),
-            "joueurs": [j.dict() for j in self.joueurs.values()],
+            "joueurs": [j.en_dict() for j in self.joueurs.values()],
             "ordre": self.ordre,
             "joueur_actuel": self.joueur_actuel_id,
             "sequence": self.sequence,
-            "pays_joues": self.pays_joues,
+            "pays_joues": self.pays_joues_json(),
             "en_attente_langue_au_chat": self.en_attente_langue_au_chat,
             "joueur_interpelle": self.joueur_interpelle,
             "joueur_fautif": self.joueur_fautif,
         }
 
-    # ── Chrono ────────────────────────────────────────────────
+    def message_complet(self, type_: str, **extra) -> dict:
+        """Message portant l'état complet (arrivée, resynchronisation)."""
+        return {"type": type_, "rev": self.revision, "snapshot": self.snapshot(), **extra}
 
-    def annuler_chrono(self):
-        if self.chrono_task and not self.chrono_task.done():
-            self.chrono_task.cancel()
-        self.chrono_task = None
-
-    async def lancer_chrono(self):
-        """Anti-zombie : capture jid + référence de tâche au démarrage."""
-        jid = self.joueur_actuel_id
-        cette_tache = asyncio.current_task()
-        try:
-            await asyncio.sleep(self.config.temps)
+    def message_delta(self, type_: str, **extra) -> dict:
+        """Message à diffuser à toute la room : seuls les champs modifiés
+        depuis la diffusion précédente sont placés dans `maj`.
 
-            # Vérification anti-zombie
-            if self.chrono_task is not cette_tache:
-                return
-            if self.joueur_actuel_id != jid:
-                return
+        `pays_joues` ne fait que grandir : on n'envoie que les nouveaux pays,
+        avec leur position (`pays_joues_depuis`) pour rester idempotent.
+        """
+        courant = {
+            "etat": self.etat.value,
+            "joueurs": tuple(j.en_tuple() for j in self.joueurs.values()),
+            "ordre": tuple(self.ordre),
+            "joueur_actuel": self.joueur_actuel_id,
+            "sequence": self.sequence,
+            "en_attente_langue_au_chat": self.en_attente_langue_au_chat,
+            "joueur_interpelle": self.joueur_interpelle,
+            "joueur_fautif": self.joueur_fautif,
+        }
+        maj = {}
+        for cle, valeur in courant.items():
+            if cle not in self._diffuse or self._diffuse[cle] != valeur:
+                self._diffuse[cle] = valeur
+                maj[cle] = valeur
+        if "joueurs" in maj:
+            maj["joueurs"] = [j.en_dict() for j in self.joueurs.values()]
+        if "ordre" in maj:
+            maj["ordre"] = list(self.ordre)
+
+        deja = self._nb_pays_diffuses
+        if len(self.pays_joues) > deja:
+            maj["pays_joues_depuis"] = deja
+            maj["pays_joues_ajout"] = self.pays_joues_json(deja)
+            self._nb_pays_diffuses = len(self.pays_joues)
+
+        self.revision += 1
+        return {"type": type_, "rev": self.revision, "maj": maj, **extra}
+
+    # ── Acteur ────────────────────────────────────────────────
+
+    def poster(self, commande: tuple, futur: Optional[asyncio.Future] = None):
+        """Dépose une commande dans la boîte de la room. Une seule tâche
+        (créée à la demande, terminée quand la boîte est vide) les exécute
+        dans l'ordre : aucune transition ne s'entrelace avec une autre."""
+        if self.fermee:
+            if futur is not None and not futur.done():
+                futur.set_exception(PartieFermee(self.room_id))
+            return
+        if self.boite is None:
+            self.boite = deque()
+        self.boite.append((commande, futur))
+        if self._acteur is None:
+            self._acteur = asyncio.create_task(self._vider_boite())
+
+    async def demander(self, commande: tuple):
+        """Comme `poster`, mais attend et renvoie le résultat de la commande.
+        Lève PartieFermee si la room est retirée avant de l'avoir exécutée."""
+        futur = asyncio.get_running_loop().create_future()
+        self.poster(commande, futur)
+        return await futur
+
+    async def _vider_boite(self):
+        try:
+            while self.boite:
+                commande, futur = self.boite.popleft()
+                graine = random.getrandbits(32)
+                journal.ajouter(self.room_id, self.revision, graine, commande)
+                try:
+                    resultat = await executer_commande(self, commande, graine)
+                except asyncio.CancelledError:
+                    # Room fermée pendant la commande (voir `fermer`)
+                    if futur and not futur.done():
+                        futur.set_exception(PartieFermee(self.room_id))
+                    raise
+                except Exception as e:
+                    print(f"[acteur ERROR] room={self.room_id} commande={commande[0]} err={e!r}")
+                    if futur and not futur.done():
+                        futur.set_exception(e)
+                else:
+                    if futur and not futur.done():
+                        futur.set_result(resultat)
+                if parties.get(self.room_id) is self:
+                    # Activité : toute commande sauf les délais, et tout changement d'état
+                    if commande[0] != "minuterie" or cycle.a_change(self.room_id, self.etat.value):
+                        cycle.toucher(self.room_id, self.etat.value)
+                    indexer_partie(self)
+                # Point de reprise : simple mise en attente, écrit par lot
+                stockage.sauver(self.room_id, self.etat_compact())
+        finally:
+            self._acteur = None
+            self.rng = None
+            if not self.boite:
+                self.boite = None
+
+    def fermer(self):
+        """Plus aucune commande : les délais sont annulés, l'acteur arrêté,
+        et chaque `demander` en attente échoue (PartieFermee) au lieu de
+        rester pendant."""
+        self.fermee = True
+        self.annuler_tout()
+        boite, self.boite = self.boite or (), None
+        for _, futur in boite:
+            if futur is not None and not futur.done():
+                futur.set_exception(PartieFermee(self.room_id))
+        if self._acteur is not None:
+            self._acteur.cancel()
+
+    # ── Persistance ───────────────────────────────────────────
+
+    def etat_compact(self) -> tuple:
+        """Tuple de types simples (sérialisé par `marshal`) : pays joués
+        réduits à leur code d'index, délais à leur échéance (horloge murale,
+        le temps passé hors service est décompté). Les jetons sont conservés :
+        après reprise, les délais gardent ceux du journal."""
+        maintenant = time.time()
+        return (
+            self.room_id, self.createur_id, self.etat.value, config_en_tuple(self.config),
+            tuple(j.en_tuple() for j in self.joueurs.values()),
+            tuple(self.ordre), self.index_tour, self.sequence,
+            tuple(self.pays_joues),
+            self.en_attente_langue_au_chat, self.joueur_interpelle, self.joueur_fautif,
+            tuple(self.tours_sans_jouer.items()), self.revision, self.en_transition,
+            tuple(self.jetons.items()),
+            tuple(
+                (type_, maintenant + (self.planificateur.restant(self.room_id, type_) or 0.0), commande)
+                for type_, commande in self.minuteries.items()
+            ),
+        )
 
-            # Petit délai pour laisser les messages WS en retard arriver
-            await asyncio.sleep(0.5)
-
-            # Incrémenter AFK
-            self.tours_sans_jouer[jid] = self.tours_sans_jouer.get(jid, 0) + 1
-            afk = self.tours_sans_jouer[jid]
-
-            if afk >= 3:
-                # Élimination directe
-                joueur = self.joueurs.get(jid)
-                if joueur:
-                    joueur.vies = 0
-                    joueur.en_vie = False
-                await manager.diffuser(self.room_id, {
-                    **self.snapshot(),
-                    "type": "perte_vie",
-                    "joueur_id": jid,
-                    "raison": "AFK",
-                    "vies_restantes": 0,
-                    "elimine": True,
-                    "message": f"💤 {self.joueurs[jid].nom if jid in self.joueurs else '?'} éliminé pour inactivité (3 tours) !",
-                })
-                vivants = self.joueurs_vivants
-                if len(vivants) <= 1:
-                    await fin_de_partie(self, vivants[0] if vivants else None)
-                    return
-                self.prochain_vivant()
-                await demarrer_tour(self, reset_sequence=True)
+    @classmethod
+    def depuis_etat_compact(cls, etat: tuple) -> "Partie":
+        (room_id, createur_id, etat_partie, config, joueurs, ordre, index_tour,
+         sequence, codes, attente_lac, interpelle, fautif, afk, revision,
+         en_transition, jetons, minuteries) = etat
+        partie = cls(room_id, config_depuis_tuple(config), createur_id)
+        partie.etat = EtatPartie(etat_partie)
+        for jid, nom, vies_j, en_vie, est_ia in joueurs:
+            partie.joueurs[jid] = EtatJoueur(id=jid, nom=nom, vies=vies_j, en_vie=en_vie, est_ia=est_ia)
+        partie.ordre = list(ordre)
+        partie.index_tour = index_tour
+        partie.sequence = sequence
+        index = partie.compteurs.index
+        for code in codes:
+            partie.ajouter_pays_joue(index.entree(code))
+        partie.en_attente_langue_au_chat = attente_lac
+        partie.joueur_interpelle = interpelle
+        partie.joueur_fautif = fautif
+        partie.tours_sans_jouer = dict(afk)
+        partie.revision = revision
+        partie.en_transition = en_transition
+        partie.jetons = dict(jetons)
+        return partie
+
+    def rearmer_minuteries(self, minuteries: tuple):
+        """Après restauration : reprogramme les délais pour leur échéance
+        d'origine (aussitôt si elle est passée), sous leur jeton d'origine
+        (le rejeu du journal reste cohérent)."""
+        maintenant = time.time()
+        for type_, echeance, commande in minuteries:
+            restant = max(0.0, echeance - maintenant)
+            if type_ in self.jetons:
+                self._armer(type_, restant, commande, self.jetons[type_])
             else:
-                await self.appliquer_perte_vie(jid, "⏰ Temps écoulé !")
-        except asyncio.CancelledError:
-            pass
+                self.programmer(type_, restant, commande)
+
+    # ── Délais ────────────────────────────────────────────────
+
+    def programmer(self, type_: str, delai: float, commande: tuple):
+        """Programme `commande` dans `delai` secondes (un délai par type).
+        Le jeton permet d'écarter un délai annulé dont la commande
+        attendait déjà dans la boîte."""
+        jeton = self.jetons[type_] = self.jetons.get(type_, 0) + 1
+        self._armer(type_, delai, commande, jeton)
+
+    def _armer(self, type_: str, delai: float, commande: tuple, jeton: int):
+        self.minuteries[type_] = commande
+        self.planificateur.programmer(self.room_id, type_, delai,
+                                 lambda: self.poster(("minuterie", type_, jeton, commande)))
+
+    def annuler(self, type_: str):
+        self.jetons[type_] = self.jetons.get(type_, 0) + 1
+        self.minuteries.pop(type_, None)
+        self.planificateur.annuler(self.room_id, type_)
+
+    def annuler_tout(self):
+        for type_ in self.jetons:
+            self.jetons[type_] += 1
+        self.minuteries.clear()
+        self.planificateur.annuler_room(self.room_id)
+        self.en_transition = False
+
+    def differer(self, delai: float, commande: tuple):
+        """Pause d'affichage (verdict, mot complet…) avant l'étape suivante.
+        Pendant la pause, les saisies des joueurs sont ignorées."""
+        for type_ in ("chrono", "ia", "langue_au_chat"):
+            self.annuler(type_)
+        self.en_transition = True
+        self.programmer("suite", delai, commande)
+
+    # ── Chrono ────────────────────────────────────────────────
+
+    def annuler_chrono(self):
+        self.annuler("chrono")
+
+    def lancer_chrono(self):
+        """Programme l'expiration du tour du joueur actuel."""
+        # + 0,5 s pour laisser les messages WS en retard arriver
+        self.programmer("chrono", self.config.temps + 0.5, ("chrono", self.joueur_actuel_id))
+
+    async def expirer_chrono(self, jid: str):
+        # Incrémenter AFK
+        self.tours_sans_jouer[jid] = self.tours_sans_jouer.get(jid, 0) + 1
+        afk = self.tours_sans_jouer[jid]
+
+        if afk >= 3:
+            # Élimination directe
+            joueur = self.joueurs.get(jid)
+            if joueur:
+                joueur.vies = 0
+                joueur.en_vie = False
+            await manager.diffuser(self.room_id, self.message_delta(
+                "perte_vie",
+                joueur_id=jid,
+                raison="AFK",
+                vies_restantes=0,
+                elimine=True,
+                message=f"💤 {self.joueurs[jid].nom if jid in self.joueurs else '?'} éliminé pour inactivité (3 tours) !",
+            ))
+            vivants = self.joueurs_vivants
+            if len(vivants) <= 1:
+                await fin_de_partie(self, vivants[0] if vivants else None)
+                return
+            self.prochain_vivant()
+            await demarrer_tour(self, reset_sequence=True)
+        else:
+            await self.appliquer_perte_vie(jid, "⏰ Temps écoulé !")
 
     # ── Perte de vie ──────────────────────────────────────────
 
@@ -313,15 +891,14 @@ class Partie:
             joueur.vies = 0
             joueur.en_vie = False
 
-        await manager.diffuser(self.room_id, {
-            **self.snapshot(),
-            "type": "perte_vie",
-            "joueur_id": joueur_id,
-            "raison": raison,
-            "vies_restantes": joueur.vies,
-            "elimine": not joueur.en_vie,
-            "message": f"💔 {joueur.nom} perd une vie ! ({joueur.vies} restantes)",
-        })
+        await manager.diffuser(self.room_id, self.message_delta(
+            "perte_vie",
+            joueur_id=joueur_id,
+            raison=raison,
+            vies_restantes=joueur.vies,
+            elimine=not joueur.en_vie,
+            message=f"💔 {joueur.nom} perd une vie ! ({joueur.vies} restantes)",
+        ))
 
         vivants = self.joueurs_vivants
         if len(vivants) <= 1:
@@ -334,8 +911,7 @@ class Partie:
         else:
             self.prochain_vivant()
 
-        await asyncio.sleep(0.5)
-        await demarrer_tour(self, reset_sequence=True)
+        self.differer(0.5, ("nouveau_tour",))
 
 
 # ──────────────────────────────────────────────────────────────
@@ -347,6 +923,149 @@ parties: Dict[str, Partie] = {}
 def generer_room_id() -> str:
     return "".join(random.choices(string.ascii_uppercase, k=6))
 
+def nouvelle_partie(room_id: str, config: Config, createur_id: str) -> Partie:
+    """Crée et enregistre une room ; ouvre son histoire dans le journal."""
+    partie = parties[room_id] = Partie(room_id, config, createur_id)
+    journal.ajouter(room_id, 0, 0, (CREATION, config_en_tuple(config), createur_id))
+    stockage.sauver(room_id, partie.etat_compact())
+    cycle.toucher(room_id, partie.etat.value)
+    indexer_partie(partie)
+    return partie
+
+def fermer_partie(room_id: str, raison: str):
+    """Retire une room : délais, acteur, sockets, point de reprise."""
+    partie = parties.pop(room_id, None)
+    cycle.retirer(room_id)
+    if annuaire.retirer(room_id):
+        flux.noter(room_id, FERMEE)
+    if partie is None:
+        return
+    partie.fermer()
+    manager.fermer_room(room_id, raison)
+    stockage.supprimer(room_id)
+
+def resume_partie(p: Partie) -> dict:
+    return {
+        "room_id": p.room_id,
+        "etat": p.etat.value,
+        "joueurs": len(p.joueurs),
+        "max_joueurs": p.config.max_joueurs,
+        "langue": p.config.langue,
+        "mode_jeu": p.config.mode_jeu,
+        "mode_mixte": p.config.mode_mixte,
+        "lexique": p.lexique_id,
+    }
+
+# ──────────────────────────────────────────────────────────────
+#  GRAPPE (MULTI-WORKER)
+# ──────────────────────────────────────────────────────────────
+#  Sans PAYS_REGISTRE : un seul worker, tout est local.
+#  Avec : chaque room appartient à un worker (hachage cohérent du
+#  room_id) ; les autres relaient HTTP et WebSocket vers lui.
+#  `grappe` est créée avec l'app (le middleware de relais en dépend).
+
+def url_proprietaire(room_id: str, relaye: bool = False) -> Optional[str]:
+    """URL du worker qui détient la room, None si elle se sert ici."""
+    if grappe is None or relaye or room_id in parties:
+        return None
+    return grappe.url_distante(room_id)
+
+async def router_vers_proprietaire(request: Request, call_next):
+    segments = request.url.path.strip("/").split("/")
+    if len(segments) >= 2 and segments[0] == "parties":
+        url = url_proprietaire(segments[1], "relaye" in request.query_params)
+        if url:
+            statut, corps, type_contenu = await relayer_http(
+                request.method, url + request.url.path, request.url.query,
+                await request.body(), request.headers.get("content-type"),
+            )
+            return Response(content=corps, status_code=statut, media_type=type_contenu)
+    return await call_next(request)
+
+def publier_rooms() -> Tuple[List[str], List[dict]]:
+    if lobby.connexions.get(LOBBY):
+        annuaire_distant()   # pousse au flux les changements du dernier battement
+    return list(parties), [resume_partie(parties[rid]) for rid in annuaire.cle_de]
+
+# ──────────────────────────────────────────────────────────────
+#  ANNUAIRE DES ROOMS OUVERTES
+# ──────────────────────────────────────────────────────────────
+#  Lobbies rejoignables (en attente, au moins une place), tenus à jour
+#  à chaque commande de la room ; GET /parties n'en lit qu'une page.
+
+annuaire = AnnuaireRooms()
+_annuaire_distant = AnnuaireRooms()
+_vue_indexee: Optional[dict] = None
+_cache_parties = CacheReponses()
+
+def cle_annuaire(p: Partie) -> Optional[tuple]:
+    if p.etat != EtatPartie.ATTENTE or p.fermee:
+        return None
+    places = p.config.max_joueurs - len(p.joueurs)
+    if places <= 0:
+        return None
+    return (p.config.langue, p.config.mode_jeu, p.config.mode_mixte, places)
+
+def indexer_partie(p: Partie):
+    ancienne = annuaire.cle_de.get(p.room_id)
+    cle = cle_annuaire(p)
+    if annuaire.placer(p.room_id, cle, lambda: encoder_json(resume_partie(p))):
+        if cle is not None:
+            flux.noter(p.room_id, MAJ if ancienne else CREEE, annuaire.fragment(p.room_id))
+        else:
+            flux.noter(p.room_id, DEMARREE if p.etat == EtatPartie.EN_COURS else FERMEE)
+
+def annuaire_distant() -> AnnuaireRooms:
+    """Rooms ouvertes des autres workers, réindexées à chaque nouvelle vue
+    du registre (un battement), pas à chaque requête. Les différences avec
+    la vue précédente partent dans le flux du lobby."""
+    global _vue_indexee
+    if grappe is not None and grappe.vue is not _vue_indexee:
+        _vue_indexee = grappe.vue
+        avant = {room_id: _annuaire_distant.fragment(room_id) for room_id in _annuaire_distant.cle_de}
+        for room_id in avant:
+            _annuaire_distant.retirer(room_id)
+        for r in grappe.rooms_ouvertes_distantes():
+            places = r["max_joueurs"] - r["joueurs"]
+            if places > 0:
+                cle = (r["langue"], r.get("mode_jeu", "classique"), r.get("mode_mixte", False), places)
+                _annuaire_distant.placer(r["room_id"], cle, lambda r=r: encoder_json(r))
+        for room_id in _annuaire_distant.cle_de:
+            connue = room_id in avant
+            fragment = _annuaire_distant.fragment(room_id)
+            if avant.pop(room_id, None) != fragment:
+                flux.noter(room_id, MAJ if connue else CREEE, fragment)
+        for room_id in avant:
+            flux.noter(room_id, FERMEE)
+    return _annuaire_distant
+
+# ── Flux du lobby ──────────────────────────────────────────────
+#  Les abonnés de /ws/lobby reçoivent la liste une fois, puis les
+#  changements de l'annuaire, un lot par intervalle au plus.
+
+LOBBY = "lobby"   # « room » unique du gestionnaire des abonnés
+
+def message_lobby() -> dict:
+    annuaires = [annuaire] if grappe is None else [annuaire, annuaire_distant()]
+    fragments, total = paginer(annuaires, 0, 100, places_min=1)
+    return {"type": "lobby", "rooms": JsonBrut("[" + ",".join(fragments) + "]"), "total": total}
+
+def publier_lobby(lot: List[Tuple[str, str, Optional[str]]]):
+    connexions = list(lobby.connexions.get(LOBBY, {}).values())
+    flux.actif = bool(connexions)
+    if not connexions:
+        return
+    evenements = [{"evt": evt, "room": JsonBrut(fragment)} if fragment is not None
+                  else {"evt": evt, "room_id": room_id}
+                  for room_id, evt, fragment in lot]
+    texte = encoder_json({"type": "lobby_maj", "evenements": evenements})
+    for connexion in connexions:
+        # Porte un état : en cas de débordement, remplacé par la liste complète
+        connexion.deposer(texte, True)
+
+lobby = ConnectionManager(etat_complet=lambda _: message_lobby())
+flux = FluxLobby(publier_lobby, float(os.environ.get("PAYS_LOBBY_INTERVALLE", "0.5")))
+
 # ──────────────────────────────────────────────────────────────
 #  LOGIQUE DE JEU
 # ──────────────────────────────────────────────────────────────
@@ -360,33 +1079,27 @@ async def demarrer_tour(partie: Partie, reset_sequence: bool = True):
 
     partie.annuler_chrono()
 
-    snap = {
-        **partie.snapshot(),
-        "type": "nouveau_tour",
-        "message": f"Tour de {partie.joueurs[partie.joueur_actuel_id].nom}",
-    }
+    msg = partie.message_delta(
+        "nouveau_tour",
+        message=f"Tour de {partie.joueurs[partie.joueur_actuel_id].nom}",
+    )
 
     # Avertissement Niger/Nigeria
     if partie.sequence:
-        seq_norm = normaliser(partie.sequence)
-        pays_list = get_pays(partie.config.langue)
-        pays_exact = next((p for p in pays_list if p["nom_normalise"] == seq_norm), None)
-        pays_plus_long = any(
-            p["nom_normalise"] != seq_norm
-            and p["nom_normalise"].startswith(seq_norm)
-            and p["nom_normalise"] not in partie.pays_joues_noms
-            for p in pays_list
-        )
-        if pays_exact and pays_plus_long:
-            snap["sequence_est_pays"] = True
-            snap["sequence_pays_nom"] = pays_exact["nom"]
+        index = partie.compteurs.index
+        n = index.noeud(partie.sequence)
+        pays_exact = index.exact_noeud(n, mode_mixte=False)
+        if pays_exact and partie.compteurs.a_suite_non_jouee(n, mode_mixte=False):
+            msg["sequence_est_pays"] = True
+            msg["sequence_pays_nom"] = pays_exact.nom
 
-    await manager.diffuser(partie.room_id, snap)
+    await manager.diffuser(partie.room_id, msg)
 
-    partie.chrono_task = asyncio.create_task(partie.lancer_chrono())
+    partie.lancer_chrono()
 
+    partie.annuler("ia")
     if partie.joueurs[partie.joueur_actuel_id].est_ia:
-        asyncio.create_task(ia_jouer(partie))
+        partie.programmer("ia", partie.rng.uniform(1.2, 2.8), ("ia",))
 
 
 async def appliquer_perte_vie_externe(partie: Partie, joueur_id: str, raison: str):
@@ -404,20 +1117,14 @@ async def traiter_lettre(partie: Partie, joueur_id: str, lettre: str):
         await manager.envoyer(partie.room_id, joueur_id, {"type": "erreur", "message": "En attente de réponse langue au chat."})
         return
 
-    nouvelle_seq = partie.sequence + normaliser(lettre)
-    possibilites = chercher_pays(nouvelle_seq, partie.config.langue, partie.config.mode_mixte)
-
-    if not possibilites:
-        import time
+    nouvelle_seq = partie.sequence + normaliser_lettre(lettre)
+    if not existe_suite(nouvelle_seq, partie.lexique_id, partie.config.mode_mixte):
         partie.sequence = nouvelle_seq
         partie.joueur_fautif = joueur_id
-        await manager.diffuser(partie.room_id, {
-            **partie.snapshot(),
-            "type": "sequence_invalide",
-            "sequence": nouvelle_seq,
-            "joueur_fautif": joueur_id,
-            "message": f"« {nouvelle_seq} » ne commence aucun pays.",
-        })
+        await manager.diffuser(partie.room_id, partie.message_delta(
+            "sequence_invalide",
+            message=f"« {nouvelle_seq} » ne commence aucun pays.",
+        ))
         partie.prochain_vivant()
         await demarrer_tour(partie, reset_sequence=False)
         return
@@ -425,26 +1132,24 @@ async def traiter_lettre(partie: Partie, joueur_id: str, lettre: str):
     partie.sequence = nouvelle_seq
     partie.annuler_chrono()
 
-    match = est_complet(nouvelle_seq, partie.config.langue, partie.config.mode_mixte, partie.pays_joues_noms)
+    match = est_complet(nouvelle_seq, partie.lexique_id, partie.config.mode_mixte,
+                        compteurs=partie.compteurs)
 
     if match:
-        cle = match["nom_normalise"]
-        if cle in partie.pays_joues_noms:
-            await appliquer_perte_vie_externe(partie, joueur_id, f"🔁 {match['nom']} a déjà été joué !")
+        cle = match.nom_normalise
+        if partie.deja_joue(cle):
+            await appliquer_perte_vie_externe(partie, joueur_id, f"🔁 {match.nom} a déjà été joué !")
             return
 
-        partie.pays_joues.append(match)
-        partie.pays_joues_noms.add(cle)
-
-        await manager.diffuser(partie.room_id, {
-            **partie.snapshot(),
-            "type": "mot_complet",
-            "pays": match,
-            "joueur_fautif": joueur_id,
-            "message": f"💀 {partie.joueurs[joueur_id].nom} a complété « {match['nom']} » et perd une vie !",
-        })
-        await asyncio.sleep(1.5)
-        await appliquer_perte_vie_externe(partie, joueur_id, "Mot complet")
+        partie.ajouter_pays_joue(match)
+
+        await manager.diffuser(partie.room_id, partie.message_delta(
+            "mot_complet",
+            pays=partie.dernier_pays_json(),
+            joueur_fautif=joueur_id,
+            message=f"💀 {partie.joueurs[joueur_id].nom} a complété « {match.nom} » et perd une vie !",
+        ))
+        partie.differer(1.5, ("perte_vie", joueur_id, "Mot complet"))
     else:
         partie.prochain_vivant()
         await demarrer_tour(partie, reset_sequence=False)
@@ -472,66 +1177,51 @@ async def traiter_langue_au_chat(partie: Partie, demandeur_id: str):
 
     DELAI = 20
 
-    await manager.diffuser(partie.room_id, {
-        **partie.snapshot(),
-        "type": "langue_au_chat",
-        "demandeur": demandeur_id,
-        "interpelle": interpelle_id,
-        "delai": DELAI,
-        "message": f"🗣️ {partie.joueurs[demandeur_id].nom} demande une langue au chat ! {partie.joueurs[interpelle_id].nom}, tu as {DELAI}s !",
-    })
+    await manager.diffuser(partie.room_id, partie.message_delta(
+        "langue_au_chat",
+        demandeur=demandeur_id,
+        interpelle=interpelle_id,
+        delai=DELAI,
+        message=f"🗣️ {partie.joueurs[demandeur_id].nom} demande une langue au chat ! {partie.joueurs[interpelle_id].nom}, tu as {DELAI}s !",
+    ))
 
-    if partie.lac_timeout_task and not partie.lac_timeout_task.done():
-        partie.lac_timeout_task.cancel()
+    partie.annuler("langue_au_chat")
 
     if partie.joueurs[interpelle_id].est_ia:
-        asyncio.create_task(_ia_repondre_langue_au_chat(partie, interpelle_id))
+        partie.programmer("ia", partie.rng.uniform(1.5, 3.0), ("ia_langue_au_chat", interpelle_id))
     else:
-        partie.lac_timeout_task = asyncio.create_task(
-            _timeout_langue_au_chat(partie, interpelle_id, DELAI)
-        )
+        partie.programmer("langue_au_chat", DELAI, ("timeout_langue_au_chat", interpelle_id))
 
 
-async def _timeout_langue_au_chat(partie: Partie, interpelle_id: str, delai: int):
-    try:
-        await asyncio.sleep(delai)
-        if not partie.en_attente_langue_au_chat or partie.joueur_interpelle != interpelle_id:
-            return
-        # Débloquer EN PREMIER
-        partie.en_attente_langue_au_chat = False
-        partie.joueur_interpelle = None
-        await manager.diffuser(partie.room_id, {
-            **partie.snapshot(),
-            "type": "verdict_langue_au_chat",
-            "valide": False,
-            "interpelle": interpelle_id,
-            "message": f"⏰ {partie.joueurs.get(interpelle_id, EtatJoueur(id='',nom='?',vies=0)).nom} n'a pas répondu à temps !",
-        })
-        await asyncio.sleep(1.5)
-        await appliquer_perte_vie_externe(partie, interpelle_id, "Langue au chat — timeout")
-    except asyncio.CancelledError:
-        pass
+async def _timeout_langue_au_chat(partie: Partie, interpelle_id: str):
+    # Débloquer EN PREMIER
+    partie.en_attente_langue_au_chat = False
+    partie.joueur_interpelle = None
+    await manager.diffuser(partie.room_id, partie.message_delta(
+        "verdict_langue_au_chat",
+        valide=False,
+        interpelle=interpelle_id,
+        message=f"⏰ {partie.joueurs.get(interpelle_id, EtatJoueur(id='',nom='?',vies=0)).nom} n'a pas répondu à temps !",
+    ))
+    partie.differer(1.5, ("perte_vie", interpelle_id, "Langue au chat — timeout"))
 
 
+@metriques.chronometrer(DUREE_IA)
 async def _ia_repondre_langue_au_chat(partie: Partie, ia_id: str):
-    await asyncio.sleep(random.uniform(1.5, 3.0))
-    if not partie.en_attente_langue_au_chat or partie.joueur_interpelle != ia_id:
+    # Premier pays non joué sous la séquence : lu dans le livre d'ouvertures
+    # si possible, sinon cherché — même réponse dans les deux cas, pour que
+    # le rejeu ne dépende pas de la présence du livre.
+    index = partie.compteurs.index
+    i = get_solveur(partie.lexique_id, partie.config.mode_mixte).reponse(partie.sequence, partie.compteurs.joues)
+    if i is not None:
+        await traiter_reponse_langue_au_chat(partie, ia_id, index.resultats_pays[i].nom)
         return
 
-    seq_norm = normaliser(partie.sequence)
-    pays_list = get_pays(partie.config.langue)
-    candidats = [
-        p for p in pays_list
-        if p["nom_normalise"].startswith(seq_norm)
-        and p["nom_normalise"] not in partie.pays_joues_noms
-    ]
-
-    if candidats:
-        pays = random.choice(candidats)
-        valeur = pays["nom"]
-        await traiter_reponse_langue_au_chat(partie, ia_id, valeur)
-    else:
-        await traiter_reponse_langue_au_chat(partie, ia_id, "___RIEN___")
+    pays = next((
+        p for p in index.chercher(partie.sequence, mode_mixte=False)
+        if not partie.deja_joue(p.nom_normalise)
+    ), None)
+    await traiter_reponse_langue_au_chat(partie, ia_id, pays.nom if pays else "___RIEN___")
 
 
 async def traiter_reponse_langue_au_chat(partie: Partie, joueur_id: str, pays_propose: str):
@@ -542,108 +1232,240 @@ async def traiter_reponse_langue_au_chat(partie: Partie, joueur_id: str, pays_pr
         return
 
     # Annuler timeout
-    if partie.lac_timeout_task and not partie.lac_timeout_task.done():
-        partie.lac_timeout_task.cancel()
-        partie.lac_timeout_task = None
+    partie.annuler("langue_au_chat")
 
     # Débloquer
     partie.en_attente_langue_au_chat = False
         
     nom_norm = normaliser(pays_propose)
-    pays_list = get_pays(partie.config.langue)
-    match = next((p for p in pays_list if p["nom_normalise"] == nom_norm), None)
-    if match is None and partie.config.mode_mixte:
-        match = next((p for p in pays_list if p.get("capitale_normalisee") == nom_norm), None)
+    match = partie.compteurs.index.exact(nom_norm, partie.config.mode_mixte)
 
-    seq_norm = normaliser(partie.sequence)
+    seq_norm = partie.sequence
     demandeur_id = partie.joueur_actuel_id
 
     if match is None:
-        await manager.diffuser(partie.room_id, {
-            **partie.snapshot(),
-            "type": "verdict_langue_au_chat",
-            "valide": False,
-            "message": f"❌ « {pays_propose} » n'existe pas ! {partie.joueurs[joueur_id].nom} perd une vie.",
-        })
-        await asyncio.sleep(1.5)
-        await appliquer_perte_vie_externe(partie, joueur_id, "Pays inexistant")
-
-    elif match["nom_normalise"] in partie.pays_joues_noms:
-        await manager.diffuser(partie.room_id, {
-            **partie.snapshot(),
-            "type": "verdict_langue_au_chat",
-            "valide": False,
-            "message": f"🔁 {match['nom']} déjà joué ! {partie.joueurs[joueur_id].nom} perd une vie.",
-        })
-        await asyncio.sleep(1.5)
-        await appliquer_perte_vie_externe(partie, joueur_id, "Pays déjà joué")
-
-    elif not match["nom_normalise"].startswith(seq_norm):
-        await manager.diffuser(partie.room_id, {
-            **partie.snapshot(),
-            "type": "verdict_langue_au_chat",
-            "valide": False,
-            "message": f"⚠️ {match['nom']} ne commence pas par « {partie.sequence} » !",
-        })
-        await asyncio.sleep(1.5)
-        await appliquer_perte_vie_externe(partie, joueur_id, "Séquence incorrecte")
+        await manager.diffuser(partie.room_id, partie.message_delta(
+            "verdict_langue_au_chat",
+            valide=False,
+            message=f"❌ « {pays_propose} » n'existe pas ! {partie.joueurs[joueur_id].nom} perd une vie.",
+        ))
+        partie.differer(1.5, ("perte_vie", joueur_id, "Pays inexistant"))
+
+    elif partie.deja_joue(match.nom_normalise):
+        await manager.diffuser(partie.room_id, partie.message_delta(
+            "verdict_langue_au_chat",
+            valide=False,
+            message=f"🔁 {match.nom} déjà joué ! {partie.joueurs[joueur_id].nom} perd une vie.",
+        ))
+        partie.differer(1.5, ("perte_vie", joueur_id, "Pays déjà joué"))
+
+    elif not match.nom_normalise.startswith(seq_norm):
+        await manager.diffuser(partie.room_id, partie.message_delta(
+            "verdict_langue_au_chat",
+            valide=False,
+            message=f"⚠️ {match.nom} ne commence pas par « {partie.sequence} » !",
+        ))
+        partie.differer(1.5, ("perte_vie", joueur_id, "Séquence incorrecte"))
 
     else:
-        partie.pays_joues.append(match)
-        partie.pays_joues_noms.add(match["nom_normalise"])
-        await manager.diffuser(partie.room_id, {
-            **partie.snapshot(),
-            "type": "verdict_langue_au_chat",
-            "valide": True,
-            "pays": match,
-            "message": f"✅ {match['nom']} est valide ! {partie.joueurs[demandeur_id].nom} perd une vie.",
-        })
-        await asyncio.sleep(1.5)
-        await appliquer_perte_vie_externe(partie, demandeur_id, "Langue au chat perdue")
+        partie.ajouter_pays_joue(match)
+        await manager.diffuser(partie.room_id, partie.message_delta(
+            "verdict_langue_au_chat",
+            valide=True,
+            pays=partie.dernier_pays_json(),
+            message=f"✅ {match.nom} est valide ! {partie.joueurs[demandeur_id].nom} perd une vie.",
+        ))
+        partie.differer(1.5, ("perte_vie", demandeur_id, "Langue au chat perdue"))
 
 
 async def fin_de_partie(partie: Partie, gagnant_id: Optional[str]):
     partie.etat = EtatPartie.TERMINEE
-    partie.annuler_chrono()
+    partie.annuler_tout()
     gagnant_nom = partie.joueurs[gagnant_id].nom if gagnant_id and gagnant_id in partie.joueurs else "Personne"
-    await manager.diffuser(partie.room_id, {
-        **partie.snapshot(),
-        "type": "fin_partie",
-        "gagnant": gagnant_id,
-        "message": f"🏆 {gagnant_nom} remporte la partie !",
-    })
+    await manager.diffuser(partie.room_id, partie.message_delta(
+        "fin_partie",
+        gagnant=gagnant_id,
+        message=f"🏆 {gagnant_nom} remporte la partie !",
+    ))
 
 # ──────────────────────────────────────────────────────────────
 #  IA
 # ──────────────────────────────────────────────────────────────
 
+@metriques.chronometrer(DUREE_IA)
 async def ia_jouer(partie: Partie):
-    await asyncio.sleep(random.uniform(1.2, 2.8))
-
-    if partie.etat != EtatPartie.EN_COURS:
-        return
-    if not partie.joueurs.get(partie.joueur_actuel_id, EtatJoueur(id="", nom="", vies=0)).est_ia:
-        return
-
-    seq_norm = normaliser(partie.sequence)
-    possibilites = chercher_pays(seq_norm, partie.config.langue, partie.config.mode_mixte)
-    non_joues = [p for p in possibilites if p["nom_normalise"] not in partie.pays_joues_noms]
-
-    if not non_joues:
+    # Le hasard reste dans la room (rejouable) ; le calcul part au service,
+    # évalué avec les demandes des autres rooms du même tour de boucle.
+    optimal = partie.rng.random() < NIVEAUX_IA.get(partie.config.difficulte_ia, NIVEAUX_IA["moyen"])
+    decision = await service_ia.decider(
+        get_solveur(partie.lexique_id, partie.config.mode_mixte), partie.sequence,
+        partie.compteurs.joues, len(partie.joueurs_vivants), optimal)
+
+    if not decision.nb_possibles or not (decision.gagnantes or decision.lettres):
         if partie.joueur_fautif and partie.joueur_fautif != partie.joueur_actuel_id:
             await traiter_langue_au_chat(partie, partie.joueur_actuel_id)
         else:
             await partie.appliquer_perte_vie(partie.joueur_actuel_id, "IA piégée")
         return
 
-    cibles = [p for p in non_joues if len(p["nom_normalise"]) > len(seq_norm) + 1]
-    if not cibles:
-        cibles = non_joues
+    # Coup optimal si demandé et trouvé ; sinon ne pas compléter tout de suite
+    lettre = partie.rng.choice(decision.gagnantes or decision.lettres)
+    await traiter_lettre(partie, partie.joueur_actuel_id, lettre)
+
+# ──────────────────────────────────────────────────────────────
+#  LOBBY & CONNEXIONS
+# ──────────────────────────────────────────────────────────────
+
+async def rejoindre_partie(partie: Partie, joueur_id: str, nom: str) -> Optional[Tuple[int, str]]:
+    """Inscrit le joueur ; renvoie (code, raison) de fermeture si refusé."""
+    if joueur_id in partie.joueurs:
+        return None
+    if partie.etat == EtatPartie.EN_COURS:
+        return 4001, "Partie deja en cours"
+    if len(partie.joueurs) >= partie.config.max_joueurs:
+        return 4002, "Partie pleine"
+    if len(joueur_id) > MAX_LONGUEUR_ID:
+        return 4003, "Identifiant trop long"
+    partie.joueurs[joueur_id] = EtatJoueur(
+        id=joueur_id,
+        nom=nom[:MAX_LONGUEUR_PSEUDO] or f"Joueur{len(partie.joueurs)+1}",
+        vies=partie.config.vies,
+    )
+    return None
+
+
+async def annoncer_arrivee(partie: Partie, joueur_id: str):
+    # L'arrivant reçoit l'état complet, les autres seulement le delta
+    rejoint = partie.message_delta(
+        "joueur_rejoint",
+        joueur_id=joueur_id,
+        message=f"👋 {partie.joueurs[joueur_id].nom} a rejoint !",
+    )
+    await manager.envoyer(partie.room_id, joueur_id, partie.message_complet("etat"))
+    await manager.diffuser(partie.room_id, rejoint)
+
+    # Reconnexion en cours de partie : envoyer l'état actuel
+    if partie.etat == EtatPartie.EN_COURS:
+        await manager.envoyer(partie.room_id, joueur_id, partie.message_complet(
+            "partie_demarree",
+            message="🎮 Synchronisation…",
+        ))
 
-    pays_cible = random.choice(cibles)
-    nom_cible = pays_cible["nom_normalise"]
-    lettre_suivante = nom_cible[len(seq_norm)]
-    await traiter_lettre(partie, partie.joueur_actuel_id, lettre_suivante)
+
+async def ajouter_joueur_ia(partie: Partie, ia_id: str):
+    partie.joueurs[ia_id] = EtatJoueur(
+        id=ia_id, nom="🤖 Ordinateur", vies=partie.config.vies, est_ia=True
+    )
+    await manager.diffuser(partie.room_id, partie.message_delta(
+        "joueur_rejoint",
+        message="🤖 L'ordinateur a rejoint la partie !",
+    ))
+
+
+async def lancer_partie(partie: Partie) -> Optional[str]:
+    """Démarre la partie ; renvoie un message d'erreur si impossible."""
+    if partie.etat != EtatPartie.ATTENTE:
+        return "Partie déjà démarrée"
+    if len(partie.joueurs) < 1:
+        return "Pas assez de joueurs"
+
+    partie.etat = EtatPartie.EN_COURS
+    partie.ordre = list(partie.joueurs.keys())
+    partie.rng.shuffle(partie.ordre)
+    partie.index_tour = 0
+
+    await manager.diffuser(partie.room_id, partie.message_delta(
+        "partie_demarree",
+        message="🎮 La partie commence !",
+    ))
+    await demarrer_tour(partie)
+    return None
+
+
+async def traiter_deconnexion(partie: Partie, joueur_id: str):
+    if joueur_id not in partie.joueurs:
+        return
+    await manager.diffuser(partie.room_id, partie.message_delta(
+        "joueur_parti",
+        joueur_id=joueur_id,
+        message=f"⚠️ {partie.joueurs[joueur_id].nom} s'est déconnecté(e).",
+    ))
+
+    # Pendant une pause, l'étape suivante est déjà programmée
+    if partie.etat != EtatPartie.EN_COURS or partie.en_transition:
+        return
+
+    # Joueur interpellé (langue au chat) se déconnecte
+    if partie.en_attente_langue_au_chat and partie.joueur_interpelle == joueur_id:
+        partie.en_attente_langue_au_chat = False
+        partie.joueur_interpelle = None
+        await manager.diffuser(partie.room_id, partie.message_delta(
+            "verdict_langue_au_chat",
+            valide=False,
+            message="🔌 Joueur déconnecté — langue au chat annulée.",
+        ))
+        partie.differer(1.0, ("perte_vie", joueur_id, "Déconnexion pendant langue au chat"))
+
+    # C'était son tour
+    elif partie.joueur_actuel_id == joueur_id:
+        partie.annuler_chrono()
+        partie.prochain_vivant()
+        await demarrer_tour(partie, reset_sequence=False)
+
+# ──────────────────────────────────────────────────────────────
+#  ACTEUR — AIGUILLAGE DES COMMANDES
+# ──────────────────────────────────────────────────────────────
+
+COMMANDES = {
+    # Saisies des joueurs
+    "lettre":                 traiter_lettre,
+    "langue_au_chat":         traiter_langue_au_chat,
+    "reponse_langue_au_chat": traiter_reponse_langue_au_chat,
+    # Lobby & connexions
+    "rejoindre":              rejoindre_partie,
+    "arrivee":                annoncer_arrivee,
+    "ajouter_ia":             ajouter_joueur_ia,
+    "demarrer":               lancer_partie,
+    "deconnexion":            traiter_deconnexion,
+    # Délais
+    "chrono":                 Partie.expirer_chrono,
+    "timeout_langue_au_chat": _timeout_langue_au_chat,
+    "ia":                     ia_jouer,
+    "ia_langue_au_chat":      _ia_repondre_langue_au_chat,
+    "perte_vie":              Partie.appliquer_perte_vie,
+    "nouveau_tour":           demarrer_tour,
+}
+
+# Ignorées pendant une pause d'affichage (`Partie.differer`)
+SAISIES_JOUEUR = {"lettre", "langue_au_chat", "reponse_langue_au_chat"}
+
+
+async def executer_commande(partie: Partie, commande: tuple, graine: Optional[int] = None):
+    """Exécute une commande de la boîte. Les délais périmés (annulés ou
+    reprogrammés après le dépôt de leur commande) sont écartés ici, une
+    fois pour toutes. Avec la même graine, le résultat est identique :
+    c'est ce qui rend le journal rejouable."""
+    if graine is not None or partie.rng is None:
+        partie.rng = random.Random(graine)
+    nom, *args = commande
+    if nom == "minuterie":
+        type_, jeton, commande = args
+        if partie.jetons.get(type_) != jeton:
+            compter_minuterie(type_, False)
+            return None
+        compter_minuterie(type_, True)
+        partie.minuteries.pop(type_, None)
+        if type_ == "suite":
+            partie.en_transition = False
+        nom, *args = commande
+    elif nom in SAISIES_JOUEUR and partie.en_transition:
+        return None
+    gestionnaire = COMMANDES[nom]
+    surveillant.marquer(partie.room_id, gestionnaire.__name__)
+    try:
+        return await gestionnaire(partie, *args)
+    finally:
+        surveillant.marquer(None, None)
 
 # ──────────────────────────────────────────────────────────────
 #  ROUTES HTTP
@@ -653,134 +1475,220 @@ async def ia_jouer(partie: Partie):
 async def root():
     return {"status": "ok", "message": "Pays Game Server 🌍"}
 
+def _rooms_par_etat() -> Dict[str, int]:
+    compte = {e.value: 0 for e in EtatPartie}
+    for p in parties.values():
+        compte[p.etat.value] += 1
+    return compte
+
+metriques.jauge("pays_rooms", "Rooms par état", _rooms_par_etat, ("etat",))
+metriques.jauge("pays_sockets_ouvertes", "WebSockets connectées",
+                lambda: sum(len(c) for c in manager.connexions.values()))
+metriques.jauge("pays_delais_programmes", "Délais en attente dans le planificateur",
+                lambda: len(planificateur))
+metriques.jauge("pays_lexiques_charges", "Lexiques chargés en mémoire",
+                lambda: len(lexiques.lexiques))
+metriques.jauge("pays_chaines_internees", "Chaînes du pool partagé entre lexiques",
+                lambda: len(lexiques.pool))
+metriques.jauge("pays_rooms_octets", "Mémoire propre des rooms (Partie.octets)",
+                lambda: sum(p.octets() for p in parties.values()))
+metriques.jauge("pays_lobby_abonnes", "Sockets abonnées au flux du lobby",
+                lambda: len(lobby.connexions.get(LOBBY, {})))
+metriques.jauge("pays_lobby_lots", "Lots d'événements envoyés au flux du lobby",
+                lambda: flux.nb_lots)
+metriques.jauge("pays_ia_lots", "Lots de décisions IA évalués",
+                lambda: service_ia.nb_lots)
+metriques.jauge("pays_ia_demandes", "Décisions IA évaluées (toutes rooms)",
+                lambda: service_ia.nb_demandes)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def exposer_metriques():
+    return PlainTextResponse(metriques.registre.exposer(),
+                             media_type="text/plain; version=0.0.4")
+
+_profil_en_cours = False
+
+@app.get("/admin/profil", response_class=PlainTextResponse)
+async def profiler(secondes: float = 10.0, intervalle: float = 0.005,
+                   x_admin_token: str = Header(default="")):
+    """Échantillonne la boucle pendant `secondes` ; piles repliées
+    (flamegraph.pl / speedscope). Désactivé sans PAYS_ADMIN_TOKEN."""
+    global _profil_en_cours
+    attendu = os.environ.get("PAYS_ADMIN_TOKEN")
+    if not attendu:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token.encode(), attendu.encode()):
+        raise HTTPException(status_code=403, detail="Jeton admin invalide")
+    if _profil_en_cours:
+        raise HTTPException(status_code=409, detail="Profilage déjà en cours")
+    _profil_en_cours = True
+    try:
+        echantillonneur = Echantillonneur(threading.get_ident(), max(0.001, intervalle))
+        texte = await echantillonneur.mesurer(min(max(secondes, 0.1), 120.0))
+    finally:
+        _profil_en_cours = False
+    return PlainTextResponse(texte)
+
 @app.get("/parties")
-async def lister_parties():
-    return [
-        {
-            "room_id": p.room_id,
-            "etat": p.etat.value,
-            "joueurs": len(p.joueurs),
-            "max_joueurs": p.config.max_joueurs,
-            "langue": p.config.langue,
-        }
-        for p in parties.values()
-        if p.etat == EtatPartie.ATTENTE
-    ]
+async def lister_parties(request: Request, langue: Optional[str] = None, mode: Optional[str] = None,
+                         mixte: Optional[bool] = None, places: int = 1, page: int = 0, limite: int = 50):
+    """Lobbies rejoignables, les plus remplis d'abord : une page lue dans
+    l'annuaire (rooms locales puis celles des autres workers). Réponse
+    mise en cache tant que l'annuaire ne change pas ; ETag + 304."""
+    limite = min(max(limite, 1), 100)
+    page = max(page, 0)
+    annuaires = [annuaire] if grappe is None else [annuaire, annuaire_distant()]
+    etiquette = ".".join(a.etiquette for a in annuaires)
+    etag = f'"{etiquette}"'
+    entetes = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=entetes)
+
+    requete = (langue, mode, mixte, places, page, limite)
+    en_cache = _cache_parties.lire(requete, etiquette)
+    if en_cache is None:
+        fragments, total = paginer(annuaires, page * limite, limite, langue=langue, mode=mode,
+                                   mixte=mixte, places_min=max(places, 1))
+        en_cache = "[" + ",".join(fragments) + "]", total
+        _cache_parties.ecrire(requete, etiquette, *en_cache)
+    corps, total = en_cache
+    entetes["X-Total-Count"] = str(total)
+    return Response(corps, media_type="application/json", headers=entetes)
 
 @app.post("/parties")
 async def creer_partie(config: Config):
+    if not lexiques.existe(lexique_de(config)):
+        raise HTTPException(status_code=404, detail="Lexique introuvable")
+    if config.difficulte_ia not in NIVEAUX_IA:
+        raise HTTPException(status_code=400, detail=f"Difficulté inconnue ({', '.join(NIVEAUX_IA)})")
+    if not 1 <= config.max_joueurs <= MAX_JOUEURS:
+        raise HTTPException(status_code=400, detail=f"max_joueurs : entre 1 et {MAX_JOUEURS}")
+    # En grappe, tirer un id dont ce worker est propriétaire (≈ N essais)
     room_id = generer_room_id()
-    while room_id in parties:
+    while room_id in parties or (grappe and not grappe.est_local(room_id)):
         room_id = generer_room_id()
-    parties[room_id] = Partie(room_id, config, createur_id="")
+    nouvelle_partie(room_id, config, createur_id="")
     return {"room_id": room_id, "lien": f"/rejoindre/{room_id}"}
 
+@app.get("/lexiques")
+async def lister_lexiques():
+    return lexiques.lister()
+
+class NouveauLexique(BaseModel):
+    titre:   str
+    langue:  str = "fr"
+    entrees: List[dict]   # [{"nom": …, "capitale": …, "code": …}, …]
+
+@app.post("/lexiques")
+async def importer_lexique(lexique: NouveauLexique):
+    """Liste personnalisée ; à passer ensuite dans `Config.lexique`."""
+    try:
+        lexique_id = lexiques.importer(lexique.titre, lexique.langue, lexique.entrees)
+    except LimiteLexiques as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"lexique": lexique_id}
+
 @app.get("/parties/{room_id}")
 async def info_partie(room_id: str):
     if room_id not in parties:
         raise HTTPException(status_code=404, detail="Partie introuvable")
-    return parties[room_id].snapshot()
+    return Response(encoder_json(parties[room_id].snapshot()), media_type="application/json")
 
 @app.post("/parties/{room_id}/demarrer")
 async def demarrer_partie(room_id: str, joueur_id: str):
     if room_id not in parties:
         raise HTTPException(status_code=404, detail="Partie introuvable")
-    partie = parties[room_id]
-    if partie.etat != EtatPartie.ATTENTE:
-        raise HTTPException(status_code=400, detail="Partie déjà démarrée")
-    if len(partie.joueurs) < 1:
-        raise HTTPException(status_code=400, detail="Pas assez de joueurs")
-
-    partie.etat = EtatPartie.EN_COURS
-    partie.ordre = list(partie.joueurs.keys())
-    random.shuffle(partie.ordre)
-    partie.index_tour = 0
-
-    await manager.diffuser(room_id, {
-        **partie.snapshot(),
-        "type": "partie_demarree",
-        "message": "🎮 La partie commence !",
-    })
-    await demarrer_tour(partie)
+    try:
+        erreur = await parties[room_id].demander(("demarrer",))
+    except PartieFermee:
+        raise HTTPException(status_code=404, detail="Partie introuvable")
+    if erreur:
+        raise HTTPException(status_code=400, detail=erreur)
     return {"status": "ok"}
 
 @app.post("/parties/{room_id}/ia")
 async def ajouter_ia(room_id: str):
     if room_id not in parties:
         raise HTTPException(status_code=404, detail="Partie introuvable")
-    partie = parties[room_id]
     ia_id = f"ia_{random.randint(1000, 9999)}"
-    partie.joueurs[ia_id] = EtatJoueur(
-        id=ia_id, nom="🤖 Ordinateur", vies=partie.config.vies, est_ia=True
-    )
-    await manager.diffuser(room_id, {
-        **partie.snapshot(),
-        "type": "joueur_rejoint",
-        "message": "🤖 L'ordinateur a rejoint la partie !",
-    })
+    try:
+        await parties[room_id].demander(("ajouter_ia", ia_id))
+    except PartieFermee:
+        raise HTTPException(status_code=404, detail="Partie introuvable")
     return {"ia_id": ia_id}
 
 # ──────────────────────────────────────────────────────────────
 #  WEBSOCKET PRINCIPAL
 # ──────────────────────────────────────────────────────────────
 
+async def refuser(websocket: WebSocket, code: int, raison: str):
+    """Refuse une connexion pas encore acceptée. Relayée, elle est d'abord
+    acceptée : le code de refus doit traverser le relais (voir
+    `relayer_websocket`)."""
+    if "relaye" in websocket.query_params:
+        await websocket.accept()
+    await websocket.close(code=code, reason=raison)
+
+async def recevoir_objet(websocket: WebSocket) -> Optional[dict]:
+    """Trame suivante si c'est un objet JSON, None sinon (trame ignorée)."""
+    try:
+        data = await websocket.receive_json()
+    except (ValueError, KeyError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
 @app.websocket("/ws/{room_id}/{joueur_id}/{nom}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str, joueur_id: str, nom: str):
-    from urllib.parse import unquote
+    from urllib.parse import quote, unquote
     joueur_id = unquote(joueur_id)
     nom       = unquote(nom)
+    if not room_id or len(room_id.encode()) > MAX_LONGUEUR_ID:
+        await refuser(websocket, 4003, "Identifiant de room invalide")
+        return
+
+    url = url_proprietaire(room_id, "relaye" in websocket.query_params)
+    if url:
+        await relayer_websocket(websocket, url + quote(websocket.url.path), websocket.url.query)
+        return
 
     # Créer la room si elle n'existe pas (rejoindre via lien direct)
     if room_id not in parties:
-        parties[room_id] = Partie(room_id, Config(), createur_id=joueur_id)
+        nouvelle_partie(room_id, Config(), createur_id=joueur_id)
 
     partie = parties[room_id]
 
     # Bloquer si partie déjà en cours et joueur inconnu
-    if joueur_id not in partie.joueurs:
-        if partie.etat == EtatPartie.EN_COURS:
-            await websocket.close(code=4001, reason="Partie deja en cours")
-            return
-        if len(partie.joueurs) >= partie.config.max_joueurs:
-            await websocket.close(code=4002, reason="Partie pleine")
-            return
-        partie.joueurs[joueur_id] = EtatJoueur(
-            id=joueur_id,
-            nom=nom or f"Joueur{len(partie.joueurs)+1}",
-            vies=partie.config.vies,
-        )
+    try:
+        refus = await partie.demander(("rejoindre", joueur_id, nom))
+    except PartieFermee:
+        refus = (4009, "Room fermée")
+    if refus:
+        await refuser(websocket, *refus)
+        return
 
     await manager.connecter(room_id, joueur_id, websocket)
-
-    # Informer tout le monde
-    await manager.diffuser(room_id, {
-        **partie.snapshot(),
-        "type": "joueur_rejoint",
-        "joueur_id": joueur_id,
-        "message": f"👋 {partie.joueurs[joueur_id].nom} a rejoint !",
-    })
-
-    # Reconnexion en cours de partie : envoyer l'état actuel
-    if partie.etat == EtatPartie.EN_COURS:
-        await manager.envoyer(room_id, joueur_id, {
-            **partie.snapshot(),
-            "type": "partie_demarree",
-            "message": "🎮 Synchronisation…",
-        })
+    partie.poster(("arrivee", joueur_id))
 
     try:
         while True:
-            data = await websocket.receive_json()
+            data = await recevoir_objet(websocket)
+            if data is None:
+                continue
             action = data.get("action", "")
+            if not partie.fermee:
+                cycle.toucher(room_id, partie.etat.value)
 
             if action == "lettre":
-                await traiter_lettre(partie, joueur_id, data.get("lettre", ""))
+                partie.poster(("lettre", joueur_id, data.get("lettre", "")))
 
             elif action == "langue_au_chat":
-                await traiter_langue_au_chat(partie, joueur_id)
+                partie.poster(("langue_au_chat", joueur_id))
 
             elif action == "reponse_langue_au_chat":
-                await traiter_reponse_langue_au_chat(partie, joueur_id, data.get("pays", ""))
+                partie.poster(("reponse_langue_au_chat", joueur_id, data.get("pays", "")))
 
             elif action == "chat":
                 texte = str(data.get("texte", ""))[:200]
@@ -795,6 +1703,10 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, joueur_id: str,
             elif action == "ping":
                 await manager.envoyer(room_id, joueur_id, {"type": "pong"})
 
+            elif action == "resync":
+                # Le client a détecté un trou dans les révisions
+                await manager.envoyer(room_id, joueur_id, partie.message_complet("etat"))
+
             # ── Signalisation WebRTC ─────────────────────────────────────────
             # Le serveur relaie simplement les messages entre pairs.
 
@@ -827,38 +1739,35 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, joueur_id: str,
                     })
 
     except WebSocketDisconnect:
-        manager.deconnecter(room_id, joueur_id)
-
-        if joueur_id in partie.joueurs:
-            await manager.diffuser(room_id, {
-                **partie.snapshot(),
-                "type": "joueur_parti",
-                "joueur_id": joueur_id,
-                "message": f"⚠️ {partie.joueurs[joueur_id].nom} s'est déconnecté(e).",
-            })
-
-            if partie.etat == EtatPartie.EN_COURS:
-                # Joueur interpellé (langue au chat) se déconnecte
-                if partie.en_attente_langue_au_chat and partie.joueur_interpelle == joueur_id:
-                    if partie.lac_timeout_task and not partie.lac_timeout_task.done():
-                        partie.lac_timeout_task.cancel()
-                        partie.lac_timeout_task = None
-                    partie.en_attente_langue_au_chat = False
-                    partie.joueur_interpelle = None
-                    await manager.diffuser(room_id, {
-                        **partie.snapshot(),
-                        "type": "verdict_langue_au_chat",
-                        "valide": False,
-                        "message": "🔌 Joueur déconnecté — langue au chat annulée.",
-                    })
-                    await asyncio.sleep(1.0)
-                    await appliquer_perte_vie_externe(partie, joueur_id, "Déconnexion pendant langue au chat")
+        pass
+    finally:
+        # Toute sortie de la boucle libère la connexion, sinon la room
+        # paraîtrait occupée au cycle de vie
+        manager.deconnecter(room_id, joueur_id, websocket)
+        partie.poster(("deconnexion", joueur_id))
 
-                # C'était son tour
-                elif partie.joueur_actuel_id == joueur_id:
-                    partie.annuler_chrono()
-                    partie.prochain_vivant()
-                    await demarrer_tour(partie, reset_sequence=False)
+# ──────────────────────────────────────────────────────────────
+#  WEBSOCKET DU LOBBY
+# ──────────────────────────────────────────────────────────────
+
+@app.websocket("/ws/lobby")
+async def websocket_lobby(websocket: WebSocket):
+    """Liste des lobbies ouverts, puis ses changements (voir FluxLobby).
+    Le client n'envoie rien d'autre que des pings."""
+    abonne_id = secrets.token_hex(8)
+    await lobby.connecter(LOBBY, abonne_id, websocket)
+    flux.actif = True
+    await lobby.envoyer(LOBBY, abonne_id, message_lobby())
+    try:
+        while True:
+            data = await recevoir_objet(websocket)
+            if data is not None and data.get("action") == "ping":
+                await lobby.envoyer(LOBBY, abonne_id, {"type": "pong"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        lobby.deconnecter(LOBBY, abonne_id, websocket)
+        flux.actif = bool(lobby.connexions.get(LOBBY))
 
 # ──────────────────────────────────────────────────────────────
 #  NETTOYAGE PÉRIODIQUE
@@ -866,11 +1775,69 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, joueur_id: str,
 
 @app.on_event("startup")
 async def startup():
-    asyncio.create_task(nettoyer_parties())
-
-async def nettoyer_parties():
+    surveillant.demarrer()
+    restaurer_parties()
+    asyncio.create_task(vider_stockage())
+    asyncio.create_task(balayer_parties())
+    if grappe is not None:
+        asyncio.create_task(grappe.boucle(publier_rooms))
+
+@app.on_event("shutdown")
+async def shutdown():
+    surveillant.arreter()
+    stockage.fermer()
+    journal.fermer()
+    if grappe is not None:
+        await grappe.quitter()
+
+def restaurer_parties():
+    """Redémarrage à chaud : reprend les rooms en cours ou en attente."""
+    for room_id, etat in stockage.charger_tout().items():
+        try:
+            partie = Partie.depuis_etat_compact(etat)
+        except Exception as e:
+            print(f"[persistance ERROR] room={room_id} non restaurée : {e!r}")
+            continue
+        if partie.etat == EtatPartie.TERMINEE:
+            stockage.supprimer(room_id)
+            continue
+        parties[room_id] = partie
+        partie.rearmer_minuteries(etat[-1])
+        cycle.toucher(room_id, partie.etat.value)
+        indexer_partie(partie)
+    if parties:
+        print(f"[persistance] {len(parties)} room(s) restaurée(s)")
+
+async def vider_stockage(intervalle: float = 0.2):
     while True:
-        await asyncio.sleep(3600)
-        terminees = [rid for rid, p in parties.items() if p.etat == EtatPartie.TERMINEE]
-        for rid in terminees:
-            del parties[rid]
+        await asyncio.sleep(intervalle)
+        try:
+            stockage.vider()
+            journal.vider()
+        except Exception as e:
+            print(f"[persistance ERROR] {e!r}")
+
+def expirer_parties() -> int:
+    """Ferme les rooms inactives au-delà du TTL de leur état. Une room dont
+    une socket est encore ouverte n'est pas abandonnée : elle repart en
+    fin de file."""
+    fermees = 0
+    for room_id, etat in cycle.expirees():
+        partie = parties.get(room_id)
+        if partie is None:
+            continue
+        if manager.connexions.get(room_id):
+            cycle.toucher(room_id, partie.etat.value)
+            continue
+        fermer_partie(room_id, "Room expirée")
+        EXPIRATIONS.labels(etat).inc()
+        fermees += 1
+    return fermees
+
+async def balayer_parties(intervalle: float = 30.0):
+    while True:
+        await asyncio.sleep(intervalle)
+        try:
+            expirer_parties()
+        except Exception as e:
+            print(f"[cycle ERROR] {e!r}")
@@ -0,0 +1,303 @@
+"""
+╔══════════════════════════════════════════════════════════════╗
+║           PAYS GAME — Solveur (jeu parfait de l'IA)          ║
+║   Recherche mémoïsée sur le trie du lexique                  ║
+║                                                              ║
+║  Une position = un nœud du trie + les pays déjà joués qui    ║
+║  passent par ce nœud. Seuls ceux-là changent la suite de la  ║
+║  manche : deux parties qui diffèrent ailleurs partagent la   ║
+║  même entrée du mémo.                                        ║
+║                                                              ║
+║  Livre d'ouvertures (étape de build, fichiers <id>.livre) :  ║
+║    python solveur.py pays_fr pays_en                         ║
+╚══════════════════════════════════════════════════════════════╝
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lexique import IndexLexique, registre_depuis_env
+
+# Probabilité de jouer le coup optimal (sinon : heuristique « ne pas
+# compléter à la lettre suivante »)
+NIVEAUX_IA: Dict[str, float] = {
+    "facile":    0.0,
+    "moyen":     0.6,
+    "difficile": 0.9,
+    "parfait":   1.0,
+}
+
+# ──────────────────────────────────────────────────────────────
+#  SOLVEUR
+# ──────────────────────────────────────────────────────────────
+
+class Solveur:
+    """Jeu parfait pour un lexique et un mode (noms seuls ou mixte).
+
+    Règles modélisées, identiques à `traiter_lettre` : une lettre est
+    « sûre » si, après elle, il reste une clé non jouée strictement plus
+    longue. Sinon le joueur perd (mot complet, pays déjà joué, ou
+    séquence sans suite jouable qu'un adversaire interpellera).
+
+    `valeur` renvoie le rang, compté depuis le joueur au trait, de celui
+    qui perdra la manche si chacun joue au mieux (0 : le joueur au trait).
+    À plus de deux joueurs, le premier coup qui épargne le joueur au
+    trait est retenu, dans l'ordre des lettres.
+    """
+
+    def __init__(self, index: IndexLexique, mode_mixte: bool, taille_memo: int = 200_000,
+                 livre: Optional["LivreOuvertures"] = None):
+        self.index = index
+        self.mode_mixte = mode_mixte
+        self.taille_memo = taille_memo
+        self.livre = livre
+        # Copies locales : évite de décoder les chaînes d'un index projeté
+        self.noms = list(index.noms)
+        self.caps = list(index.capitales)
+        self.enfants: Dict[int, Tuple[Tuple[int, str], ...]] = {}
+        self.memo: Dict[tuple, int] = {}
+        self.memo_coups: Dict[tuple, Dict[str, int]] = {}
+
+    # ── Arbre ─────────────────────────────────────────────────
+
+    def _enfants(self, n: int) -> Tuple[Tuple[int, str], ...]:
+        enfants = self.enfants.get(n)
+        if enfants is None:
+            index = self.index
+            debut = index.premier_enfant[n]
+            enfants = self.enfants[n] = tuple(
+                (e, chr(index.lettre[e])) for e in range(debut, debut + index.nb_enfants[n])
+            )
+        return enfants
+
+    def _sure(self, n: int, d: int, jn: tuple, jc: tuple) -> bool:
+        """Reste-t-il sous `n` (profondeur `d`) une clé non jouée plus longue ?"""
+        noms = self.noms
+        if self.index.longs_noms[n] > sum(1 for i in jn if len(noms[i]) > d):
+            return True
+        if not self.mode_mixte:
+            return False
+        caps = self.caps
+        return self.index.longs_caps[n] > sum(1 for i in jc if len(caps[i]) > d)
+
+    def _suivants(self, n: int, d: int, jn: tuple, jc: tuple):
+        """(lettre, nœud, joués pertinents) pour chaque lettre sûre."""
+        par_nom = _repartir(jn, self.noms, d)
+        par_cap = _repartir(jc, self.caps, d)
+        for e, c in self._enfants(n):
+            jn2 = par_nom.get(c, ())
+            jc2 = par_cap.get(c, ())
+            if self._sure(e, d + 1, jn2, jc2):
+                yield c, e, jn2, jc2
+
+    # ── Recherche ─────────────────────────────────────────────
+
+    def valeur(self, n: int, d: int, jn: tuple, jc: tuple, nb_joueurs: int) -> int:
+        cle = (n, jn, jc, nb_joueurs)
+        v = self.memo.get(cle)
+        if v is not None:
+            return v
+        v = 0
+        for _, e, jn2, jc2 in self._suivants(n, d, jn, jc):
+            rang = (self.valeur(e, d + 1, jn2, jc2, nb_joueurs) + 1) % nb_joueurs
+            if rang:
+                v = rang
+                break
+        if len(self.memo) >= self.taille_memo:
+            self.memo.clear()
+        self.memo[cle] = v
+        return v
+
+    def position(self, seq: str, joues: Sequence[int]) -> Optional[tuple]:
+        """(nœud, profondeur, joués par nom, joués par capitale) de `seq`."""
+        n = self.index.noeud(seq)
+        if n < 0:
+            return None
+        noms, caps = self.noms, self.caps
+        jn = tuple(sorted(i for i in joues if noms[i].startswith(seq)))
+        jc = tuple(sorted(i for i in joues if self.mode_mixte and caps[i] and caps[i].startswith(seq)))
+        return n, len(seq), jn, jc
+
+    def coups(self, seq: str, joues: Sequence[int], nb_joueurs: int) -> Dict[str, int]:
+        """Lettre sûre → rang du perdant compté depuis le joueur au trait."""
+        pos = self.position(seq, joues)
+        if pos is None:
+            return {}
+        n, d, jn, jc = pos
+        nb = max(2, nb_joueurs)
+        cle = (n, jn, jc, nb)
+        resultat = self.memo_coups.get(cle)
+        if resultat is None:
+            if len(self.memo_coups) >= self.taille_memo:
+                self.memo_coups.clear()
+            resultat = self.memo_coups[cle] = {
+                c: (self.valeur(e, d + 1, jn2, jc2, nb) + 1) % nb
+                for c, e, jn2, jc2 in self._suivants(n, d, jn, jc)
+            }
+        return resultat
+
+    def coups_gagnants(self, seq: str, joues: Sequence[int], nb_joueurs: int) -> List[str]:
+        """Lettres après lesquelles le joueur au trait ne perd pas la manche.
+        Aucun pays joué sous la position : lecture directe du livre."""
+        if self.livre is not None:
+            pos = self.position(seq, joues)
+            if pos is None:
+                return []
+            n, _, jn, jc = pos
+            if not jn and not jc:
+                lettres = self.livre.lettres(self.mode_mixte, n, nb_joueurs)
+                if lettres is not None:
+                    return lettres
+        return [c for c, rang in self.coups(seq, joues, nb_joueurs).items() if rang]
+
+    def reponse(self, seq: str, joues: Sequence[int]) -> Optional[int]:
+        """Pour une langue au chat : un pays (indice) commençant par `seq`,
+        lu dans le livre s'il n'a pas été joué. None : à chercher."""
+        if self.livre is None:
+            return None
+        n = self.index.noeud(seq)
+        if n < 0:
+            return None
+        i = self.livre.reponses[n]
+        return i if i >= 0 and i not in joues else None
+
+
+# ──────────────────────────────────────────────────────────────
+#  LIVRE D'OUVERTURES
+# ──────────────────────────────────────────────────────────────
+#
+#  Lexique sans pays joué : pour chaque nœud, chaque mode et chaque
+#  nombre de joueurs (2 à NB_JOUEURS_LIVRE), masque des lettres gagnantes
+#  (bit k = chr(65 + k) ; HORS_ALPHABET si un coup gagnant n'est pas une
+#  lettre A-Z, la position est alors laissée au solveur). Plus, par nœud, un pays à citer en langue au
+#  chat. Tableaux int32 natifs projetés en mémoire, comme les .lex.
+
+MAGIC_LIVRE      = b"PAYSLIV\0"
+VERSION_LIVRE    = 1
+NB_JOUEURS_LIVRE = 8
+_ENTETE_LIVRE = struct.Struct("<8sIII8s")
+HORS_ALPHABET    = 1 << 30
+
+
+def empreinte_trie(index: IndexLexique) -> bytes:
+    """Identifie la forme du trie : un livre ne sert qu'à son lexique."""
+    h = hashlib.blake2b(digest_size=8)
+    for tableau in (index.lettre, index.premier_enfant, index.longs_noms, index.longs_caps):
+        h.update(bytes(tableau))
+    return h.digest()
+
+
+class LivreOuvertures:
+    def __init__(self, masques: Sequence[int], reponses: Sequence[int], nb_noeuds: int):
+        self.masques = masques
+        self.reponses = reponses
+        self.nb_noeuds = nb_noeuds
+
+    def lettres(self, mode_mixte: bool, n: int, nb_joueurs: int) -> Optional[List[str]]:
+        nb = max(2, nb_joueurs)
+        if nb > NB_JOUEURS_LIVRE:
+            return None
+        masque = self.masques[((int(mode_mixte) * (NB_JOUEURS_LIVRE - 1)) + nb - 2) * self.nb_noeuds + n]
+        if masque & HORS_ALPHABET:
+            return None
+        return [chr(65 + k) for k in range(26) if masque >> k & 1]
+
+    @classmethod
+    def construire(cls, index: IndexLexique) -> "LivreOuvertures":
+        nb_noeuds = len(index.lettre)
+        masques = array("i")
+        for mode_mixte in (False, True):
+            solveur = Solveur(index, mode_mixte, taille_memo=sys.maxsize)
+            for nb in range(2, NB_JOUEURS_LIVRE + 1):
+                for n in range(nb_noeuds):
+                    masque = 0
+                    for c, e, _, _ in solveur._suivants(n, 0, (), ()):
+                        if (solveur.valeur(e, 0, (), (), nb) + 1) % nb:
+                            masque |= 1 << (ord(c) - 65) if "A" <= c <= "Z" else HORS_ALPHABET
+                    masques.append(masque)
+        reponses = array("i", (
+            index.postings_noms[index.noms_debut[n]] if index.noms_fin[n] > index.noms_debut[n] else -1
+            for n in range(nb_noeuds)
+        ))
+        return cls(masques, reponses, nb_noeuds)
+
+    def ecrire(self, chemin: str, index: IndexLexique):
+        temporaire = chemin + ".tmp"
+        with open(temporaire, "wb") as f:
+            f.write(_ENTETE_LIVRE.pack(MAGIC_LIVRE, VERSION_LIVRE, self.nb_noeuds,
+                                       NB_JOUEURS_LIVRE, empreinte_trie(index)))
+            f.write(array("i", self.masques).tobytes())
+            f.write(array("i", self.reponses).tobytes())
+        os.replace(temporaire, chemin)
+
+    @classmethod
+    def charger(cls, chemin: str, index: IndexLexique) -> Optional["LivreOuvertures"]:
+        """Livre projeté en mémoire ; None s'il manque ou ne correspond pas
+        au lexique (recompiler avec `python solveur.py`)."""
+        if not os.path.exists(chemin):
+            return None
+        try:
+            with open(chemin, "rb") as f:
+                carte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, nb_noeuds, nb_max, empreinte = _ENTETE_LIVRE.unpack_from(carte, 0)
+            if (magic, version, nb_max) != (MAGIC_LIVRE, VERSION_LIVRE, NB_JOUEURS_LIVRE):
+                raise ValueError("format inattendu")
+            if nb_noeuds != len(index.lettre) or empreinte != empreinte_trie(index):
+                raise ValueError("construit pour un autre lexique")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"[solveur ERROR] livre {chemin} ignoré : {e}")
+            return None
+        vue = memoryview(carte)[_ENTETE_LIVRE.size:]
+        taille = 2 * (NB_JOUEURS_LIVRE - 1) * nb_noeuds * 4
+        livre = cls(vue[:taille].cast("i"), vue[taille:taille + nb_noeuds * 4].cast("i"), nb_noeuds)
+        livre._carte = carte
+        return livre
+
+
+def _repartir(joues: tuple, cles: List[str], d: int) -> Dict[str, tuple]:
+    """Entrées jouées regroupées par leur lettre en position `d`."""
+    if not joues:
+        return {}
+    groupes: Dict[str, list] = {}
+    for i in joues:
+        if len(cles[i]) > d:
+            groupes.setdefault(cles[i][d], []).append(i)
+    return {c: tuple(g) for c, g in groupes.items()}
+
+
+def choisir_lettre(solveur: Solveur, joues: Sequence[int], seq: str,
+                   nb_joueurs: int, niveau: str, rng: random.Random) -> Optional[str]:
+    """Lettre optimale avec la probabilité du niveau, sinon None (l'appelant
+    garde son heuristique). `joues` : `CompteursJoues.joues`. Tirage dans
+    `rng` : rejouable."""
+    if rng.random() >= NIVEAUX_IA.get(niveau, NIVEAUX_IA["moyen"]):
+        return None
+    gagnants = solveur.coups_gagnants(seq, joues, nb_joueurs)
+    return rng.choice(gagnants) if gagnants else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit les livres d'ouvertures de l'IA")
+    parser.add_argument("lexiques", nargs="+", help="ids du registre : pays_fr pays_en …")
+    parser.add_argument("--dossier", default=".", help="où écrire les fichiers <id>.livre")
+    args = parser.parse_args()
+
+    registre = registre_depuis_env()
+    for lexique_id in args.lexiques:
+        index = registre.obtenir(lexique_id)
+        debut = time.perf_counter()
+        livre = LivreOuvertures.construire(index)
+        chemin = os.path.join(args.dossier, f"{lexique_id}.livre")
+        livre.ecrire(chemin, index)
+        print(f"{lexique_id} → {chemin} : {livre.nb_noeuds} nœuds, "
+              f"{os.path.getsize(chemin)} octets, {time.perf_counter() - debut:.1f} s")
@@ -0,0 +1,49 @@
+"""Les modules du jeu sont à la racine du dépôt et y lisent leurs données
+(pays_*.json / .lex) : les tests s'exécutent depuis cette racine."""
+
+import asyncio
+import os
+import string
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+os.chdir(RACINE)
+
+
+def entrees_synthetiques(n: int) -> list:
+    """`n` pays distincts de 4 lettres, capitale = nom inversé + Z."""
+    entrees = []
+    for i in range(n):
+        lettres = []
+        for _ in range(4):
+            i, r = divmod(i, 26)
+            lettres.append(string.ascii_uppercase[r])
+        nom = "".join(lettres)
+        capitale = nom[::-1] + "Z"
+        entrees.append({"nom": nom, "capitale": capitale, "code": "",
+                        "nom_normalise": nom, "capitale_normalisee": capitale})
+    return entrees
+
+
+@pytest.fixture(scope="session")
+def grand_lexique():
+    """Plus de 32767 entrées : les codes (2 × indice + type) dépassent 16 bits."""
+    from lexique import IndexLexique
+    return IndexLexique(entrees_synthetiques(40000))
+
+
+async def attendre_acteur(partie):
+    """Laisse l'acteur de la room vider sa boîte (IA comprise)."""
+    while partie._acteur is not None:
+        await asyncio.sleep(0)
+
+
+async def avancer(partie, temps: list, secondes: float):
+    """Avance l'horloge virtuelle du planificateur de la room et exécute
+    les délais échus."""
+    temps[0] += secondes
+    partie.planificateur.declencher_echus(temps[0])
+    await attendre_acteur(partie)
@@ -0,0 +1,36 @@
+import asyncio
+import random
+
+import pytest
+
+import ia
+import server
+from ia import ServiceIA
+
+np = pytest.importorskip("numpy")
+
+
+def _demandes(index, n: int, graine: int = 7):
+    rng = random.Random(graine)
+    demandes = []
+    for _ in range(n):
+        cle = rng.choice(list(index.noms))
+        seq = cle[:rng.randint(0, len(cle))] + ("" if rng.random() < 0.9 else "QX")
+        joues = tuple(sorted(rng.sample(range(len(index.noms)), rng.randint(0, 20))))
+        demandes.append((seq, joues))
+    return demandes
+
+
+@pytest.mark.parametrize("mode_mixte", [False, True])
+def test_lot_vectorise_identique_au_trie(mode_mixte, monkeypatch):
+    monkeypatch.setattr(ia, "TAILLE_PAQUET", 16)   # plusieurs paquets par lot
+    solveur = server.get_solveur("pays_fr", mode_mixte)
+    demandes = _demandes(solveur.index, 150)
+
+    async def lot(service):
+        futurs = [service.decider(solveur, seq, joues, 2, False) for seq, joues in demandes]
+        return [(d.nb_possibles, d.lettres) for d in await asyncio.gather(*futurs)]
+
+    vectorise, trie = ServiceIA(vectoriser=True), ServiceIA(vectoriser=False)
+    assert asyncio.run(lot(vectorise)) == asyncio.run(lot(trie))
+    assert vectorise.nb_lots == 1 and vectorise.nb_demandes == 150
@@ -0,0 +1,158 @@
+import os
+import random
+import shutil
+
+import pytest
+
+from conftest import entrees_synthetiques
+from lexique import (CompteursJoues, IndexLexique, LimiteLexiques, RegistreLexiques, charger_fichiers,
+                     charger_pays_json, ecrire_binaire, normaliser, verifier_conformite)
+from solveur import LivreOuvertures, Solveur
+
+
+def test_codes_compacts_sur_petit_lexique():
+    assert IndexLexique(entrees_synthetiques(100)).type_codes == "H"
+
+
+def test_grand_lexique_au_dela_de_16_bits(grand_lexique):
+    index = grand_lexique
+    assert index.type_codes == "I"
+    dernier = index.resultats_capitales[-1]
+    assert index.entree(index.code(dernier)) is dernier
+
+    compteurs = CompteursJoues(index, mixte=True)
+    compteurs.marquer(dernier.nom_normalise)
+    assert compteurs.contient(dernier.nom_normalise)
+    assert list(compteurs.joues) == [39999]
+    assert not compteurs.contient(index.resultats_pays[0].nom_normalise)
+    assert not compteurs.a_suite_non_jouee(index.noeud(dernier.nom_normalise), False)
+
+
+def _liste(k: int) -> list:
+    return [{"nom": e["nom"] + "ABC"[k % 3] * (k + 1)} for e in entrees_synthetiques(3)]
+
+
+def test_registre_borne_les_imports():
+    registre = RegistreLexiques(max_importes=2)
+    evinces = []
+    registre.sur_eviction.append(lambda lexique_id, index: evinces.append(lexique_id))
+    premier, second = (registre.importer(f"L{k}", "fr", _liste(k)) for k in range(2))
+    registre.obtenir(premier)
+
+    registre.utilises = lambda: {premier}
+    troisieme = registre.importer("L2", "fr", _liste(2))
+    assert not registre.existe(second) and registre.existe(premier)
+    assert list(registre.importes) == [premier, troisieme]
+
+    registre.utilises = lambda: {premier, troisieme}
+    with pytest.raises(LimiteLexiques):
+        registre.importer("L3", "fr", _liste(3))
+
+    registre.utilises = set
+    registre.importer("L3", "fr", _liste(3))
+    assert not registre.existe(premier)
+    assert evinces == [premier]
+
+
+def test_registre_decharge_les_index_les_moins_recents():
+    registre = RegistreLexiques(capacite=2, max_importes=10)
+    evinces = []
+    registre.sur_eviction.append(lambda lexique_id, index: evinces.append(lexique_id))
+    ids = [registre.importer(f"L{k}", "fr", _liste(k)) for k in range(3)]
+    a = registre.obtenir(ids[0])
+    registre.obtenir(ids[1])
+    registre.obtenir(ids[0])                 # ids[1] devient le moins récent
+    registre.obtenir(ids[2])
+    assert list(registre.lexiques) == [ids[0], ids[2]]
+    assert evinces == [ids[1]]
+    assert registre.obtenir(ids[0]) is a     # toujours chargé
+    assert registre.obtenir(ids[1]) is not None   # rechargé à la demande
+
+
+def _compiler(dossier):
+    source, binaire = str(dossier / "pays_fr.json"), str(dossier / "pays_fr.lex")
+    shutil.copyfile("pays_fr.json", source)
+    ecrire_binaire(charger_pays_json(source), binaire, source)
+    return source, binaire
+
+
+def test_lex_valide_apres_copie_de_l_arbre(tmp_path):
+    source, binaire = _compiler(tmp_path)
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))   # copie, checkout…
+    index = charger_fichiers(source, binaire)
+    assert hasattr(index, "_carte")   # projeté, pas recompilé
+
+
+def test_lex_perime_si_le_contenu_change(tmp_path):
+    source, binaire = _compiler(tmp_path)
+    with open(source, encoding="utf-8") as f:
+        texte = f.read()
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(texte.replace("FRANCE", "FRENCE"))   # même taille
+    index = charger_fichiers(source, binaire)
+    assert not hasattr(index, "_carte")
+    assert index.indices_nom("FRENCE")
+
+
+def test_corpus_de_conformite():
+    assert verifier_conformite() == 0
+
+
+def test_normaliser_garde_chiffres_et_ponctuation():
+    assert normaliser("São Tomé-et-Príncipe") == "SAOTOMEETPRINCIPE"
+    assert normaliser("St. Kitts 2") == "ST.KITTS2"
+
+
+def test_livre_hors_alphabet_laisse_la_main_au_solveur():
+    index = IndexLexique([{"nom": n, "nom_normalise": normaliser(n), "capitale": "", "capitale_normalisee": ""}
+                          for n in ("A.B", "A1", "AB")])
+    livre = LivreOuvertures.construire(index)
+    solveur = Solveur(index, False, livre=livre)
+    assert solveur.coups_gagnants("A", [], 2) == Solveur(index, False).coups_gagnants("A", [], 2)
+
+
+@pytest.fixture(scope="module")
+def pays_fr():
+    entrees = charger_pays_json("pays_fr.json")
+    return entrees, IndexLexique(entrees)
+
+
+def _prefixes(entrees) -> list:
+    cles = {p[c] for p in entrees for c in ("nom_normalise", "capitale_normalisee") if p[c]}
+    return sorted({cle[:k] for cle in cles for k in range(len(cle) + 1)}) + ["QX", "ZZZ"]
+
+
+def test_trie_identique_au_parcours_lineaire(pays_fr):
+    entrees, index = pays_fr
+    for seq in _prefixes(entrees):
+        noms = sorted(p["nom_normalise"] for p in entrees if p["nom_normalise"].startswith(seq))
+        # Mode mixte : un pays n'apparaît qu'une fois, par sa capitale
+        # seulement si son nom ne correspond pas
+        caps = sorted(p["capitale_normalisee"] for p in entrees
+                      if p["capitale_normalisee"] and p["capitale_normalisee"].startswith(seq)
+                      and not p["nom_normalise"].startswith(seq))
+        assert sorted(e.nom_normalise for e in index.chercher(seq, False)) == noms
+        assert sorted(e.nom_normalise if e.type == "pays" else e.capitale_normalisee
+                      for e in index.chercher(seq, True)) == sorted(noms + caps)
+        assert index.a_suite(seq, False) == bool(noms)
+        exact = index.exact(seq, True)
+        assert (exact is not None) == any(seq in (p["nom_normalise"], p["capitale_normalisee"])
+                                          for p in entrees)
+
+
+def test_compteurs_equivalents_au_parcours(pays_fr):
+    entrees, index = pays_fr
+    aleatoire = random.Random(3)
+    prefixes = _prefixes(entrees)
+    for _ in range(5):
+        compteurs = CompteursJoues(index, mixte=True)
+        joues = set()
+        for p in aleatoire.sample(entrees, 40):
+            compteurs.marquer(p["nom_normalise"])
+            joues.add(p["nom_normalise"])
+        for seq in prefixes:
+            n = index.noeud(seq)
+            for mixte in (False, True):
+                assert compteurs.a_suite_non_jouee(n, mixte) == index.a_suite_non_jouee(seq, mixte, joues)
+        assert all(compteurs.contient(nom) for nom in joues)
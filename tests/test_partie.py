@@ -0,0 +1,617 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import charge
+import metriques
+import server
+from conftest import attendre_acteur, avancer
+from planificateur import Planificateur
+from profilage import Echantillonneur, SurveillantBoucle
+from server import Config, Partie
+
+
+def test_pays_joues_sur_grand_lexique(grand_lexique):
+    server.lexiques.declarer("test_grand", lambda: grand_lexique, titre="Grand", langue="fr")
+    partie = Partie("GRAND1", Config(lexique="test_grand", mode_mixte=True), "a")
+    dernier = grand_lexique.resultats_capitales[-1]
+    partie.ajouter_pays_joue(dernier)
+    assert partie.deja_joue(dernier.nom_normalise)
+    assert list(partie.pays_joues) == [79999]
+
+    restauree = Partie.depuis_etat_compact(partie.etat_compact())
+    assert list(restauree.pays_joues) == [79999]
+    assert restauree.compteurs.index.entree(restauree.pays_joues[-1]) is dernier
+
+
+@pytest.mark.parametrize("difficulte", ["facile", "parfait"])
+def test_coup_ia_par_l_acteur(difficulte, capsys):
+    temps = [0.0]
+
+    async def scenario():
+        partie = server.nouvelle_partie("IAJOUE", Config(difficulte_ia=difficulte), "a")
+        partie.planificateur = Planificateur(horloge=lambda: temps[0])
+        try:
+            await partie.demander(("rejoindre", "a", "Alice"))
+            await partie.demander(("ajouter_ia", "ia_1"))
+            assert await partie.demander(("demarrer",)) is None
+            if partie.joueur_actuel_id == "a":
+                await partie.demander(("lettre", "a", "F"))
+            assert partie.joueur_actuel_id == "ia_1"
+            assert partie.planificateur.programme("IAJOUE", "ia")
+
+            avant = (partie.sequence, len(partie.pays_joues))
+            await avancer(partie, temps, 3.0)
+            return avant, (partie.sequence, len(partie.pays_joues))
+        finally:
+            server.fermer_partie("IAJOUE", "fin du test")
+
+    (seq_avant, pays_avant), (seq_apres, pays_apres) = asyncio.run(scenario())
+    assert "ERROR" not in capsys.readouterr().out
+    assert len(seq_apres) == len(seq_avant) + 1 or pays_apres == pays_avant + 1
+
+
+def test_eviction_d_un_lexique_vide_les_caches_derives():
+    lexique_id = server.lexiques.importer("Éphémère", "fr", [{"nom": "Atlantide"}, {"nom": "Avalon"}])
+    index = server.get_index(lexique_id)
+    server.get_solveur(lexique_id, False)
+    server.service_ia._matrices[id(index)] = object()
+    server.lexiques.oublier(lexique_id)
+    assert (lexique_id, False) not in server._solveurs
+    assert lexique_id not in server._livres
+    assert id(index) not in server.service_ia._matrices
+
+
+def test_fermeture_pendant_un_demander(monkeypatch):
+    async def bloquer(partie):
+        await asyncio.Event().wait()
+
+    monkeypatch.setitem(server.COMMANDES, "bloquer", bloquer)
+
+    async def scenario():
+        partie = server.nouvelle_partie("FERMEE", Config(), "a")
+        en_cours = asyncio.ensure_future(partie.demander(("bloquer",)))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)                      # l'acteur exécute « bloquer »
+        en_attente = asyncio.ensure_future(partie.demander(("rejoindre", "a", "Alice")))
+        await asyncio.sleep(0)                      # déposée derrière, dans la boîte
+        assert len(partie.boite) == 1
+
+        server.fermer_partie("FERMEE", "test")
+        resultats = await asyncio.wait_for(
+            asyncio.gather(en_cours, en_attente, return_exceptions=True), 1.0)
+        with pytest.raises(server.PartieFermee):
+            await asyncio.wait_for(partie.demander(("rejoindre", "b", "Bob")), 1.0)
+        return resultats
+
+    resultats = asyncio.run(scenario())
+    assert [type(r) for r in resultats] == [server.PartieFermee, server.PartieFermee]
+
+
+def test_metriques_du_chemin_des_lettres():
+    temps = [0.0]
+    avant = server.DUREE_EXISTE_SUITE.total, server.DUREE_EST_COMPLET.total
+
+    async def scenario():
+        partie = server.nouvelle_partie("LETTRE", Config(), "a")
+        partie.planificateur = Planificateur(horloge=lambda: temps[0])
+        try:
+            await partie.demander(("rejoindre", "a", "Alice"))
+            await partie.demander(("rejoindre", "b", "Bob"))
+            await partie.demander(("demarrer",))
+            await partie.demander(("lettre", partie.joueur_actuel_id, "F"))
+        finally:
+            server.fermer_partie("LETTRE", "fin du test")
+
+    asyncio.run(scenario())
+    assert server.DUREE_EXISTE_SUITE.total == avant[0] + 1
+    assert server.DUREE_EST_COMPLET.total == avant[1] + 1
+
+
+def test_reprise_decompte_le_temps_d_arret(monkeypatch):
+    temps = [0.0]
+    mur = [1_000_000.0]
+    monkeypatch.setattr(server.time, "time", lambda: mur[0])
+
+    async def scenario():
+        partie = server.nouvelle_partie("ARRET", Config(temps=15), "a")
+        partie.planificateur = Planificateur(horloge=lambda: temps[0])
+        try:
+            await partie.demander(("rejoindre", "a", "Alice"))
+            await partie.demander(("rejoindre", "b", "Bob"))
+            await partie.demander(("demarrer",))
+            assert partie.planificateur.restant("ARRET", "chrono") == pytest.approx(15.5)
+            etat = partie.etat_compact()
+        finally:
+            server.fermer_partie("ARRET", "fin du test")
+
+        mur[0] += 10.0                                   # 10 s hors service
+        restauree = Partie.depuis_etat_compact(etat)
+        restauree.planificateur = Planificateur(horloge=lambda: temps[0])
+        restauree.rearmer_minuteries(etat[-1])
+        restant = restauree.planificateur.restant("ARRET", "chrono")
+
+        mur[0] += 60.0                                   # échéance dépassée
+        tardive = Partie.depuis_etat_compact(etat)
+        tardive.planificateur = Planificateur(horloge=lambda: temps[0])
+        tardive.rearmer_minuteries(etat[-1])
+        return restant, tardive.planificateur.restant("ARRET", "chrono")
+
+    restant, tardif = asyncio.run(scenario())
+    assert restant == pytest.approx(5.5)
+    assert tardif == 0.0
+
+
+def test_pas_de_middleware_de_relais_hors_grappe():
+    assert server.grappe is None
+    assert not [m for m in server.app.user_middleware if m.cls is not CORSMiddleware]
+
+
+def test_trame_invalide_ne_retient_pas_la_room(monkeypatch):
+    monkeypatch.setitem(server.cycle.ttl, "attente", 0.0)
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/TRAMES/a/Alice") as ws:
+            ws.receive_json()
+            ws.send_json([1])
+            ws.send_text("{pas du json")
+            ws.send_json({"action": "ping"})
+            while ws.receive_json()["type"] != "pong":
+                pass
+        for _ in range(100):
+            if not server.manager.connexions.get("TRAMES"):
+                break
+            time.sleep(0.01)
+        assert client.portal.call(server.expirer_parties) == 1
+    assert "TRAMES" not in server.parties
+
+
+def test_abonne_du_lobby_retire_a_la_deconnexion():
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/lobby") as ws:
+            ws.receive_json()
+            ws.send_json("ping")
+            ws.send_json({"action": "ping"})
+            while ws.receive_json()["type"] != "pong":
+                pass
+        for _ in range(100):
+            if not server.lobby.connexions.get(server.LOBBY):
+                break
+            time.sleep(0.01)
+    assert not server.lobby.connexions.get(server.LOBBY)
+    assert not server.flux.actif
+
+
+class ClientDelta:
+    """Même fusion que `_fusionner_etat` du client Kivy (et index.html)."""
+
+    def __init__(self, complet: dict):
+        self.resynchroniser(complet)
+        self.resyncs = 0
+
+    def resynchroniser(self, complet: dict):
+        self.etat, self.rev = dict(complet["snapshot"]), complet["rev"]
+
+    def appliquer(self, msg: dict) -> bool:
+        """False si un trou est détecté : il faut demander un resync."""
+        if msg["rev"] > self.rev + 1:
+            self.resyncs += 1
+            return False
+        if msg["rev"] > self.rev:
+            maj = dict(msg["maj"])
+            if "pays_joues_ajout" in maj:
+                depuis = maj.pop("pays_joues_depuis")
+                self.etat["pays_joues"] = self.etat["pays_joues"][:depuis] + maj.pop("pays_joues_ajout")
+            self.etat.update(maj)
+            self.rev = msg["rev"]
+        return True
+
+
+def _sans_rev(etat: dict) -> dict:
+    return {k: v for k, v in etat.items() if k not in ("type", "rev")}
+
+
+def test_deltas_puis_resync_apres_un_trou(monkeypatch):
+    diffuses = []
+
+    async def capturer(room_id, data):
+        diffuses.append(json.loads(server.encoder_json(data)))
+
+    monkeypatch.setattr(server.manager, "diffuser", capturer)
+    temps = [0.0]
+
+    async def scenario():
+        partie = server.nouvelle_partie("DELTAS", Config(), "a")
+        partie.planificateur = Planificateur(horloge=lambda: temps[0])
+        try:
+            await partie.demander(("rejoindre", "a", "Alice"))
+            complet = json.loads(server.encoder_json(partie.message_complet("etat")))
+            await partie.demander(("rejoindre", "b", "Bob"))
+            await partie.demander(("arrivee", "b"))
+            await partie.demander(("demarrer",))
+            await partie.demander(("lettre", partie.joueur_actuel_id, "F"))
+            partie.ajouter_pays_joue(partie.compteurs.index.resultats_pays[0])
+            await server.manager.diffuser("DELTAS", partie.message_delta("pays"))
+            await partie.demander(("lettre", partie.joueur_actuel_id, "R"))
+            return complet, json.loads(server.encoder_json(partie.message_complet("etat")))
+        finally:
+            server.fermer_partie("DELTAS", "fin du test")
+
+    complet, final = asyncio.run(scenario())
+    deltas = [m for m in diffuses if "maj" in m]
+    assert [m["rev"] for m in deltas] == list(range(complet["rev"] + 1, final["rev"] + 1))
+
+    suivi = ClientDelta(complet)
+    assert all(suivi.appliquer(m) for m in deltas)
+    assert _sans_rev(suivi.etat) == _sans_rev(final["snapshot"])
+    assert suivi.etat["pays_joues"]
+
+    # Un delta perdu : le suivant révèle le trou, l'état complet le comble
+    troue = ClientDelta(complet)
+    assert troue.appliquer(deltas[0])
+    assert not troue.appliquer(deltas[2])
+    troue.resynchroniser(final)
+    assert troue.appliquer(deltas[-1])                    # déjà couvert : ignoré
+    assert troue.rev == final["rev"] and troue.resyncs == 1
+    assert _sans_rev(troue.etat) == _sans_rev(final["snapshot"])
+
+
+def test_resync_renvoie_l_etat_complet_courant():
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/ws/RESYNC/a/Alice") as ws:
+            ws.receive_json()                               # état d'arrivée
+            ws.send_json({"action": "resync"})
+            msg = ws.receive_json()
+            while "snapshot" not in msg:                    # deltas déjà en file
+                msg = ws.receive_json()
+            assert msg["rev"] == server.parties["RESYNC"].revision
+            assert msg["snapshot"]["joueurs"][0]["id"] == "a"
+        client.portal.call(server.fermer_partie, "RESYNC", "fin du test")
+
+
+class SocketBloquee:
+    """Socket dont l'envoi ne termine jamais : un client qui ne lit plus."""
+
+    def __init__(self):
+        self.fermeture = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, texte):
+        await asyncio.Event().wait()
+
+    async def close(self, code=1000, reason=""):
+        self.fermeture = (code, reason)
+
+
+def _etat(rev):
+    return {"type": "maj", "rev": rev, "maj": {}}
+
+
+@pytest.mark.parametrize("politique", ["coalescer", "abandonner"])
+def test_debordement_de_file(politique):
+    async def scenario():
+        gestion = server.ConnectionManager(taille_file=4, seuil_haut=100, politique=politique,
+                                           etat_complet=lambda room_id: {"snapshot": {}})
+        await gestion.connecter("R", "a", SocketBloquee())
+        connexion = gestion.connexions["R"]["a"]
+        await gestion.envoyer("R", "a", _etat(1))
+        await asyncio.sleep(0)                          # le 1er est en cours d'envoi
+        await gestion.envoyer("R", "a", {"type": "chat", "texte": "salut"})
+        for rev in range(2, 6):
+            await gestion.envoyer("R", "a", _etat(rev))
+        file = [(json.loads(t)["rev"] if t else None) if e else json.loads(t)["type"]
+                for t, e, _ in connexion.file]
+        connexion.tache.cancel()
+        return file
+
+    file = asyncio.run(scenario())
+    if politique == "coalescer":
+        # États périmés remplacés par un état complet frais, le chat gardé
+        assert file == ["chat", None, 5]
+    else:
+        # Le plus ancien (le chat) est jeté ; le client resynchronisera
+        assert file == [2, 3, 4, 5]
+
+
+def test_client_trop_lent_evince_en_4008():
+    async def scenario():
+        gestion = server.ConnectionManager(taille_file=8, seuil_haut=2, delai_eviction=0.01)
+        ws = SocketBloquee()
+        await gestion.connecter("R", "a", ws)
+        for rev in range(1, 5):
+            await gestion.envoyer("R", "a", _etat(rev))
+        await asyncio.sleep(0.02)                       # au-dessus du seuil trop longtemps
+        await gestion.envoyer("R", "a", _etat(5))
+        await asyncio.sleep(0.01)                       # fermeture en tâche de fond
+        return ws.fermeture, gestion.connexions["R"]
+
+    fermeture, restantes = asyncio.run(scenario())
+    assert fermeture == (4008, "Client trop lent")
+    assert restantes == {}
+
+
+def test_planificateur_ordre_remplacement_et_annulation():
+    temps = [0.0]
+    plan = Planificateur(horloge=lambda: temps[0])
+    declenches = []
+    for room_id, delai in (("C", 3.0), ("A", 1.0), ("B", 2.0), ("D", 2.0)):
+        plan.programmer(room_id, "chrono", delai, lambda r=room_id: declenches.append(r))
+    plan.programmer("C", "chrono", 0.5, lambda: declenches.append("C"))   # remplace
+    assert plan.annuler("D", "chrono") and not plan.annuler("D", "chrono")
+    assert len(plan) == 3 and plan.prochaine_deadline() == 0.5
+
+    temps[0] = 2.0
+    assert plan.declencher_echus(temps[0]) == 3
+    assert declenches == ["C", "A", "B"]
+    assert len(plan) == 0 and plan.restant("C", "chrono") is None
+
+
+def test_planificateur_compacte_les_entrees_annulees():
+    plan = Planificateur(horloge=lambda: 0.0)
+    for i in range(200):
+        plan.programmer(f"R{i}", "chrono", 1.0 + i, lambda: None)
+    for i in range(150):
+        plan.annuler_room(f"R{i}")
+    assert len(plan) == 50
+    assert len(plan._tas) < 200
+    assert plan.prochaine_deadline() == 151.0
+
+
+def test_jeton_perime_ecarte_une_commande_deja_en_boite(monkeypatch):
+    executees = []
+
+    async def compter(partie):
+        executees.append(partie.room_id)
+
+    monkeypatch.setitem(server.COMMANDES, "compter", compter)
+    temps = [0.0]
+
+    async def scenario():
+        partie = server.nouvelle_partie("JETON", Config(), "a")
+        partie.planificateur = Planificateur(horloge=lambda: temps[0])
+        try:
+            partie.programmer("chrono", 1.0, ("compter",))
+            temps[0] = 1.0
+            partie.planificateur.declencher_echus(temps[0])  # commande déposée…
+            assert len(partie.boite) == 1
+            partie.annuler("chrono")                          # …puis délai annulé
+            await attendre_acteur(partie)
+            assert executees == []
+
+            partie.programmer("chrono", 1.0, ("compter",))
+            await avancer(partie, temps, 1.0)
+            assert executees == ["JETON"]
+        finally:
+            server.fermer_partie("JETON", "fin du test")
+
+    asyncio.run(scenario())
+
+
+def test_histogramme_au_format_prometheus():
+    histo = metriques.Histogramme("t_secondes", "Test", bornes=(0.1, 1.0), etiquettes=("etat",))
+    for valeur in (0.05, 0.5, 0.5, 3.0):
+        histo.labels("attente").observer(valeur)
+    assert histo.exposer() == [
+        "# HELP t_secondes Test",
+        "# TYPE t_secondes histogram",
+        't_secondes_bucket{etat="attente",le="0.1"} 1',
+        't_secondes_bucket{etat="attente",le="1.0"} 3',
+        't_secondes_bucket{etat="attente",le="+Inf"} 4',
+        't_secondes_sum{etat="attente"} 4.05',
+        't_secondes_count{etat="attente"} 4',
+    ]
+
+
+def test_chronometrer_fonctions_et_coroutines():
+    histo = metriques.Histogramme("t_duree", "Test")
+
+    @metriques.chronometrer(histo)
+    def calcul(x):
+        return x * 2
+
+    @metriques.chronometrer(histo)
+    async def attente(x):
+        await asyncio.sleep(0)
+        return x + 1
+
+    assert calcul(2) == 4 and asyncio.run(attente(2)) == 3
+    assert histo.total == 2 and histo.somme >= 0.0
+
+
+def test_point_d_acces_metrics():
+    with TestClient(server.app) as client:
+        reponse = client.get("/metrics")
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/plain")
+    for serie in ("# TYPE pays_existe_suite_secondes histogram",
+                  "pays_est_complet_secondes_count", "pays_snapshot_secondes_bucket"):
+        assert serie in reponse.text
+
+
+def test_blocage_attribue_a_la_tache_qui_bloque():
+    blocages = []
+    surveillant = SurveillantBoucle(seuil=0.05, periode=0.01,
+                                    sur_blocage=lambda duree, room, gest: blocages.append((room, gest)))
+
+    async def gestionnaire(room_id, reprise, bloquer_avant):
+        surveillant.marquer(room_id, "ia_jouer")
+        try:
+            if bloquer_avant:
+                time.sleep(0.2)
+            await reprise.wait()                        # ex. : lot de l'IA en attente
+            if not bloquer_avant:
+                time.sleep(0.2)
+        finally:
+            surveillant.marquer(None, None)
+
+    async def scenario():
+        surveillant.demarrer()
+        reprise = asyncio.Event()
+        attend = asyncio.ensure_future(gestionnaire("A", reprise, False))
+        await asyncio.sleep(0.02)
+        bloque = asyncio.ensure_future(gestionnaire("B", reprise, True))
+        await asyncio.sleep(0.1)
+        reprise.set()
+        await asyncio.gather(attend, bloque)
+        await asyncio.sleep(0.1)
+        surveillant.arreter()
+
+    asyncio.run(scenario())
+    assert blocages == [("B", "ia_jouer"), ("A", "ia_jouer")]
+
+
+def test_echantillonneur_replie_les_piles_du_thread_mesure():
+    def occupe_profond():
+        fin = time.monotonic() + 0.15
+        while time.monotonic() < fin:
+            pass
+
+    async def scenario():
+        echantillonneur = Echantillonneur(threading.get_ident(), intervalle=0.005)
+        mesure = asyncio.ensure_future(echantillonneur.mesurer(0.1))
+        await asyncio.sleep(0.01)
+        occupe_profond()                                 # boucle bloquée : échantillonnée
+        return await mesure, echantillonneur.nb
+
+    texte, nb = asyncio.run(scenario())
+    lignes = texte.splitlines()
+    assert nb > 0 and sum(int(l.rsplit(" ", 1)[1]) for l in lignes) == nb
+    pile = next(l for l in lignes if "occupe_profond (test_partie.py:" in l)
+    assert pile.index("scenario (") < pile.index("occupe_profond (")   # racine d'abord
+
+
+def test_profil_admin_protege_par_jeton(monkeypatch):
+    with TestClient(server.app) as client:
+        assert client.get("/admin/profil").status_code == 404
+        monkeypatch.setenv("PAYS_ADMIN_TOKEN", "secret")
+        assert client.get("/admin/profil", headers={"X-Admin-Token": "faux"}).status_code == 403
+        reponse = client.get("/admin/profil", params={"secondes": 0.1},
+                             headers={"X-Admin-Token": "secret"})
+    assert reponse.status_code == 200
+
+
+class SocketTemoin(SocketBloquee):
+    def __init__(self):
+        super().__init__()
+        self.recus = []
+
+    async def send_text(self, texte):
+        self.recus.append(texte)
+
+
+def test_diffusion_encodee_une_fois_pour_tous(monkeypatch):
+    encodages = []
+    encoder = server.encoder_json
+    monkeypatch.setattr(server, "encoder_json", lambda data: encodages.append(data) or encoder(data))
+
+    async def scenario():
+        gestion = server.ConnectionManager()
+        temoins = [SocketTemoin() for _ in range(3)]
+        await gestion.connecter("R", "lent", SocketBloquee())
+        for k, ws in enumerate(temoins):
+            await gestion.connecter("R", f"j{k}", ws)
+        await gestion.diffuser("R", {"type": "chat", "texte": "Côte d’Ivoire ✓", "n": [1, 2]})
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for connexion in gestion.connexions["R"].values():
+            connexion.tache.cancel()
+        return temoins
+
+    temoins = asyncio.run(scenario())
+    assert len(encodages) == 1
+    textes = [t for ws in temoins for t in ws.recus]
+    assert len(textes) == 3 and len(set(textes)) == 1      # le client lent ne bloque personne
+    assert json.loads(textes[0]) == {"type": "chat", "texte": "Côte d’Ivoire ✓", "n": [1, 2]}
+
+
+def _bench(*options) -> subprocess.CompletedProcess:
+    # Le banc d'essai instrumente le module server : processus à part
+    return subprocess.run([sys.executable, "bench.py", "--rooms", "20", "--ia", "1", "--graine", "3",
+                           *options], capture_output=True, text=True, timeout=120)
+
+
+def test_banc_d_essai_deterministe_et_comparaison(tmp_path):
+    reference = tmp_path / "reference.json"
+    premier = _bench("--sauver-reference", str(reference))
+    second = json.loads(_bench().stdout)
+    assert premier.returncode == 0
+    deterministes = ("terminees", "temps_virtuel_s", "lettres", "tours")
+    attendu = json.loads(reference.read_text(encoding="utf-8"))
+    assert {k: second[k] for k in deterministes} == {k: attendu[k] for k in deterministes}
+    assert second["terminees"] == 20
+
+    attendu["lettres_par_s"] = second["lettres_par_s"] * 10          # référence inatteignable
+    reference.write_text(json.dumps(attendu), encoding="utf-8")
+    regression = _bench("--comparer", str(reference))
+    assert regression.returncode == 1
+    assert "[bench REGRESSION] lettres/s" in regression.stdout
+
+
+@pytest.fixture
+def serveur_local():
+    """Le serveur dans un vrai processus uvicorn, sur un port libre."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    processus = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+                                  "--log-level", "warning"], env={**os.environ, "PAYS_STOCKAGE": "memoire"})
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(url + "/metrics", timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield url
+    finally:
+        processus.terminate()
+        processus.wait(10)
+
+
+def test_generateur_de_charge_joue_des_parties(serveur_local):
+    sortie = subprocess.run([sys.executable, "charge.py", "--url", serveur_local, "--rooms", "2",
+                             "--joueurs", "2", "--ia", "1", "--profil", "fixe:0.05", "--temps", "2",
+                             "--montee", "0.2", "--duree", "3", "--chat", "0", "--churn", "0"],
+                            capture_output=True, text=True, timeout=60)
+    resume = json.loads(sortie.stdout)
+    assert resume["connexions"]["acceptees"] == resume["connexions"]["tentatives"] == 4
+    assert resume["lettre_vers_nouveau_tour"]["n"] > 0
+    assert resume["erreurs"] == {}
+
+
+def test_profils_de_reflexion():
+    rng = random.Random(1)
+    assert charge.profil_reflexion("fixe:1.5")(rng) == 1.5
+    assert all(0.2 <= charge.profil_reflexion("rapide")(rng) <= 0.8 for _ in range(100))
+    assert all(charge.profil_reflexion("lent")(rng) <= 14.0 for _ in range(100))
+
+
+def test_relais_websocket_repercute_le_refus_du_proprietaire(serveur_local, monkeypatch):
+    requete = urllib.request.Request(serveur_local + "/parties", data=json.dumps({"max_joueurs": 1}).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(requete, timeout=10) as r:
+        room_id = json.loads(r.read())["room_id"]
+    # Ce worker-ci ne détient pas la room : tout passe par le relais
+    monkeypatch.setattr(server, "url_proprietaire", lambda rid, relaye=False: None if relaye else serveur_local)
+
+    with TestClient(server.app) as client:
+        with client.websocket_connect(f"/ws/{room_id}/a/Alice") as ws:
+            assert "snapshot" in ws.receive_json()
+            with pytest.raises(WebSocketDisconnect) as refus:
+                with client.websocket_connect(f"/ws/{room_id}/b/Bob") as refuse:
+                    refuse.receive_json()
+    assert (refus.value.code, refus.value.reason) == (4002, "Partie pleine")
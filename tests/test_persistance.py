@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import server
+from persistance import StockageJournal, stockage_depuis_env
+
+
+def test_une_cle_trop_longue_n_empoisonne_pas_le_lot(tmp_path):
+    chemin = str(tmp_path / "parties.log")
+    stockage = StockageJournal(chemin)
+    stockage.sauver("A", ("etat", 1))
+    stockage.sauver("X" * 300, ("etat", 2))
+    stockage.vider()
+    stockage.sauver("A", ("etat", 3))
+    stockage.vider()
+    stockage.fermer()
+
+    assert StockageJournal(chemin).charger_tout() == {"A": ("etat", 3)}
+
+
+def test_room_id_trop_long_refuse():
+    with TestClient(server.app) as client:
+        with pytest.raises(WebSocketDisconnect) as refus:
+            with client.websocket_connect("/ws/" + "X" * 300 + "/p/n") as ws:
+                ws.receive_json()
+    assert refus.value.code == 4003
+    assert "X" * 300 not in server.parties
+
+
+def test_un_fichier_par_worker_en_grappe(tmp_path, monkeypatch):
+    monkeypatch.setenv("PAYS_STOCKAGE", f"sqlite:{tmp_path / 'parties.db'}")
+    premier = stockage_depuis_env("http://127.0.0.1:8001")
+    second = stockage_depuis_env("http://127.0.0.1:8002")
+    premier.sauver("A", ("etat", 1))
+    premier.fermer()
+    assert second.charger_tout() == {}
+    second.fermer()
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix == ".db") == [
+        "parties.http_127.0.0.1_8001.db", "parties.http_127.0.0.1_8002.db"]
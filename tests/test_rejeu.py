@@ -0,0 +1,59 @@
+import asyncio
+
+import server
+from conftest import avancer
+from planificateur import Planificateur
+from rejouer import Rejeu
+from server import Config, Partie
+
+
+class JournalMemoire:
+    """Même interface que `journal.Journal`, horodaté par l'horloge virtuelle."""
+
+    def __init__(self, horloge):
+        self.horloge = horloge
+        self.evenements = []
+
+    def ajouter(self, room_id, revision, graine, commande):
+        self.evenements.append((room_id, self.horloge(), revision, graine, commande))
+
+
+def test_rejeu_a_travers_une_reprise(monkeypatch):
+    temps = [1000.0]
+    journal = JournalMemoire(lambda: temps[0])
+    monkeypatch.setattr(server, "journal", journal)
+
+    async def scenario():
+        partie = server.nouvelle_partie("REPRIS", Config(temps=5, vies=3), "a")
+        partie.planificateur = Planificateur(horloge=lambda: temps[0])
+        await partie.demander(("rejoindre", "a", "Alice"))
+        await partie.demander(("rejoindre", "b", "Bob"))
+        assert await partie.demander(("demarrer",)) is None
+        await partie.demander(("lettre", partie.joueur_actuel_id, "F"))
+        await avancer(partie, temps, 2.0)
+        assert partie.jetons["chrono"] > 1
+
+        # Arrêt brutal puis redémarrage depuis le point de reprise
+        etat = partie.etat_compact()
+        partie.annuler_tout()
+        server.parties.pop("REPRIS")
+        restauree = Partie.depuis_etat_compact(etat)
+        restauree.planificateur = Planificateur(horloge=lambda: temps[0])
+        server.parties["REPRIS"] = restauree
+        restauree.rearmer_minuteries(etat[-1])
+        for _ in range(6):
+            await avancer(restauree, temps, 10.0)
+
+        rejeu = await Rejeu(journal.evenements).avancer()
+        try:
+            return restauree, rejeu
+        finally:
+            server.fermer_partie("REPRIS", "fin du test")
+
+    live, rejeu = asyncio.run(scenario())
+    executees = [e for e in journal.evenements if e[4][0] == "minuterie"]
+    assert len(executees) >= 3
+    assert live.revision == rejeu.revision
+    assert [(j.id, j.vies, j.en_vie) for j in live.joueurs.values()] == \
+        [(j.id, j.vies, j.en_vie) for j in rejeu.joueurs.values()]
+    assert server.encoder_json(live.snapshot()) == server.encoder_json(rejeu.snapshot())